@@ -7,6 +7,8 @@ import os
 
 import requests
 
+import market_utils
+
 
 FCM_SCOPE = "https://www.googleapis.com/auth/firebase.messaging"
 FCM_SEND_URL = "https://fcm.googleapis.com/v1/projects/{project_id}/messages:send"
@@ -589,9 +591,14 @@ def retry_cached_buy_now_notifications(
     state_path="dashboard_state.json",
     **delivery_options,
 ):
-    """Reîncearcă imediat semnalele BUY restante din ultimul cache valid."""
-    with open(state_path, "r", encoding="utf-8") as handle:
-        dashboard_state = json.load(handle)
+    """Reîncearcă imediat semnalele BUY restante din ultimul cache valid.
+
+    Starea este citită și rescrisă prin market_utils, deci rămâne compactă și
+    legată de sidecar-ul seriilor de grafic.
+    """
+    if not os.path.exists(state_path):
+        raise FileNotFoundError(state_path)
+    dashboard_state = market_utils.load_state(state_path, on_error=_reraise)
     cached_analysis = dashboard_state.get("last_portfolio_ai_analysis") or {}
     result = cached_analysis.get("result") or {}
     candidates = cached_analysis.get("buy_candidates") or []
@@ -605,12 +612,14 @@ def retry_cached_buy_now_notifications(
     )
     if next_state != previous_state:
         dashboard_state["buy_now_push_state"] = next_state
-        with open(state_path, "w", encoding="utf-8") as handle:
-            json.dump(dashboard_state, handle, ensure_ascii=False, indent=2)
-            handle.write("\n")
+        market_utils.save_state(dashboard_state, state_path)
     return diagnostic
 
 
+def _reraise(error):
+    raise error
+
+
 def send_test_notification(
     symbol="TEST",
     registration_token=None,
@@ -1,14 +1,18 @@
 """Istoric OHLCV BVB din fișierele zilnice publice, fără autentificare.
 
 Sursa nu este BVB Web Service și nu necesită cont, token sau cheie API.
-Cache-ul CSV este incremental: prima rulare face backfill, apoi fiecare rulare
-înlocuiește numai ultimele ședințe și adaugă zilele noi.
+Cache-ul CSV este incremental: primul apel din rulare face backfill pentru tot
+universul (backfill), apoi fiecare rulare înlocuiește numai ultimele ședințe și
+adaugă zilele noi; fetch_history citește doar din cache. În memorie cache-ul
+este partiționat pe simbol (BVBDailyStore).
 """
 
 import datetime
+import json
 import os
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 
 import pandas as pd
@@ -26,7 +30,11 @@ DEFAULT_MIN_OBSERVATIONS = 60
 DEFAULT_MAX_AGE_DAYS = 10
 DEFAULT_LOOKBACK_DAYS = 150
 DEFAULT_MAX_CONSECUTIVE_ERRORS = 3
+DEFAULT_BACKFILL_WORKERS = 4
 MIN_REQUEST_INTERVAL_SECONDS = 0.20
+# Rândurile înlocuite de zilele reîmprospătate rămân în CSV până când depășesc
+# această fracție din rândurile valide; abia atunci fișierul este rescris.
+COMPACT_SUPERSEDED_RATIO = 0.25
 CACHE_COLUMNS = [
     "Date",
     "Symbol",
@@ -39,10 +47,18 @@ CACHE_COLUMNS = [
     "Value",
 ]
 _SESSION = None
-_CACHE_FRAMES = {}
+_CACHE_STORES = {}
 _REQUESTED_DATES = {}
 _UNAVAILABLE_CACHE_KEYS = set()
+_SOURCE_ERRORS = {}
+_CLOSED_DATES = {}
+# Răspunsul sursei pentru o zi fără ședință (sărbătoare legală BVB).
+_NO_SESSION = object()
 _REQUEST_LOCK = threading.Lock()
+# Crearea magazinelor și backfillul întreg sunt serializate: apelurile
+# paralele ale fetch_history așteaptă primul backfill în loc să citească un
+# cache pe jumătate completat.
+_BACKFILL_LOCK = threading.RLock()
 _LAST_REQUEST_AT = 0.0
 
 
@@ -92,18 +108,23 @@ def _session():
 
 
 def _throttled_get(client, *args, **kwargs):
+    """GET care își rezervă un interval în bugetul global de cereri.
+
+    Lock-ul protejează doar rezervarea, deci cererile paralele ale
+    backfillului se suprapun, dar pornesc la cel puțin
+    MIN_REQUEST_INTERVAL_SECONDS una după alta.
+    """
     global _LAST_REQUEST_AT
     with _REQUEST_LOCK:
-        remaining = (
-            MIN_REQUEST_INTERVAL_SECONDS
-            - (time.monotonic() - _LAST_REQUEST_AT)
+        slot = max(
+            time.monotonic(),
+            _LAST_REQUEST_AT + MIN_REQUEST_INTERVAL_SECONDS,
         )
-        if remaining > 0:
-            time.sleep(remaining)
-        try:
-            return client.get(*args, **kwargs)
-        finally:
-            _LAST_REQUEST_AT = time.monotonic()
+        _LAST_REQUEST_AT = slot
+    remaining = slot - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+    return client.get(*args, **kwargs)
 
 
 def _numeric(series):
@@ -194,36 +215,197 @@ def _empty_cache():
     return pd.DataFrame(columns=CACHE_COLUMNS)
 
 
-def _load_cache(cache_path):
-    cache_key = os.path.abspath(cache_path)
-    if cache_key in _CACHE_FRAMES:
-        return _CACHE_FRAMES[cache_key].copy()
+def _read_cache_csv(cache_path):
     if not os.path.exists(cache_path):
-        frame = _empty_cache()
-    else:
+        return _empty_cache()
+    try:
+        frame = pd.read_csv(cache_path)
+    except (OSError, ValueError, pd.errors.ParserError):
+        return _empty_cache()
+    if not set(CACHE_COLUMNS).issubset(frame.columns):
+        return _empty_cache()
+    return frame[CACHE_COLUMNS]
+
+
+class BVBDailyStore:
+    """Cache-ul zilnic BVB partiționat pe simbol.
+
+    În memorie rândurile sunt sortate după (Symbol, Date), cu un index
+    simbol -> interval de rânduri, deci istoricul unui simbol costă doar
+    rândurile lui. flush() anexează zilele noi la CSV, inclusiv ședințele
+    reîmprospătate, a căror versiune nouă câștigă la citire (keep="last").
+    Fișierul este compactat (rescris sortat pe Date, Symbol) doar când lipsește,
+    când o zi reîmprospătată pierde simboluri sau când rândurile înlocuite
+    depășesc COMPACT_SUPERSEDED_RATIO. Metodele sunt protejate de un lock
+    propriu, deci cititorii paraleli văd mereu un index coerent.
+    """
+
+    def __init__(self, path, frame=None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._set_base(_read_cache_csv(path) if frame is None else frame)
+
+    def _set_base(self, frame, superseded=0):
+        rows = len(frame)
+        frame = (
+            frame[CACHE_COLUMNS]
+            .assign(
+                Date=frame["Date"].astype(str),
+                Symbol=frame["Symbol"].astype(str).str.upper(),
+            )
+            .drop_duplicates(subset=["Date", "Symbol"], keep="last")
+            .sort_values(["Symbol", "Date"], kind="stable")
+            .reset_index(drop=True)
+        )
+        symbols = frame["Symbol"].to_numpy()
+        ranges = {}
+        if len(symbols):
+            boundaries = (symbols[1:] != symbols[:-1]).nonzero()[0] + 1
+            starts = [0, *boundaries.tolist()]
+            stops = [*boundaries.tolist(), len(symbols)]
+            ranges = {
+                symbols[begin]: (begin, stop)
+                for begin, stop in zip(starts, stops)
+            }
+        base_dates = set(frame["Date"].unique().tolist())
+        # Cadrul și indexul lui se schimbă împreună, altfel symbol_rows ar
+        # putea tăia cadrul nou cu intervalele celui vechi.
+        with self._lock:
+            self._base, self._ranges = frame, ranges
+            self._base_dates = base_dates
+            self._pending = {}
+            self._superseded = superseded + rows - len(frame)
+
+    @property
+    def empty(self):
+        with self._lock:
+            return self._base.empty and not any(
+                not daily.empty for daily in self._pending.values()
+            )
+
+    @property
+    def dirty(self):
+        with self._lock:
+            return bool(self._pending)
+
+    def has_date(self, date_text):
+        with self._lock:
+            return date_text in self._pending or date_text in self._base_dates
+
+    def newest_date(self):
+        """Cea mai recentă ședință din cache (text ISO) sau None."""
+        with self._lock:
+            dates = self._base_dates.union(
+                date_text
+                for date_text, daily in self._pending.items()
+                if not daily.empty
+            )
+        return max(dates) if dates else None
+
+    def ingest(self, date_text, daily):
+        """Înlocuiește (sau adaugă) ședința date_text cu fișierul zilnic."""
+        daily = daily[CACHE_COLUMNS].assign(Date=date_text)
+        with self._lock:
+            self._pending[date_text] = daily.set_index("Symbol", drop=False)
+
+    def symbol_rows(self, symbol):
+        with self._lock:
+            base, ranges = self._base, self._ranges
+            pending = dict(self._pending)
+        begin, stop = ranges.get(symbol, (0, 0))
+        rows = base.iloc[begin:stop]
+        if pending:
+            replaced = rows["Date"].isin(pending.keys())
+            if replaced.any():
+                rows = rows[~replaced]
+            fresh = [
+                daily.loc[[symbol]]
+                for daily in pending.values()
+                if symbol in daily.index
+            ]
+            if fresh:
+                rows = pd.concat([rows, *fresh], ignore_index=True)
+        return rows
+
+    def history(self, symbol):
+        return _symbol_frame(self.symbol_rows(symbol))
+
+    def flush(self):
+        """Persistă zilele noi: anexare la CSV sau, la nevoie, compactare."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        dates = sorted(self._pending)
+        fresh = [self._pending[d].reset_index(drop=True) for d in dates]
+        refreshed = self._base["Date"].isin(dates)
+        # O zi reîmprospătată care nu mai conține un simbol nu poate fi
+        # corectată prin anexare: rândul vechi ar rămâne valid la citire.
+        dropped_symbols = any(
+            not self._base.loc[self._base["Date"] == d, "Symbol"]
+            .isin(self._pending[d].index).all()
+            for d in dates
+            if d in self._base_dates
+        )
+        kept = self._base[~refreshed]
+        merged = pd.concat([kept, *fresh], ignore_index=True)
+        superseded = self._superseded + int(refreshed.sum())
+        if (
+            dropped_symbols
+            or not os.path.exists(self.path)
+            or superseded > COMPACT_SUPERSEDED_RATIO * len(merged)
+        ):
+            normalized = (
+                merged.sort_values(["Date", "Symbol"])
+                .reset_index(drop=True)
+            )
+            temp_path = f"{self.path}.tmp"
+            normalized.to_csv(temp_path, index=False)
+            os.replace(temp_path, self.path)
+            self._set_base(normalized)
+            return
+        pd.concat(fresh, ignore_index=True).to_csv(
+            self.path, mode="a", header=False, index=False
+        )
+        self._set_base(merged, superseded)
+
+
+def _load_store(cache_path):
+    cache_key = os.path.abspath(cache_path)
+    with _BACKFILL_LOCK:
+        store = _CACHE_STORES.get(cache_key)
+        if store is None:
+            store = _CACHE_STORES[cache_key] = BVBDailyStore(cache_path)
+        return store
+
+
+def _closed_dates_path(cache_path):
+    root, _ = os.path.splitext(cache_path)
+    return f"{root}_closed.json"
+
+
+def _load_closed_dates(cache_path):
+    """Zilele lucrătoare confirmate fără ședință, persistate lângă cache."""
+    cache_key = os.path.abspath(cache_path)
+    closed = _CLOSED_DATES.get(cache_key)
+    if closed is None:
         try:
-            frame = pd.read_csv(cache_path)
-            if not set(CACHE_COLUMNS).issubset(frame.columns):
-                frame = _empty_cache()
-            else:
-                frame = frame[CACHE_COLUMNS]
-        except (OSError, ValueError, pd.errors.ParserError):
-            frame = _empty_cache()
-    _CACHE_FRAMES[cache_key] = frame.copy()
-    return frame
-
-
-def _save_cache(cache_path, frame):
-    normalized = (
-        frame[CACHE_COLUMNS]
-        .drop_duplicates(subset=["Date", "Symbol"], keep="last")
-        .sort_values(["Date", "Symbol"])
-        .reset_index(drop=True)
-    )
-    temp_path = f"{cache_path}.tmp"
-    normalized.to_csv(temp_path, index=False)
-    os.replace(temp_path, cache_path)
-    _CACHE_FRAMES[os.path.abspath(cache_path)] = normalized.copy()
+            with open(_closed_dates_path(cache_path), encoding="utf-8") as handle:
+                closed = {str(day) for day in json.load(handle)}
+        except (OSError, ValueError, TypeError):
+            closed = set()
+        _CLOSED_DATES[cache_key] = closed
+    return closed
+
+
+def _save_closed_dates(cache_path, closed):
+    path = _closed_dates_path(cache_path)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as handle:
+        json.dump(sorted(closed), handle, indent=0)
+    os.replace(temp_path, path)
 
 
 def _candidate_dates(today, lookback_days):
@@ -232,10 +414,10 @@ def _candidate_dates(today, lookback_days):
     return list(reversed(dates))
 
 
-def _symbol_frame(cache, symbol):
-    selected = cache[cache["Symbol"].astype(str).str.upper() == symbol].copy()
-    if selected.empty:
+def _symbol_frame(rows):
+    if rows.empty:
         return pd.DataFrame()
+    selected = rows.copy()
     selected["Date"] = pd.to_datetime(selected["Date"], errors="coerce")
     for column in ("Open", "High", "Low", "Close", "Volume"):
         selected[column] = pd.to_numeric(selected[column], errors="coerce")
@@ -248,109 +430,203 @@ def _symbol_frame(cache, symbol):
     return selected[["Open", "High", "Low", "Close", "Volume"]]
 
 
-def fetch_history(
-    symbol,
+def backfill(
     *,
     cache_path=DEFAULT_CACHE_FILE,
     session=None,
     timeout=20,
     now=None,
-    min_observations=DEFAULT_MIN_OBSERVATIONS,
-    max_age_days=DEFAULT_MAX_AGE_DAYS,
     lookback_days=DEFAULT_LOOKBACK_DAYS,
+    max_workers=DEFAULT_BACKFILL_WORKERS,
     max_consecutive_errors=DEFAULT_MAX_CONSECUTIVE_ERRORS,
 ):
-    """Returnează OHLCV BVB, completând incremental cache-ul public zilnic."""
-    bvb_symbol = normalize_symbol(symbol)
-    if not bvb_symbol:
-        raise BVBPublicDataError("Simbol BVB lipsă")
+    """Completează o singură dată cache-ul pentru tot universul BVB.
+
+    Cere doar zilele mai noi decât ultima ședință din cache (toată fereastra
+    de lookback dacă acesta e gol), plus ultimele două ședințe, care se
+    reîmprospătează. Zilele trecute fără ședință (404 sau fișier gol) sunt
+    reținute lângă cache și nu mai sunt cerute; nu contează ca erori ale
+    sursei. Sursa este verificată serial cu cea mai recentă zi, apoi restul
+    se descarcă în paralel; ritmul cererilor rămâne limitat global de
+    _throttled_get. Toate zilele sunt scrise în cache într-un singur lot.
+    Backfillul ține _BACKFILL_LOCK de la început până la scriere, iar o zi
+    este marcată drept cerută abia după ce sursa a răspuns pentru ea.
+    Întoarce numărul de zile descărcate.
+    """
+    with _BACKFILL_LOCK:
+        return _backfill(
+            cache_path=cache_path,
+            session=session,
+            timeout=timeout,
+            now=now,
+            lookback_days=lookback_days,
+            max_workers=max_workers,
+            max_consecutive_errors=max_consecutive_errors,
+        )
+
+
+def _backfill(
+    *,
+    cache_path,
+    session,
+    timeout,
+    now,
+    lookback_days,
+    max_workers,
+    max_consecutive_errors,
+):
     current_date = (
         pd.Timestamp(now).date()
         if now is not None
         else datetime.datetime.now().astimezone().date()
     )
     cache_key = os.path.abspath(cache_path)
-    cache = _load_cache(cache_path)
-    existing_dates = set(cache.get("Date", pd.Series(dtype=str)).astype(str))
-    symbol_history = _symbol_frame(cache, bvb_symbol)
-    source_errors = []
-    consecutive_errors = 0
-    downloaded_days = 0
-    initial_cache_empty = cache.empty
-
-    if initial_cache_empty and cache_key not in _UNAVAILABLE_CACHE_KEYS:
-        print(
-            "  [BVB public] Se construiește cache-ul istoric zilnic; "
-            "prima rulare poate dura aproximativ un minut..."
-        )
-
-    candidates = (
-        []
-        if cache_key in _UNAVAILABLE_CACHE_KEYS
-        else _candidate_dates(current_date, lookback_days)
-    )
+    if cache_key in _UNAVAILABLE_CACHE_KEYS:
+        return 0
+    store = _load_store(cache_path)
     requested_dates = _REQUESTED_DATES.setdefault(cache_key, set())
-    refresh_dates = {
+    closed_dates = _load_closed_dates(cache_path)
+    newest_date = store.newest_date()
+    candidates = _candidate_dates(current_date, lookback_days)
+    missing = [
         trading_date
-        for trading_date in candidates[:2]
+        for position, trading_date in enumerate(candidates)
         if trading_date.isoformat() not in requested_dates
-    }
-    for trading_date in candidates:
-        date_text = trading_date.isoformat()
-        enough_history = len(symbol_history) >= int(min_observations)
-        if (
-            date_text in existing_dates
-            and trading_date not in refresh_dates
-        ):
-            if enough_history:
-                break
-            continue
-        if date_text in requested_dates:
-            continue
-        requested_dates.add(date_text)
-        try:
-            daily = fetch_daily_snapshot(
-                trading_date,
-                session=session,
-                timeout=timeout,
-            )
-        except (requests.RequestException, BVBPublicDataError) as exc:
-            source_errors.append(str(exc))
+        and trading_date.isoformat() not in closed_dates
+        and (
+            position < 2
+            or newest_date is None
+            or trading_date.isoformat() > newest_date
+        )
+    ]
+    if not missing:
+        return 0
+    if store.empty:
+        print(
+            "  [BVB public] Se construiește cache-ul istoric zilnic: "
+            f"{len(missing)} ședințe de descărcat..."
+        )
+
+    downloaded = {}
+    new_closed_dates = set()
+    # Zilele pentru care sursa a răspuns fără ședință (inclusiv ziua curentă
+    # încă nepublicată) nu se mai cer în aceeași rulare.
+    answered_empty = set()
+    consecutive_errors = 0
+    source_answered = False
+
+    def record(trading_date, outcome):
+        nonlocal consecutive_errors, source_answered
+        if outcome is _NO_SESSION:
+            # Sursa a răspuns; ziua curentă poate fi încă nepublicată.
+            source_answered = True
+            consecutive_errors = 0
+            answered_empty.add(trading_date.isoformat())
+            if trading_date < current_date:
+                new_closed_dates.add(trading_date.isoformat())
+            return False
+        if isinstance(outcome, Exception):
+            _SOURCE_ERRORS[cache_key] = str(outcome)
             consecutive_errors += 1
-            if consecutive_errors >= int(max_consecutive_errors):
-                _UNAVAILABLE_CACHE_KEYS.add(cache_key)
-                print(
-                    "  [BVB public] Sursa nu răspunde; oprim backfillul "
-                    f"după {consecutive_errors} erori consecutive."
-                )
-                break
-            continue
+            return consecutive_errors >= int(max_consecutive_errors)
         consecutive_errors = 0
-        downloaded_days += 1
-        cache = cache[cache["Date"].astype(str) != date_text]
-        if not daily.empty:
-            cache = pd.concat([cache, daily], ignore_index=True)
-        existing_dates.add(date_text)
-        symbol_history = _symbol_frame(cache, bvb_symbol)
-        if downloaded_days % 10 == 0:
-            if not cache.empty:
-                _save_cache(cache_path, cache)
+        source_answered = True
+        downloaded[trading_date.isoformat()] = outcome
+        if len(downloaded) % 10 == 0:
             print(
-                f"  [BVB public] Backfill: {downloaded_days} zile "
-                f"descărcate, {len(symbol_history)}/{min_observations} "
-                f"ședințe pentru {bvb_symbol}."
+                f"  [BVB public] Backfill: {len(downloaded)}/{len(missing)} "
+                "zile descărcate."
             )
-        if (
-            len(symbol_history) >= int(min_observations)
-            and trading_date not in refresh_dates
-        ):
+        return False
+
+    def attempt(trading_date):
+        try:
+            daily = fetch_daily_snapshot(
+                trading_date, session=session, timeout=timeout
+            )
+        except requests.HTTPError as exc:
+            response = exc.response
+            if response is not None and response.status_code == 404:
+                return _NO_SESSION
+            return exc
+        except (requests.RequestException, BVBPublicDataError) as exc:
+            return exc
+        return _NO_SESSION if daily.empty else daily
+
+    # Sondăm sursa serial până la primul răspuns valid, ca o sursă căzută
+    # să coste doar max_consecutive_errors cereri.
+    remaining = list(missing)
+    source_down = False
+    while remaining and not source_answered:
+        trading_date = remaining.pop(0)
+        if record(trading_date, attempt(trading_date)):
+            source_down = True
             break
+    if remaining and not source_down:
+        executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)))
+        try:
+            outcomes = executor.map(attempt, remaining)
+            for trading_date, outcome in zip(remaining, outcomes):
+                if record(trading_date, outcome):
+                    source_down = True
+                    break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    if source_down:
+        _UNAVAILABLE_CACHE_KEYS.add(cache_key)
+        print(
+            "  [BVB public] Sursa nu răspunde; oprim backfillul "
+            f"după {consecutive_errors} erori consecutive."
+        )
+
+    requested_dates.update(downloaded)
+    requested_dates.update(answered_empty)
+    if new_closed_dates:
+        closed_dates.update(new_closed_dates)
+        _save_closed_dates(cache_path, closed_dates)
+    for date_text in sorted(downloaded):
+        store.ingest(date_text, downloaded[date_text])
+    if store.dirty and not store.empty:
+        store.flush()
+    if len(downloaded) >= 10:
+        print(f"  [BVB public] Backfill încheiat: {len(downloaded)} zile.")
+    return len(downloaded)
 
-    if not cache.empty:
-        _save_cache(cache_path, cache)
-    symbol_history = _symbol_frame(cache, bvb_symbol)
+
+def fetch_history(
+    symbol,
+    *,
+    cache_path=DEFAULT_CACHE_FILE,
+    session=None,
+    timeout=20,
+    now=None,
+    min_observations=DEFAULT_MIN_OBSERVATIONS,
+    max_age_days=DEFAULT_MAX_AGE_DAYS,
+    lookback_days=DEFAULT_LOOKBACK_DAYS,
+    max_consecutive_errors=DEFAULT_MAX_CONSECUTIVE_ERRORS,
+):
+    """Returnează OHLCV BVB din cache; primul apel din rulare face backfill."""
+    bvb_symbol = normalize_symbol(symbol)
+    if not bvb_symbol:
+        raise BVBPublicDataError("Simbol BVB lipsă")
+    current_date = (
+        pd.Timestamp(now).date()
+        if now is not None
+        else datetime.datetime.now().astimezone().date()
+    )
+    backfill(
+        cache_path=cache_path,
+        session=session,
+        timeout=timeout,
+        now=current_date,
+        lookback_days=lookback_days,
+        max_consecutive_errors=max_consecutive_errors,
+    )
+    store = _load_store(cache_path)
+    source_error = _SOURCE_ERRORS.get(os.path.abspath(cache_path))
+    symbol_history = store.history(bvb_symbol)
     if len(symbol_history) < int(min_observations):
-        detail = f"; ultima eroare: {source_errors[-1]}" if source_errors else ""
+        detail = f"; ultima eroare: {source_error}" if source_error else ""
         raise BVBPublicDataError(
             f"Istoric public BVB insuficient pentru {bvb_symbol} "
             f"({len(symbol_history)} ședințe){detail}"
@@ -1,19 +1,929 @@
 # -*- coding: utf-8 -*-
+import contextlib
+import json
+import logging
+import os
 import requests
+import sqlite3
+import numpy as np
 import pandas as pd
+import threading
 import time
 import yfinance as yf
-from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
 # Global Cache for Finviz Data
 _finviz_cache = {}
 
-def get_finviz_data(ticker):
-    """Preia datele fundamentale de pe Finviz (Target, ATR, Volatility) cu caching."""
-    if ticker in _finviz_cache:
-        # print(f"  [Cache] Finviz data for {ticker}") # Uncomment for debugging cache hits
-        return _finviz_cache[ticker]
+# Interval minim între două cereri către aceeași gazdă. Limitele sunt globale
+# pentru proces, deci se aplică și când tickerele sunt procesate în paralel.
+HOST_MIN_INTERVAL_SECONDS = {
+    'finviz.com': 0.35,
+    'yahoo': 0.10,
+    # SEC cere cel mult 10 cereri pe secundă de la un client.
+    'sec.gov': 0.12,
+}
+_HOST_LOCKS = {}
+_HOST_LAST_REQUEST_AT = {}
+_HOST_LOCKS_GUARD = threading.Lock()
+
+
+def throttle_host(host):
+    """Așteaptă până când gazda poate primi o nouă cerere (sigur între fire)."""
+    interval = HOST_MIN_INTERVAL_SECONDS.get(host, 0)
+    if interval <= 0:
+        return
+    with _HOST_LOCKS_GUARD:
+        lock = _HOST_LOCKS.setdefault(host, threading.Lock())
+    # Lacătul rezervă doar momentul de start; cererea propriu-zisă rulează
+    # în afara lui, ca alte fire să-și poată programa următorul slot.
+    with lock:
+        remaining = interval - (
+            time.monotonic() - _HOST_LAST_REQUEST_AT.get(host, 0.0)
+        )
+        if remaining > 0:
+            time.sleep(remaining)
+        _HOST_LAST_REQUEST_AT[host] = time.monotonic()
+
+
+_RUN_CACHES = None
+_RUN_CACHES_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def run_scope(history_path=None):
+    """Deschide cache-urile valabile pentru o singură rulare a scannerului.
+
+    Apelurile imbricate refolosesc scopul deja deschis. În afara unei rulări
+    (teste, scripturi punctuale) run_cache întoarce None și fiecare apel își
+    descarcă singur datele, ca înainte. Cu history_path, rularea folosește și
+    magazinul persistent de istoric OHLCV din acel fișier, curățat la final
+    de barele din afara ferestrei acoperite (HistoryStore.prune).
+    """
+    global _RUN_CACHES
+    if _RUN_CACHES is not None:
+        yield _RUN_CACHES
+        return
+    _RUN_CACHES = {}
+    store = None
+    if history_path:
+        store = _RUN_CACHES['history_store'] = history_store(history_path)
+    try:
+        yield _RUN_CACHES
+    finally:
+        _RUN_CACHES = None
+        if store is not None:
+            try:
+                store.prune()
+            except sqlite3.Error as e:
+                print(f"  [Istoric] Curățarea magazinului a eșuat: {e}")
+
+
+def run_cache(name):
+    """Dicționarul `name` al rulării curente sau None în afara unei rulări."""
+    caches = _RUN_CACHES
+    if caches is None:
+        return None
+    with _RUN_CACHES_LOCK:
+        return caches.setdefault(name, {})
+
+
+def run_history_store():
+    """Magazinul de istoric al rulării curente sau None dacă nu este activ."""
+    caches = _RUN_CACHES
+    if caches is None:
+        return None
+    return caches.get('history_store')
+
+
+# Benchmark-urile sunt descărcate o singură dată pe rulare, la cel mai lung
+# orizont cerut de consumatori (swing folosește 2 ani), apoi sunt tăiate.
+BENCHMARK_FETCH_PERIOD = '2y'
+_PERIOD_DAYS = {
+    '1mo': 31, '3mo': 92, '6mo': 183, '1y': 366, '2y': 731, '5y': 1827,
+}
+_BENCHMARK_LOCK = threading.Lock()
+
+
+def _download_benchmark_history(symbol, period):
+    throttle_host('yahoo')
+    return yf.Ticker(symbol).history(period=period)
+
+
+def _normalize_benchmark_frame(frame):
+    """Index zilnic fără fus orar, ca seriile să se poată alinia pe dată."""
+    if frame is None or frame.empty:
+        return pd.DataFrame()
+    normalized = frame.copy()
+    if isinstance(normalized.columns, pd.MultiIndex):
+        try:
+            normalized.columns = normalized.columns.droplevel(1)
+        except (IndexError, ValueError):
+            return pd.DataFrame()
+    if 'Close' not in normalized.columns:
+        return pd.DataFrame()
+    index = pd.to_datetime(normalized.index, errors='coerce')
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    normalized.index = index.normalize()
+    normalized = normalized[~normalized.index.isna()]
+    normalized = normalized[~normalized.index.duplicated(keep='last')]
+    return normalized.dropna(subset=['Close']).sort_index()
+
+
+def _slice_period(frame, period):
+    days = _PERIOD_DAYS.get(period)
+    if frame.empty or days is None:
+        return frame.copy()
+    start = frame.index[-1] - pd.Timedelta(days=days)
+    return frame[frame.index > start].copy()
+
+
+_YAHOO_DOWNLOAD_LOCK = threading.Lock()
+
+
+def yf_download(tickers, **kwargs):
+    """yf.download fără mesajele repetitive ale bibliotecii pentru simboluri absente."""
+    # yf.download folosește stare globală în bibliotecă, deci descărcările sunt
+    # serializate chiar și când watchlistul rulează în paralel. Mesajele sunt
+    # oprite din loggerul yfinance: redirect_stdout ar înghiți și output-ul
+    # celorlalte fire.
+    yf_logger = logging.getLogger('yfinance')
+    with _YAHOO_DOWNLOAD_LOCK:
+        previous_disabled = yf_logger.disabled
+        yf_logger.disabled = True
+        try:
+            throttle_host('yahoo')
+            return yf.download(
+                tickers,
+                auto_adjust=True,
+                progress=False,
+                **kwargs,
+            )
+        finally:
+            yf_logger.disabled = previous_disabled
+
+
+def download_histories(tickers, period, timeout=None):
+    """{ticker: istoric zilnic normalizat} dintr-un singur yf.download.
+
+    Tickerele lipsă din răspunsul Yahoo primesc un cadru gol; apelantul decide
+    dacă le mai cere separat.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+    frame = yf_download(
+        tickers, period=period, group_by='ticker', timeout=timeout
+    )
+    histories = {}
+    for ticker in tickers:
+        selected = None
+        if frame is not None and not frame.empty:
+            if isinstance(frame.columns, pd.MultiIndex):
+                if ticker in frame.columns.get_level_values(0):
+                    selected = frame[ticker].dropna(how='all')
+            elif len(tickers) == 1:
+                selected = frame.dropna(how='all')
+        histories[ticker] = _normalize_benchmark_frame(selected)
+    return histories
+
+
+def get_benchmark_history(symbol, period='1y', fetch=None):
+    """Istoricul unui benchmark (^GSPC, TVBETETF.RO etc.) pentru orizontul cerut.
+
+    Într-o rulare, benchmarkul este descărcat o singură dată la
+    BENCHMARK_FETCH_PERIOD și fiecare consumator primește o copie tăiată la
+    perioada sa. În afara unei rulări, apelul descarcă direct perioada cerută.
+    """
+    fetch = fetch or _download_benchmark_history
+    registry = run_cache('benchmarks')
+    if registry is None:
+        return _normalize_benchmark_frame(fetch(symbol, period=period))
+    with _BENCHMARK_LOCK:
+        if symbol not in registry:
+            try:
+                frame = fetch(symbol, period=BENCHMARK_FETCH_PERIOD)
+            except Exception as exc:
+                print(f"  ⚠ Benchmark {symbol} indisponibil: {str(exc)[:80]}")
+                frame = None
+            # Și eșecul rămâne în cache: nu repetăm cererea pentru fiecare ticker.
+            registry[symbol] = _normalize_benchmark_frame(frame)
+        frame = registry[symbol]
+    return _slice_period(frame, period)
+
+
+def relative_return_gap(stock_close, benchmark_close, sessions):
+    """Randamentul acțiunii minus cel al benchmarkului pe ultimele ședințe comune.
+
+    Seriile sunt aliniate pe dată (join interior), nu pe poziție, deci zilele
+    lipsă dintr-o serie nu decalează comparația. None dacă nu ajung ședințe.
+    """
+    def by_session(series):
+        series = pd.to_numeric(series, errors='coerce')
+        index = pd.to_datetime(series.index, errors='coerce')
+        if getattr(index, 'tz', None) is not None:
+            index = index.tz_localize(None)
+        series = pd.Series(series.to_numpy(), index=index.normalize())
+        series = series[~series.index.isna()]
+        return series[~series.index.duplicated(keep='last')]
+
+    joined = pd.concat(
+        [by_session(stock_close), by_session(benchmark_close)],
+        axis=1,
+        join='inner',
+    ).dropna()
+    if len(joined) < sessions:
+        return None
+    window = joined.iloc[-sessions:]
+    returns = (window.iloc[-1] / window.iloc[0] - 1) * 100
+    return float(returns.iloc[0] - returns.iloc[1])
+
+
+# Indicatorii tehnici ai watchlistului sunt calculați pe panouri dată × simbol:
+# fiecare operație rulează o dată pentru toate coloanele, nu per ticker.
+INDICATOR_FIELDS = (
+    'ATR', 'RSI', 'SMA_50', 'SMA_200',
+    'Return_20', 'Return_60', 'RS_20', 'RS_60',
+)
+
+
+def _session_index(index):
+    index = pd.to_datetime(index, errors='coerce')
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+
+def _common_session_return(close, benchmark, sessions):
+    """Randamentele pe ultimele `sessions` ședințe comune fiecărei coloane cu benchmarkul."""
+    valid = close.notna() & benchmark.notna().to_numpy()[:, None]
+    # Numărul de ședințe comune rămase până la final, pentru fiecare rând.
+    remaining = valid[::-1].cumsum()[::-1]
+    first = close.where(valid & (remaining == sessions)).max()
+    last = close.where(valid & (remaining == 1)).max()
+    bench_values = pd.DataFrame(
+        np.broadcast_to(benchmark.to_numpy()[:, None], close.shape),
+        index=close.index,
+        columns=close.columns,
+    )
+    bench_first = bench_values.where(valid & (remaining == sessions)).max()
+    bench_last = bench_values.where(valid & (remaining == 1)).max()
+    stock_return = (last / first - 1) * 100
+    bench_return = (bench_last / bench_first - 1) * 100
+    return stock_return - bench_return
+
+
+def compute_latest_indicators(high, low, close, benchmark_close=None,
+                              atr_period=14, rsi_period=14):
+    """Ultimele valori ale indicatorilor pentru un panou dată × simbol.
+
+    Panourile au același index (aceleași ședințe pentru toate coloanele).
+    ATR și RSI (Wilder) urmează exact calculate_atr și calculate_rsi din
+    scanner, iar RS_20/RS_60 folosesc ședințele comune cu benchmarkul, ca
+    relative_return_gap. Întoarce un DataFrame simbol × INDICATOR_FIELDS.
+    """
+    result = pd.DataFrame(index=close.columns, columns=INDICATOR_FIELDS, dtype=float)
+    if close.empty:
+        return result
+    prev_close = close.shift(1)
+    true_range = np.fmax(
+        np.fmax(high - low, (high - prev_close).abs()),
+        (low - prev_close).abs(),
+    )
+    result['ATR'] = true_range.rolling(window=atr_period).mean().iloc[-1]
+
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.ewm(alpha=1 / rsi_period, adjust=False).mean().iloc[-1]
+    avg_loss = loss.ewm(alpha=1 / rsi_period, adjust=False).mean().iloc[-1]
+    result['RSI'] = 100 - (100 / (1 + avg_gain / avg_loss))
+
+    for period in (50, 200):
+        result[f'SMA_{period}'] = close.rolling(window=period).mean().iloc[-1]
+    for sessions in (20, 60):
+        if len(close) > sessions:
+            result[f'Return_{sessions}'] = (
+                close.iloc[-1] / close.iloc[-1 - sessions] - 1
+            ) * 100
+
+    if benchmark_close is not None and len(benchmark_close):
+        benchmark = pd.Series(
+            pd.to_numeric(benchmark_close, errors='coerce').to_numpy(),
+            index=_session_index(benchmark_close.index),
+        )
+        benchmark = benchmark[~benchmark.index.isna()]
+        benchmark = benchmark[~benchmark.index.duplicated(keep='last')]
+        aligned = benchmark.reindex(close.index)
+        for sessions in (20, 60):
+            result[f'RS_{sessions}'] = _common_session_return(
+                close, aligned, sessions
+            )
+    return result
+
+
+SPLIT_JUMP_RATIO = 50
+
+
+def detect_unadjusted_splits(close, since=0):
+    """Găsește toate salturile de tip split neajustat dintr-o serie sau un panou.
+
+    Un salt este o bară a cărei închidere anterioară este de peste
+    SPLIT_JUMP_RATIO ori mai mare. Întoarce (scale, jumps): scale are forma lui
+    close și conține factorul cumulat cu care trebuie împărțite prețurile
+    fiecărei bare (produsul split-urilor de după ea), iar jumps este lista
+    (poziție, coloană, factor). Sunt verificate doar pozițiile >= since.
+    """
+    values = close.to_frame() if isinstance(close, pd.Series) else close
+    prices = values.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    ratio = np.full(prices.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio[1:] = prices[:-1] / prices[1:]
+    ratio[:max(1, since)] = np.nan
+    is_jump = ratio > SPLIT_JUMP_RATIO
+    factors = np.where(
+        (ratio >= 170) & (ratio <= 230), 200.0,
+        np.where((ratio >= 80) & (ratio <= 120), 100.0, np.round(ratio)),
+    )
+    factors = np.where(is_jump, factors, 1.0)
+    # Factorul unei bare este produsul split-urilor strict ulterioare ei.
+    after = np.cumprod(factors[::-1], axis=0)[::-1]
+    scale = np.vstack([after[1:], np.ones((1, prices.shape[1]))])
+    rows, cols = np.nonzero(is_jump)
+    jumps = [
+        (int(row), values.columns[col], float(factors[row, col]))
+        for row, col in zip(rows, cols)
+    ]
+    if isinstance(close, pd.Series):
+        return pd.Series(scale[:, 0], index=close.index), jumps
+    return pd.DataFrame(scale, index=close.index, columns=close.columns), jumps
+
+
+def history_fingerprint(frame):
+    """Identifică un istoric: ședințele și suma închiderilor (prinde și ajustările)."""
+    if frame is None or frame.empty or 'Close' not in frame.columns:
+        return None
+    close = pd.to_numeric(frame['Close'], errors='coerce')
+    return (
+        len(frame),
+        str(frame.index[0])[:10],
+        str(frame.index[-1])[:10],
+        round(float(close.sum()), 6),
+    )
+
+
+def batch_latest_indicators(histories, benchmark_close=None):
+    """Indicatorii pentru {simbol: OHLC}, calculați pe câte un panou per calendar.
+
+    Simbolurile cu exact aceleași ședințe (aceeași bursă) formează un panou,
+    astfel încât ferestrele rulante nu amestecă zile lipsă între piețe.
+    """
+    groups = {}
+    for symbol, frame in histories.items():
+        if frame is None or frame.empty or 'Close' not in frame.columns:
+            continue
+        index = _session_index(frame.index)
+        groups.setdefault(index.asi8.tobytes(), (index, {}))[1][symbol] = frame
+
+    results = []
+    for index, frames in groups.values():
+        def panel(column):
+            return pd.DataFrame(
+                {
+                    symbol: (
+                        pd.to_numeric(frame[column], errors='coerce').to_numpy()
+                        if column in frame.columns
+                        else np.full(len(index), np.nan)
+                    )
+                    for symbol, frame in frames.items()
+                },
+                index=index,
+            )
+        results.append(compute_latest_indicators(
+            panel('High'), panel('Low'), panel('Close'),
+            benchmark_close=benchmark_close,
+        ))
+    if not results:
+        return pd.DataFrame(columns=INDICATOR_FIELDS, dtype=float)
+    return pd.concat(results)
+
+
+def prime_indicator_cache(histories, benchmark_symbol, benchmark_close=None):
+    """Precalculează indicatorii rulării pentru istoricele deja descărcate."""
+    cache = run_cache('indicators')
+    if cache is None or not histories:
+        return 0
+    latest = batch_latest_indicators(histories, benchmark_close)
+    for symbol, row in latest.iterrows():
+        cache[(symbol, benchmark_symbol)] = (
+            history_fingerprint(histories[symbol]),
+            row.to_dict(),
+        )
+    return len(latest)
+
+
+def latest_indicators(symbol, frame, benchmark_symbol=None, benchmark_close=None):
+    """Indicatorii unui simbol: din panoul rulării dacă istoricul coincide.
+
+    Dacă istoricul analizat diferă de cel din panou (altă sursă, split
+    corectat), indicatorii sunt calculați pe un panou cu o singură coloană.
+    """
+    cache = run_cache('indicators')
+    if cache is not None:
+        cached = cache.get((symbol, benchmark_symbol))
+        if cached and cached[0] == history_fingerprint(frame):
+            return dict(cached[1])
+    latest = batch_latest_indicators({symbol: frame}, benchmark_close)
+    if latest.empty:
+        return {field: np.nan for field in INDICATOR_FIELDS}
+    return latest.iloc[0].to_dict()
+
+
+# Istoricul OHLCV zilnic descărcat de pe Yahoo rămâne pe disc între rulări,
+# astfel încât o rulare obișnuită cere doar ședințele noi.
+HISTORY_STORE_FILE = 'yahoo_history.sqlite'
+HISTORY_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+_HISTORY_STORES = {}
+_HISTORY_STORES_LOCK = threading.Lock()
+
+
+class HistoryStore:
+    """Bare zilnice per simbol într-o bază SQLite, sigură între fire.
+
+    Pentru fiecare simbol se reține și câte zile de istoric au fost descărcate
+    complet (covered_days) și momentul ultimei verificări la sursă. Aceeași
+    bază păstrează fundamentalele Yahoo, pe grupuri de câmpuri cu momentul
+    descărcării fiecărui grup, și rezultatul verificării variantelor de
+    simbol (SXRZ -> SXRZ.DE).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbol, day)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS symbols (
+                    symbol TEXT PRIMARY KEY,
+                    covered_days INTEGER NOT NULL,
+                    checked_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS fundamentals (
+                    symbol TEXT NOT NULL,
+                    field_group TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (symbol, field_group)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS symbol_probes (
+                    symbol TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    candidate TEXT NOT NULL,
+                    failures INTEGER NOT NULL,
+                    checked_at REAL NOT NULL,
+                    PRIMARY KEY (symbol, kind, candidate)
+                ) WITHOUT ROWID;
+                """
+            )
+
+    def load(self, symbol):
+        """(cadru OHLCV, metadate) sau (cadru gol, None) dacă simbolul lipsește."""
+        with self._lock:
+            meta = self._conn.execute(
+                'SELECT covered_days, checked_at FROM symbols WHERE symbol = ?',
+                (symbol,),
+            ).fetchone()
+            rows = self._conn.execute(
+                'SELECT day, open, high, low, close, volume FROM bars '
+                'WHERE symbol = ? ORDER BY day',
+                (symbol,),
+            ).fetchall()
+        if meta is None or not rows:
+            return pd.DataFrame(), None
+        frame = pd.DataFrame.from_records(
+            rows, columns=('Date',) + HISTORY_COLUMNS
+        )
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop('Date')), name='Date')
+        return frame, {'covered_days': meta[0], 'checked_at': meta[1]}
+
+    def write(self, symbol, frame, covered_days=None, replace=False, checked_at=None):
+        """Adaugă (sau, cu replace, rescrie) barele unui simbol.
+
+        covered_days se dă doar pentru descărcările complete; altfel acoperirea
+        înregistrată rămâne cea existentă.
+        """
+        values = frame.reindex(columns=HISTORY_COLUMNS)
+        values = values.astype(float).where(values.notna(), None)
+        rows = [
+            (symbol, day.strftime('%Y-%m-%d'), *record)
+            for day, record in zip(values.index, values.itertuples(index=False))
+        ]
+        checked_at = time.time() if checked_at is None else checked_at
+        with self._lock, self._conn:
+            if replace:
+                self._conn.execute('DELETE FROM bars WHERE symbol = ?', (symbol,))
+            if rows:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO bars '
+                    '(symbol, day, open, high, low, close, volume) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    rows,
+                )
+            self._conn.execute(
+                'INSERT INTO symbols (symbol, covered_days, checked_at) '
+                'VALUES (?, ?, ?) ON CONFLICT(symbol) DO UPDATE SET '
+                'covered_days = coalesce(?, covered_days), '
+                'checked_at = excluded.checked_at',
+                (symbol, int(covered_days or 0), checked_at, covered_days),
+            )
+
+    def load_fundamentals(self, symbol):
+        """{grup: (câmpuri, fetched_at)} pentru simbol; gol dacă lipsește."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT field_group, payload, fetched_at FROM fundamentals '
+                'WHERE symbol = ?',
+                (symbol,),
+            ).fetchall()
+        groups = {}
+        for field_group, payload, fetched_at in rows:
+            try:
+                fields = json.loads(payload)
+            except ValueError:
+                continue
+            if isinstance(fields, dict):
+                groups[field_group] = (fields, fetched_at)
+        return groups
+
+    def write_fundamentals(self, symbol, groups, fetched_at=None):
+        """Rescrie grupurile de câmpuri date, toate cu același fetched_at."""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        rows = [
+            (symbol, field_group, json.dumps(fields, default=str), fetched_at)
+            for field_group, fields in groups.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO fundamentals '
+                '(symbol, field_group, payload, fetched_at) VALUES (?, ?, ?, ?)',
+                rows,
+            )
+
+    def load_resolutions(self, symbol, kind):
+        """{variantă: (eșecuri consecutive, checked_at)}; 0 eșecuri = validă."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT candidate, failures, checked_at FROM symbol_probes '
+                'WHERE symbol = ? AND kind = ?',
+                (symbol, kind),
+            ).fetchall()
+        return {candidate: (failures, checked_at) for candidate, failures, checked_at in rows}
+
+    def record_resolution(self, symbol, kind, candidate, ok, checked_at=None):
+        """Marchează varianta validă sau mai adaugă un eșec consecutiv."""
+        checked_at = time.time() if checked_at is None else checked_at
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO symbol_probes '
+                '(symbol, kind, candidate, failures, checked_at) '
+                'VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(symbol, kind, candidate) DO UPDATE SET '
+                'failures = CASE WHEN ? THEN 0 ELSE failures + 1 END, '
+                'checked_at = excluded.checked_at',
+                (symbol, kind, candidate, 0 if ok else 1, checked_at,
+                 int(bool(ok))),
+            )
+
+    def prune(self, now=None):
+        """Șterge barele din afara ferestrei acoperite; întoarce câte au fost șterse.
+
+        Pentru fiecare simbol rămân barele din ultimele covered_days zile până
+        la ultima bară, exact cât taie _slice_period pentru cea mai lungă
+        perioadă descărcată complet. Simbolurile neverificate de mai mult de
+        covered_days (ieșite din watchlist) dispar cu totul și vor fi
+        descărcate complet dacă revin. SQLite refolosește paginile eliberate,
+        deci fișierul nu mai crește de la o rulare la alta.
+        """
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            symbols = self._conn.execute(
+                'SELECT s.symbol, s.covered_days, s.checked_at, max(b.day) '
+                'FROM symbols s JOIN bars b ON b.symbol = s.symbol '
+                'WHERE s.covered_days > 0 GROUP BY s.symbol'
+            ).fetchall()
+            idle, windows = [], []
+            for symbol, covered_days, checked_at, last_day in symbols:
+                if now - checked_at > covered_days * 86400:
+                    idle.append((symbol,))
+                    continue
+                cutoff = pd.Timestamp(last_day) - pd.Timedelta(days=covered_days)
+                windows.append((symbol, cutoff.strftime('%Y-%m-%d')))
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'DELETE FROM bars WHERE symbol = ? AND day <= ?', windows
+            )
+            self._conn.executemany('DELETE FROM bars WHERE symbol = ?', idle)
+            removed = self._conn.total_changes - before
+            self._conn.executemany('DELETE FROM symbols WHERE symbol = ?', idle)
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def history_store(path=None):
+    """Magazinul de istoric pentru fișierul dat, deschis o singură dată."""
+    path = path or HISTORY_STORE_FILE
+    with _HISTORY_STORES_LOCK:
+        store = _HISTORY_STORES.get(path)
+        if store is None:
+            store = HistoryStore(path)
+            _HISTORY_STORES[path] = store
+        return store
+
+
+# Simbolurile din portofoliu/watchlist vin din IBKR și nu au mereu sufixul
+# bursei Yahoo (SXRZ există doar ca SXRZ.DE). Varianta găsită și variantele
+# moarte sunt reținute în magazinul de istoric, separat pe tip de sondare
+# (istoric, nume), ca rulările următoare să nu mai sondeze aceleași 404-uri.
+SYMBOL_ALTERNATE_SUFFIXES = ('.DE', '.PA', '.L', '.AS', '.MI', '.MC')
+SYMBOL_ALIASES = {'LQQ.FR': 'LQQ.PA', 'FR.LQQ': 'LQQ.PA'}
+# O variantă e considerată moartă abia după ce sursa a confirmat lipsa ei în
+# rulări consecutive (cel mult un eșec pe rulare), ca o eroare trecătoare să
+# nu mute simbolul pe altă bursă.
+SYMBOL_DEAD_AFTER_FAILURES = 2
+SYMBOL_RETRY_BASE_HOURS = 12.0
+SYMBOL_RETRY_MAX_DAYS = 30.0
+_SYMBOL_RESOLUTION_LOCK = threading.Lock()
+
+
+class SymbolNotFound(LookupError):
+    """Sursa a confirmat că varianta nu are date (nu o eroare trecătoare)."""
+
+
+def yahoo_symbol(ticker):
+    """Simbolul Yahoo corespunzător unui ticker din portofoliu/watchlist."""
+    symbol = str(ticker or '').strip().upper()
+    if symbol.endswith('.US'):
+        symbol = symbol[:-3]
+    return SYMBOL_ALIASES.get(symbol, symbol)
+
+
+def _symbol_resolutions(symbol, kind):
+    store = run_history_store()
+    if store is not None:
+        return store.load_resolutions(symbol, kind)
+    memo = run_cache('symbol_resolutions')
+    if memo is None:
+        return {}
+    with _SYMBOL_RESOLUTION_LOCK:
+        return dict(memo.get((symbol, kind), {}))
+
+
+def _record_symbol_resolution(symbol, kind, candidate, ok, now=None):
+    """Înregistrează rezultatul; un eșec contează o singură dată pe rulare."""
+    now = time.time() if now is None else now
+    failed = run_cache('symbol_failures')
+    if failed is None:
+        return
+    with _SYMBOL_RESOLUTION_LOCK:
+        key = (symbol, kind, candidate)
+        if not ok:
+            if key in failed:
+                return
+            failed[key] = now
+    store = run_history_store()
+    if store is not None:
+        store.record_resolution(symbol, kind, candidate, ok, checked_at=now)
+        return
+    memo = run_cache('symbol_resolutions')
+    with _SYMBOL_RESOLUTION_LOCK:
+        entries = memo.setdefault((symbol, kind), {})
+        failures = 0 if ok else entries.get(candidate, (0, now))[0] + 1
+        entries[candidate] = (failures, now)
+
 
+def _symbol_in_backoff(entry, now):
+    """True cât timp o variantă moartă nu trebuie sondată din nou."""
+    if entry is None:
+        return False
+    failures, checked_at = entry
+    if failures < SYMBOL_DEAD_AFTER_FAILURES:
+        return False
+    hours = SYMBOL_RETRY_BASE_HOURS * 2 ** (failures - SYMBOL_DEAD_AFTER_FAILURES)
+    hours = min(hours, SYMBOL_RETRY_MAX_DAYS * 24)
+    return now - checked_at < hours * 3600
+
+
+def symbol_candidates(ticker, kind='history', now=None):
+    """Variantele Yahoo de încercat pentru ticker, în ordinea sondării.
+
+    Simbolul de bază vine primul; sufixele europene se încearcă doar pentru
+    simbolurile fără bursă explicită, cele deja confirmate înaintea celorlalte.
+    Variantele moarte sunt omise până la expirarea backoff-ului exponențial.
+    """
+    symbol = yahoo_symbol(ticker)
+    if not symbol:
+        return []
+    now = time.time() if now is None else now
+    candidates = [symbol]
+    if '.' not in symbol and not symbol.startswith('^'):
+        candidates += [f"{symbol}{suffix}" for suffix in SYMBOL_ALTERNATE_SUFFIXES]
+    known = _symbol_resolutions(symbol, kind)
+    candidates = [c for c in candidates if not _symbol_in_backoff(known.get(c), now)]
+
+    def order(candidate):
+        if candidate == symbol:
+            return 0
+        return 1 if known.get(candidate, (1,))[0] == 0 else 2
+
+    return sorted(candidates, key=order)
+
+
+def resolved_symbol(ticker, kind='history', now=None):
+    """Simbolul Yahoo de folosit fără sondare: varianta confirmată dacă baza e moartă."""
+    symbol = yahoo_symbol(ticker)
+    candidates = symbol_candidates(symbol, kind=kind, now=now)
+    if not candidates or candidates[0] == symbol:
+        return symbol
+    known = _symbol_resolutions(symbol, kind)
+    if known.get(candidates[0], (1,))[0] == 0:
+        return candidates[0]
+    return symbol
+
+
+def resolve_symbol(ticker, probe, kind='history', candidates=None):
+    """Sondează variantele până când probe întoarce un rezultat nevid.
+
+    Întoarce (varianta, rezultat) sau (None, None). Succesul confirmă
+    varianta pentru tipul de sondare dat. Doar SymbolNotFound (lipsa
+    confirmată de sursă) o apropie de backoff; celelalte excepții și
+    rezultatele goale sunt tratate ca erori trecătoare și nu se înregistrează.
+    Variantele confirmate lipsă mai devreme în aceeași rulare sunt omise.
+    candidates restrânge lista din symbol_candidates.
+    """
+    symbol = yahoo_symbol(ticker)
+    if candidates is None:
+        candidates = symbol_candidates(symbol, kind=kind)
+    failed = run_cache('symbol_failures')
+    for candidate in candidates:
+        if failed is not None and (symbol, kind, candidate) in failed:
+            continue
+        try:
+            result = probe(candidate)
+        except SymbolNotFound:
+            _record_symbol_resolution(symbol, kind, candidate, False)
+            continue
+        except Exception:
+            continue
+        empty = result is None or (
+            result.empty if hasattr(result, 'empty') else not result
+        )
+        if not empty:
+            _record_symbol_resolution(symbol, kind, candidate, True)
+            return candidate, result
+    return None, None
+
+
+def map_bounded(func, items, max_workers=1):
+    """Aplică func pe fiecare element cu cel mult max_workers fire.
+
+    Rezultatele păstrează ordinea intrării, indiferent de ordinea în care se
+    termină cererile. Cu un singur worker rularea rămâne secvențială.
+    """
+    items = list(items)
+    workers = max(1, min(int(max_workers or 1), len(items)))
+    if workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix='market-scanner'
+    ) as executor:
+        return list(executor.map(func, items))
+
+
+def _start_daemon_task(name, func):
+    """Pornește func pe un fir daemon și întoarce Future-ul rezultatului."""
+    future = Future()
+
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    threading.Thread(
+        target=target, name=f'market-scanner-{name}', daemon=True
+    ).start()
+    return future
+
+
+def run_with_deadline(tasks, timeout=None):
+    """Rulează în paralel sarcinile {nume: func} cu un termen comun.
+
+    Întoarce {nume: rezultat} doar pentru sarcinile terminate cu succes până
+    la termen; celelalte sunt raportate și omise. Firele sunt daemon: cele
+    rămase în urmă nu blochează nici apelantul, nici ieșirea interpretorului
+    (ThreadPoolExecutor le-ar aștepta la exit).
+    """
+    if not tasks:
+        return {}
+    futures = {
+        name: _start_daemon_task(name, func) for name, func in tasks.items()
+    }
+    done, _ = wait(futures.values(), timeout=timeout)
+    results = {}
+    for name, future in futures.items():
+        if future not in done:
+            print(f"  ⚠ {name}: termenul de {timeout:g}s a expirat")
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            print(f"  ⚠ Eroare {name}: {str(e)[:40]}")
+    return results
+
+_FINVIZ_SNAPSHOT_ROWS = etree.XPath(
+    "//tr[contains(concat(' ', normalize-space(@class), ' '), ' table-dark-row ')]"
+)
+
+
+def _finviz_float(value, strip=''):
+    value = value.strip()
+    if not value or value == '-':
+        return None
+    for char in strip:
+        value = value.replace(char, '')
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _finviz_company_from_title(page_title):
+    # Titlul Finviz: "AAPL - Apple Inc. Stock Price and Quote" -> "Apple Inc."
+    if not page_title or '-' not in page_title:
+        return None
+    company_part = page_title.split('-', 1)[1].strip()
+    for stopper in ["Stock Price", "Quote", "|"]:
+        if stopper in company_part:
+            company_part = company_part.split(stopper)[0].strip()
+    return company_part or None
+
+
+def _parse_finviz_quote(text):
+    """Extrage Target, ATR, volatilitatea și numele companiei din pagina quote.
+
+    Citește direct cu lxml doar rândurile tabelului snapshot și titlul, fără a
+    construi un arbore BeautifulSoup pentru toată pagina.
+    """
+    data = {'Target': None, 'ATR': None, 'VolW': None, 'VolM': None}
+    try:
+        root = lxml_html.document_fromstring(text)
+    except (etree.ParserError, ValueError):
+        return data
+
+    for row in _FINVIZ_SNAPSHOT_ROWS(root):
+        texts = [cell.text_content() for cell in row.iter('td')]
+        for label, value in zip(texts, texts[1:]):
+            if 'Target Price' in label:
+                target = _finviz_float(value, '$,')
+                if target is not None:
+                    data['Target'] = target
+            elif 'ATR' in label: # ATR defaults to ATR 14 in finviz
+                atr = _finviz_float(value)
+                if atr is not None:
+                    data['ATR'] = atr
+            elif 'Volatility' in label:
+                # Format: "1.50% 2.05%" (Week Month)
+                parts = value.split()
+                if len(parts) >= 2:
+                    week = _finviz_float(parts[0], '%')
+                    month = _finviz_float(parts[1], '%')
+                    if week is not None and month is not None:
+                        data['VolW'], data['VolM'] = week, month
+
+    company = _finviz_company_from_title(root.findtext('.//title'))
+    if company:
+        data['Company'] = company
+    return data
+
+
+def _fetch_finviz_quote(ticker):
+    """Descarcă și parsează pagina Finviz; întoarce (date, succes)."""
     data = {'Target': None, 'ATR': None, 'VolW': None, 'VolM': None}
     try:
         # Elimină sufixe pentru tickere europene (de ex: .DE)
@@ -24,72 +934,200 @@ def get_finviz_data(ticker):
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         }
         
+        throttle_host('finviz.com')
         response = requests.get(url, headers=headers, timeout=10)
         if response.status_code != 200:
-            _finviz_cache[ticker] = data # Cache empty data on failure
-            return data
-            
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Găsim tabelul cu datele fundamentale
-        rows = soup.find_all('tr', class_='table-dark-row')
-        
-        for row in rows:
-            cells = row.find_all('td')
-            for i, cell in enumerate(cells):
-                txt = cell.get_text()
-                if i + 1 >= len(cells): continue
-                
-                val_txt = cells[i+1].get_text().strip()
-                
-                if 'Target Price' in txt:
-                    try:
-                        if val_txt and val_txt != '-':
-                            data['Target'] = float(val_txt.replace('$', '').replace(',', ''))
-                    except: pass
-                elif 'ATR' in txt: # ATR defaults to ATR 14 in finviz
-                     try:
-                        if val_txt and val_txt != '-':
-                             data['ATR'] = float(val_txt)
-                     except: pass
-                elif 'Volatility' in txt:
-                     # Format: "1.50% 2.05%" (Week Month)
-                     try:
-                         parts = val_txt.split()
-                         if len(parts) >= 2:
-                             data['VolW'] = float(parts[0].replace('%', ''))
-                             data['VolM'] = float(parts[1].replace('%', ''))
-                     except: pass
-        
-        # Extract Company Name from Title (Format: "TICKER - Company Name Stock Price...")
+            return data, False
+        return _parse_finviz_quote(response.text), True
+    except Exception as e:
+        print(f"  ⚠ Eroare Finviz pentru {ticker}: {str(e)[:50]}")
+        return data, False
+
+
+# Cache persistent Finviz. Toate câmpurile vin din aceeași pagină, deci o
+# cerere le reîmprospătează împreună: intrarea are un singur TTL, cel al
+# câmpurilor zilnice (ATR/volatilitate). După expirare valorile mai pot fi
+# servite FINVIZ_STALE_GRACE_HOURS, timp în care sunt reîmprospătate în fundal;
+# dacă reîmprospătarea eșuează, se servesc ultimele valori cunoscute.
+FINVIZ_CACHE_FILE = 'finviz_cache.json'
+FINVIZ_CACHE_VERSION = 2
+FINVIZ_FIELDS = ('Target', 'ATR', 'VolW', 'VolM', 'Company')
+FINVIZ_TTL_HOURS = 12.0
+FINVIZ_STALE_GRACE_HOURS = 48.0
+FINVIZ_NEGATIVE_TTL_HOURS = 6.0
+FINVIZ_REVALIDATE_WORKERS = 2
+_FINVIZ_STORE = None
+_FINVIZ_STORE_PATH = None
+_FINVIZ_STORE_DIRTY = False
+_FINVIZ_STORE_LOCK = threading.RLock()
+_FINVIZ_REVALIDATIONS = {}
+_FINVIZ_EXECUTOR = None
+
+
+def _finviz_store(path=None):
+    """Intrările persistente, încărcate o singură dată per fișier."""
+    global _FINVIZ_STORE, _FINVIZ_STORE_PATH, _FINVIZ_STORE_DIRTY
+    path = path or FINVIZ_CACHE_FILE
+    with _FINVIZ_STORE_LOCK:
+        if _FINVIZ_STORE is not None and _FINVIZ_STORE_PATH == path:
+            return _FINVIZ_STORE
+        entries = {}
         try:
-            page_title = soup.title.string
-            if page_title and '-' in page_title:
-                # Split by first hyphen
-                parts = page_title.split('-', 1)
-                if len(parts) > 1:
-                    # Take the part after hyphen, remove "Stock Price..."
-                    company_part = parts[1].strip()
-                    # Finviz title usually: "AAPL - Apple Inc. Stock Price..."
-                    # We want "Apple Inc."
-                    # Let's split by "Stock Price" or quote or just take the first meaningful chunk
-                    # Simple heuristic: take everything until "Stock" or "Quote"
-                    for stopper in ["Stock Price", "Quote", "|"]:
-                        if stopper in company_part:
-                            company_part = company_part.split(stopper)[0].strip()
-                    
-                    if company_part:
-                         data['Company'] = company_part
-        except Exception as e:
-            # print(f"  [Debug] Helper Title parse error: {e}")
-            pass
-        
+            with open(path, 'r', encoding='utf-8') as handle:
+                payload = json.load(handle)
+            if (
+                isinstance(payload, dict)
+                and payload.get('version') == FINVIZ_CACHE_VERSION
+                and isinstance(payload.get('entries'), dict)
+            ):
+                entries = payload['entries']
+        except (OSError, ValueError, TypeError):
+            entries = {}
+        _FINVIZ_STORE = entries
+        _FINVIZ_STORE_PATH = path
+        _FINVIZ_STORE_DIRTY = False
+        return _FINVIZ_STORE
+
+
+def _finviz_entry_status(entry, now):
+    """'fresh', 'stale' (servit și reîmprospătat în fundal) sau 'expired'."""
+    fetched_at = (entry or {}).get('fetched_at')
+    if not fetched_at:
+        return 'expired'
+    age_hours = (now - float(fetched_at)) / 3600
+    if age_hours >= FINVIZ_TTL_HOURS + FINVIZ_STALE_GRACE_HOURS:
+        return 'expired'
+    if age_hours >= FINVIZ_TTL_HOURS:
+        return 'stale'
+    return 'fresh'
+
+
+def _finviz_entry_values(entry):
+    """Ultimele valori cunoscute ale intrării (câmpuri None dacă lipsesc)."""
+    data = {'Target': None, 'ATR': None, 'VolW': None, 'VolM': None}
+    data.update((entry or {}).get('values') or {})
+    return data
+
+
+def _store_finviz_result(ticker, data, ok, now=None):
+    global _FINVIZ_STORE_DIRTY
+    now = now or time.time()
+    with _FINVIZ_STORE_LOCK:
+        store = _finviz_store(_FINVIZ_STORE_PATH)
+        entry = dict(store.get(ticker) or {})
+        if ok:
+            entry['values'] = {
+                field: data.get(field) for field in FINVIZ_FIELDS if field in data
+            }
+            entry['fetched_at'] = now
+            entry.pop('failed_at', None)
+        else:
+            entry['failed_at'] = now
+        store[ticker] = entry
+        _FINVIZ_STORE_DIRTY = True
+
+
+def _revalidate_finviz(ticker):
+    try:
+        data, ok = _fetch_finviz_quote(ticker)
+        _store_finviz_result(ticker, data, ok)
+        if ok:
+            _finviz_cache[ticker] = data
+    finally:
+        with _FINVIZ_STORE_LOCK:
+            _FINVIZ_REVALIDATIONS.pop(ticker, None)
+
+
+def _schedule_finviz_revalidation(ticker):
+    global _FINVIZ_EXECUTOR
+    with _FINVIZ_STORE_LOCK:
+        if ticker in _FINVIZ_REVALIDATIONS:
+            return
+        if _FINVIZ_EXECUTOR is None:
+            _FINVIZ_EXECUTOR = ThreadPoolExecutor(
+                max_workers=FINVIZ_REVALIDATE_WORKERS,
+                thread_name_prefix='finviz-revalidate',
+            )
+        _FINVIZ_REVALIDATIONS[ticker] = _FINVIZ_EXECUTOR.submit(
+            _revalidate_finviz, ticker
+        )
+
+
+def flush_finviz_cache(path=None, wait=True):
+    """Așteaptă reîmprospătările din fundal și scrie atomic cache-ul Finviz."""
+    global _FINVIZ_STORE_DIRTY
+    if wait:
+        with _FINVIZ_STORE_LOCK:
+            pending = list(_FINVIZ_REVALIDATIONS.values())
+        for future in pending:
+            try:
+                future.result()
+            except Exception:
+                pass
+    with _FINVIZ_STORE_LOCK:
+        if _FINVIZ_STORE is None or not _FINVIZ_STORE_DIRTY:
+            return False
+        target = path or _FINVIZ_STORE_PATH or FINVIZ_CACHE_FILE
+        temp_path = f"{target}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as handle:
+                json.dump(
+                    {'version': FINVIZ_CACHE_VERSION, 'entries': _FINVIZ_STORE},
+                    handle,
+                    separators=(',', ':'),
+                    sort_keys=True,
+                )
+            os.replace(temp_path, target)
+        except OSError as exc:
+            print(f"  ⚠ Cache-ul Finviz nu a putut fi salvat: {exc}")
+            return False
+        _FINVIZ_STORE_DIRTY = False
+        return True
+
+
+def get_finviz_data(ticker):
+    """Preia datele fundamentale de pe Finviz (Target, ATR, Volatility) cu caching.
+
+    Ordinea: cache-ul din proces, apoi cache-ul persistent (proaspăt sau
+    stale-while-revalidate), apoi rețeaua. Eșecurile recente nu sunt reîncercate
+    timp de FINVIZ_NEGATIVE_TTL_HOURS; când rețeaua eșuează se întorc ultimele
+    valori cunoscute ale tickerului.
+    """
+    if ticker in _finviz_cache:
+        # print(f"  [Cache] Finviz data for {ticker}") # Uncomment for debugging cache hits
+        return _finviz_cache[ticker]
+
+    now = time.time()
+    with _FINVIZ_STORE_LOCK:
+        entry = _finviz_store(_FINVIZ_STORE_PATH).get(ticker)
+    status = _finviz_entry_status(entry, now)
+    failed_at = (entry or {}).get('failed_at')
+    recently_failed = bool(
+        failed_at
+        and (now - float(failed_at)) / 3600 < FINVIZ_NEGATIVE_TTL_HOURS
+    )
+    if status == 'fresh':
+        data = _finviz_entry_values(entry)
         _finviz_cache[ticker] = data
         return data
-    except Exception as e:
-        print(f"  ⚠ Eroare Finviz pentru {ticker}: {str(e)[:50]}")
+    if status == 'stale':
+        data = _finviz_entry_values(entry)
+        _finviz_cache[ticker] = data
+        if not recently_failed:
+            _schedule_finviz_revalidation(ticker)
+        return data
+    if recently_failed:
+        data = _finviz_entry_values(entry)
+        _finviz_cache[ticker] = data
         return data
 
+    data, ok = _fetch_finviz_quote(ticker)
+    _store_finviz_result(ticker, data, ok, now=now)
+    if not ok:
+        data = _finviz_entry_values(entry)
+    _finviz_cache[ticker] = data
+    return data
+
 def get_scalar(series_val, default=0.0):
     """Helper pentru extragerea valorilor scalare."""
     try:
@@ -132,12 +1170,112 @@ def get_exchange_rates():
         print(f"Eroare curs valutar: {e}. Folosim fallback.")
     return rates
 
+class StateIndex:
+    """Indexuri ticker → înregistrare peste listele din state.
+
+    Fiecare secțiune este indexată la primul acces și reindexată automat când
+    lista din state este înlocuită, își schimbă lungimea sau versiunea. O
+    înregistrare se înlocuiește în listă doar prin replace(), care crește
+    versiunea secțiunii; după o atribuire directă records[i] = ..., apelați
+    invalidate(). La duplicate, get() întoarce prima înregistrare (ca
+    deduplicarea dinaintea salvării), iar mapping() păstrează ultima, ca
+    dicționarele construite din listă.
+    """
+
+    KEY_FIELDS = {
+        'watchlist': 'Ticker',
+        'external_buy_research': 'Ticker',
+        'portfolio': 'Symbol',
+    }
+
+    def __init__(self, state):
+        self.state = state
+        self._indexes = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(ticker):
+        return str(ticker or '').strip().upper()
+
+    def _section(self, section):
+        """(prima, ultima) înregistrare per ticker pentru secțiune."""
+        records = self.state.get(section)
+        if not isinstance(records, list):
+            records = []
+        with self._lock:
+            version = self._versions.get(section, 0)
+            cached = self._indexes.get(section)
+            if (
+                cached is not None
+                and cached[0] is records
+                and cached[1] == len(records)
+                and cached[2] == version
+            ):
+                return cached[3]
+            key_field = self.KEY_FIELDS[section]
+            first, last = {}, {}
+            for record in records:
+                if not isinstance(record, dict):
+                    continue
+                key = self._normalize(record.get(key_field))
+                if key:
+                    first.setdefault(key, record)
+                    last[key] = record
+            self._indexes[section] = (
+                records, len(records), version, (first, last)
+            )
+            return first, last
+
+    def invalidate(self, section):
+        """Marchează secțiunea drept modificată; următorul acces o reindexează."""
+        with self._lock:
+            self._versions[section] = self._versions.get(section, 0) + 1
+
+    def replace(self, section, record):
+        """Înlocuiește în loc înregistrările cu același ticker (sau o adaugă).
+
+        Toate aparițiile tickerului din listă devin record, deci get() și
+        mapping() îl întorc imediat.
+        """
+        key = self._normalize(record.get(self.KEY_FIELDS[section]))
+        records = self.state.get(section)
+        if not isinstance(records, list):
+            records = self.state[section] = []
+        positions = [
+            position for position, item in enumerate(records)
+            if isinstance(item, dict)
+            and self._normalize(item.get(self.KEY_FIELDS[section])) == key
+        ]
+        for position in positions:
+            records[position] = record
+        if not positions:
+            records.append(record)
+        self.invalidate(section)
+
+    def get(self, section, ticker):
+        return self._section(section)[0].get(self._normalize(ticker))
+
+    def mapping(self, section):
+        """Copie a dicționarului ticker → ultima înregistrare a secțiunii."""
+        return dict(self._section(section)[1])
+
+
+def state_index(state):
+    """StateIndex comun pentru state în rularea curentă; nou în afara ei."""
+    indexes = run_cache('state_index')
+    if indexes is None:
+        return StateIndex(state)
+    cached = indexes.get(id(state))
+    if cached is None or cached.state is not state:
+        cached = StateIndex(state)
+        indexes[id(state)] = cached
+    return cached
+
+
 def get_cached_watchlist_ticker(state, ticker):
     """Returnează datele cached pentru un ticker din watchlist, dacă există."""
-    for item in state.get('watchlist', []):
-        if item.get('Ticker') == ticker:
-            return item
-    return None
+    return state_index(state).get('watchlist', ticker)
 
 def is_fresh(ticker_data, ttl_hours=5):
     """Verifică dacă datele ticker-ului sunt fresh (mai noi de TTL)."""
@@ -28,6 +28,7 @@ from Crypto.Random import get_random_bytes
 from base64 import b64encode
 import json
 import copy
+import threading
 import unicodedata
 import hashlib
 import hmac
@@ -83,6 +84,11 @@ BVB_SHARES_CSV_URL = (
 ROMANIAN_UNIVERSE_SOURCE_URL = BVB_SHARES_CSV_URL
 BVB_DEEP_SCAN_BATCH = 50
 US_DEEP_SCAN_BATCH = 70
+# Numărul implicit de tickere din watchlist procesate simultan; poate fi
+# suprascris prin MARKET_SCANNER_WORKERS (1 = rulare secvențială).
+WATCHLIST_REFRESH_WORKERS = 4
+# Câte simboluri intră într-un singur yf.download multi-ticker la prefetch.
+YAHOO_PREFETCH_CHUNK_SIZE = 40
 EXTERNAL_RESEARCH_MIN_RR = 1.8
 BUY_FINALIST_TTL_HOURS = 1.0
 EXTERNAL_RESEARCH_TTL_HOURS = 5.0
@@ -383,6 +389,120 @@ def _known_fund_profile(symbol):
     return KNOWN_FUND_PROFILES.get(_canonical_fund_symbol(symbol))
 
 
+# Câmpurile folosite din yf.Ticker(...).info, pe grupuri cu termene diferite:
+# profilul (nume, sector, industrie) se schimbă rar; ținta și numărul de
+# analiști rămân zilnice, ca înainte. Grupul 'quote' vine și din endpointul
+# v7 multi-simbol (prefetch_yahoo_quotes). La expirare se cer din
+# quoteSummary numai modulele grupurilor expirate, nu tot profilul.
+YAHOO_INFO_FIELD_GROUPS = {
+    'profile': ('longName', 'shortName', 'sector', 'industry'),
+    'quote': ('recommendationKey', 'averageVolume'),
+    'analyst': ('numberOfAnalystOpinions', 'targetMeanPrice'),
+}
+YAHOO_INFO_FIELD_MODULES = {
+    'longName': 'price',
+    'shortName': 'price',
+    'sector': 'assetProfile',
+    'industry': 'assetProfile',
+    'recommendationKey': 'financialData',
+    'averageVolume': 'summaryDetail',
+    'numberOfAnalystOpinions': 'financialData',
+    'targetMeanPrice': 'financialData',
+}
+YAHOO_INFO_TTL_HOURS = {'profile': 24 * 30, 'quote': 24, 'analyst': 24}
+YAHOO_QUOTE_URL = 'https://query1.finance.yahoo.com/v7/finance/quote'
+YAHOO_SUMMARY_URL = 'https://query2.finance.yahoo.com/v10/finance/quoteSummary/'
+YAHOO_QUOTE_CHUNK_SIZE = 50
+
+
+def _stored_yahoo_info(stored):
+    info = {}
+    for group in YAHOO_INFO_FIELD_GROUPS:
+        if group in stored:
+            info.update(stored[group][0])
+    return info
+
+
+def _yahoo_info_is_fresh(stored, group, now):
+    return (
+        group in stored
+        and now - stored[group][1] < YAHOO_INFO_TTL_HOURS[group] * 3600
+    )
+
+
+def _fetch_yahoo_summary_groups(lookup_symbol, groups):
+    """Grupurile cerute, dintr-un quoteSummary limitat la modulele lor.
+
+    Întoarce None când sesiunea yfinance nu e disponibilă.
+    """
+    modules = sorted({
+        YAHOO_INFO_FIELD_MODULES[field]
+        for group in groups for field in YAHOO_INFO_FIELD_GROUPS[group]
+    })
+    payload = _yahoo_raw_json(
+        YAHOO_SUMMARY_URL + lookup_symbol,
+        params={'modules': ','.join(modules), 'formatted': 'false'},
+    )
+    if payload is None:
+        return None
+    results = ((payload or {}).get('quoteSummary') or {}).get('result') or []
+    summary = results[0] if results else {}
+    fetched = {}
+    for group in groups:
+        fields = {}
+        for field in YAHOO_INFO_FIELD_GROUPS[group]:
+            value = (summary.get(YAHOO_INFO_FIELD_MODULES[field]) or {}).get(field)
+            if isinstance(value, dict):
+                value = value.get('raw')
+            if value is not None and value != {}:
+                fields[field] = value
+        fetched[group] = fields
+    return fetched
+
+
+def _fetch_yahoo_info(lookup_symbol):
+    """Fundamentalele Yahoo ale simbolului: memorie de rulare, disc, apoi rețea."""
+    memo = market_data.run_cache('yahoo_info')
+    if memo is not None and lookup_symbol in memo:
+        return dict(memo[lookup_symbol])
+    store = market_data.run_history_store()
+    stored = store.load_fundamentals(lookup_symbol) if store is not None else {}
+    now = time.time()
+    expired = [
+        group for group in YAHOO_INFO_FIELD_GROUPS
+        if not _yahoo_info_is_fresh(stored, group, now)
+    ]
+    if not expired:
+        info = _stored_yahoo_info(stored)
+    else:
+        try:
+            fetched = _fetch_yahoo_summary_groups(lookup_symbol, expired)
+            if fetched is None:
+                market_data.throttle_host('yahoo')
+                full_info = yf.Ticker(lookup_symbol).info or {}
+                fetched = {
+                    group: {
+                        field: full_info[field] for field in fields
+                        if full_info.get(field) is not None
+                    }
+                    for group, fields in YAHOO_INFO_FIELD_GROUPS.items()
+                } if full_info else {}
+        except Exception:
+            if not stored:
+                raise
+            # Un profil expirat e mai util decât niciunul când Yahoo cade.
+            info = _stored_yahoo_info(stored)
+        else:
+            info = _stored_yahoo_info(stored)
+            for fields in fetched.values():
+                info.update(fields)
+            if store is not None and any(fetched.values()):
+                store.write_fundamentals(lookup_symbol, fetched)
+    if memo is not None:
+        memo[lookup_symbol] = dict(info)
+    return info
+
+
 def _get_yahoo_info(symbol, tws_instrument=None):
     """Evită endpointul de fundamentale pentru ETF-urile cunoscute."""
     fund_profile = _known_fund_profile(symbol)
@@ -405,13 +525,102 @@ def _get_yahoo_info(symbol, tws_instrument=None):
     lookup_symbol = str(symbol or '').strip()
     if lookup_symbol.endswith('.US'):
         lookup_symbol = lookup_symbol[:-3]
-    info = yf.Ticker(lookup_symbol).info or {}
+    info = _fetch_yahoo_info(lookup_symbol)
     info.update({
         key: value for key, value in tws_profile.items() if value
     })
     return info
 
 
+def _parse_yahoo_quote(quote):
+    """Câmpurile grupului 'quote' dintr-un rezultat v7/finance/quote."""
+    fields = {}
+    volume = quote.get('averageDailyVolume3Month')
+    if volume:
+        fields['averageVolume'] = volume
+    # "1.9 - Buy" -> "buy", aceeași cheie ca recommendationKey din quoteSummary.
+    label = str(quote.get('averageAnalystRating') or '').partition(' - ')[2]
+    if label.strip():
+        fields['recommendationKey'] = label.strip().lower().replace(' ', '_')
+    return fields
+
+
+def _yahoo_raw_json(url, params):
+    """GET JSON Yahoo prin sesiunea yfinance (cookie + crumb).
+
+    YfData nu face parte din API-ul public yfinance, deci e importat aici și
+    nu la nivel de modul: dacă o versiune nouă îl mută, funcția întoarce None
+    și apelanții revin la yf.Ticker(...).info.
+    """
+    try:
+        from yfinance.data import YfData
+    except ImportError:
+        return None
+    market_data.throttle_host('yahoo')
+    return YfData().get_raw_json(url, params=params, timeout=15)
+
+
+def _yahoo_quote_json(symbols):
+    """Un request v7/finance/quote; None dacă sesiunea yfinance lipsește."""
+    return _yahoo_raw_json(
+        YAHOO_QUOTE_URL,
+        params={'symbols': ','.join(symbols), 'formatted': 'false'},
+    )
+
+
+def prefetch_yahoo_quotes(symbols, chunk_size=YAHOO_QUOTE_CHUNK_SIZE):
+    """Reîmprospătează în loturi grupul 'quote' al fundamentalelor Yahoo.
+
+    Un request acoperă până la chunk_size simboluri; rezultatele ajung în
+    magazinul persistent, de unde le citește _get_yahoo_info. Sunt omise
+    fondurile cunoscute și simbolurile cu grupul încă valabil. În afara unei
+    rulări cu magazin persistent funcția nu cere nimic. Returnează numărul
+    de simboluri actualizate.
+    """
+    history_store = market_data.run_history_store()
+    if history_store is None:
+        return 0
+    now = time.time()
+    pending = []
+    for symbol in symbols:
+        if not symbol or _known_fund_profile(symbol):
+            continue
+        lookup_symbol = _yahoo_download_symbol(symbol)
+        if lookup_symbol in pending or _yahoo_info_is_fresh(
+            history_store.load_fundamentals(lookup_symbol), 'quote', now
+        ):
+            continue
+        pending.append(lookup_symbol)
+    if not pending:
+        return 0
+
+    loaded = 0
+    requests_made = 0
+    size = max(1, int(chunk_size))
+    for start in range(0, len(pending), size):
+        chunk = pending[start:start + size]
+        requests_made += 1
+        try:
+            payload = _yahoo_quote_json(chunk)
+        except Exception as exc:
+            print(f"  [Prefetch] Lot cotații Yahoo eșuat ({len(chunk)} simboluri): {exc}")
+            continue
+        if payload is None:
+            print("  [Prefetch] Sesiunea yfinance nu expune YfData; cotațiile vin per simbol")
+            break
+        for quote in ((payload or {}).get('quoteResponse') or {}).get('result') or []:
+            lookup_symbol = str(quote.get('symbol') or '').upper()
+            fields = _parse_yahoo_quote(quote)
+            if lookup_symbol in chunk and fields:
+                history_store.write_fundamentals(lookup_symbol, {'quote': fields})
+                loaded += 1
+    print(
+        f"  [Prefetch] Cotații Yahoo: {loaded}/{len(pending)} simboluri "
+        f"în {requests_made} cereri"
+    )
+    return loaded
+
+
 def _parse_snapshot_timestamp(value):
     text = str(value or '').strip()
     if not text:
@@ -425,34 +634,75 @@ def _parse_snapshot_timestamp(value):
     return parsed.astimezone(datetime.timezone.utc)
 
 
+_TWS_INSTRUMENT_STORES = {}
+_TWS_INSTRUMENT_STORES_LOCK = threading.Lock()
+
+
+def _tws_instrument_store(path=TWS_INSTRUMENTS_FILE):
+    """Snapshotul TWS parsat o singură dată și indexat după aliasuri.
+
+    Indexul este reconstruit numai când se schimbă mtime-ul sau dimensiunea
+    fișierului, de exemplu după o sincronizare TWS în timpul rulării.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    cache_key = os.path.abspath(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _TWS_INSTRUMENT_STORES_LOCK:
+        store = _TWS_INSTRUMENT_STORES.get(cache_key)
+        if store is not None and store['signature'] == signature:
+            return store
+        try:
+            with open(path, 'r', encoding='utf-8') as handle:
+                payload = json.load(handle)
+        except (OSError, ValueError, TypeError):
+            return None
+        instruments = (
+            payload.get('instruments', {}) if isinstance(payload, dict) else {}
+        )
+        if not isinstance(instruments, dict):
+            instruments = {}
+        aliases = {}
+        for key, entry in instruments.items():
+            if not isinstance(entry, dict):
+                continue
+            for alias in entry.get('aliases', []):
+                # Primul instrument care declară aliasul câștigă, ca la
+                # vechea căutare liniară.
+                aliases.setdefault(str(alias).upper(), key)
+        store = {
+            'signature': signature,
+            'fetched_at': payload.get('fetched_at'),
+            'instruments': instruments,
+            'aliases': aliases,
+            'entry_ids': {
+                id(entry): key for key, entry in instruments.items()
+            },
+            'frames': {},
+        }
+        _TWS_INSTRUMENT_STORES[cache_key] = store
+        return store
+
+
 def _load_tws_instrument(
     symbol, path=TWS_INSTRUMENTS_FILE, now=None,
     max_age_hours=TWS_INSTRUMENT_TTL_HOURS,
 ):
     """Încarcă un snapshot TWS proaspăt, inclusiv prin aliasurile dashboardului."""
-    try:
-        with open(path, 'r', encoding='utf-8') as handle:
-            payload = json.load(handle)
-    except (OSError, ValueError, TypeError):
+    store = _tws_instrument_store(path)
+    if store is None:
         return None
-    instruments = payload.get('instruments', {})
+    instruments = store['instruments']
     normalized = str(symbol or '').strip().upper()
     entry = instruments.get(normalized)
     if not isinstance(entry, dict):
-        entry = next(
-            (
-                candidate for candidate in instruments.values()
-                if normalized in {
-                    str(alias).upper()
-                    for alias in candidate.get('aliases', [])
-                }
-            ),
-            None,
-        )
+        entry = instruments.get(store['aliases'].get(normalized))
     if not isinstance(entry, dict) or not entry.get('bars'):
         return None
     fetched_at = _parse_snapshot_timestamp(
-        entry.get('fetched_at') or payload.get('fetched_at')
+        entry.get('fetched_at') or store['fetched_at']
     )
     current_time = now or datetime.datetime.now(datetime.timezone.utc)
     if current_time.tzinfo is None:
@@ -466,8 +716,7 @@ def _load_tws_instrument(
     return entry
 
 
-def _tws_instrument_history_frame(instrument):
-    bars = (instrument or {}).get('bars', [])
+def _tws_bars_frame(bars):
     if not bars:
         return pd.DataFrame()
     frame = pd.DataFrame(bars)
@@ -494,6 +743,23 @@ def _tws_instrument_history_frame(instrument):
     return frame[['Open', 'High', 'Low', 'Close', 'Volume']]
 
 
+def _tws_instrument_history_frame(instrument):
+    """Istoricul OHLCV al instrumentului; conversia se face o dată per snapshot."""
+    bars = (instrument or {}).get('bars', [])
+    if not bars:
+        return pd.DataFrame()
+    for store in list(_TWS_INSTRUMENT_STORES.values()):
+        key = store['entry_ids'].get(id(instrument))
+        if key is None or store['instruments'].get(key) is not instrument:
+            continue
+        frame = store['frames'].get(key)
+        if frame is None:
+            frame = _tws_bars_frame(bars)
+            store['frames'][key] = frame
+        return frame.copy()
+    return _tws_bars_frame(bars)
+
+
 def _merge_ohlcv_histories(*frames):
     """Îmbină istoricele pe ședință; ultima sursă are prioritate."""
     normalized = []
@@ -579,21 +845,343 @@ def _normalize_downloaded_history(frame):
     return normalized
 
 
+# Istoricul din magazinul persistent nu este reverificat la sursă mai des de
+# YAHOO_HISTORY_RECHECK_MINUTES. Intervalul rămâne sub cel al rulărilor de
+# portofoliu (30 de minute), ca fiecare rulare să primească bara zilei curente
+# actualizată, nu bara parțială a rulării anterioare; doar rulările apropiate
+# (mod all + portofoliu) refolosesc istoricul. Delta începe cu câteva zile
+# înaintea ultimei bare stocate: barele comune arată dacă Yahoo a reajustat
+# între timp trecutul.
+YAHOO_HISTORY_RECHECK_MINUTES = 20
+YAHOO_DELTA_OVERLAP_DAYS = 7
+
+
+def _yf_download(tickers, **kwargs):
+    """yf.download serializat cu celelalte descărcări Yahoo ale procesului."""
+    return market_data.yf_download(tickers, **kwargs)
+
+
+def _stored_history_plan(store, symbol, period):
+    """(istoric stocat, acțiune), unde acțiunea este 'fresh', 'delta' sau 'full'."""
+    if store is None:
+        return pd.DataFrame(), 'full'
+    stored, meta = store.load(symbol)
+    days = market_data._PERIOD_DAYS.get(period)
+    if stored.empty or days is None or meta['covered_days'] < days:
+        return stored, 'full'
+    if time.time() - meta['checked_at'] < YAHOO_HISTORY_RECHECK_MINUTES * 60:
+        return stored, 'fresh'
+    return stored, 'delta'
+
+
+def _delta_start(stored):
+    start = stored.index[-1] - pd.Timedelta(days=YAHOO_DELTA_OVERLAP_DAYS)
+    return start.strftime('%Y-%m-%d')
+
+
+def _merge_history_delta(symbol, stored, delta):
+    """Leagă delta de istoricul stocat; întoarce (istoric, rescris).
+
+    Dacă barele comune diferă (Yahoo a ajustat retroactiv un split sau un
+    dividend), istoricul stocat este rescalat cu raportul lor. Split-urile
+    neajustate sunt căutate doar de la granița deltei încolo. (None, True)
+    înseamnă că delta nu se suprapune și trebuie descărcat tot istoricul.
+    """
+    delta = _merge_ohlcv_histories(delta)
+    overlap = stored.index.intersection(delta.index)
+    if overlap.empty:
+        return None, True
+    ratio = float(
+        (stored.loc[overlap, 'Close'] / delta.loc[overlap, 'Close']).median()
+    )
+    if not math.isfinite(ratio) or ratio <= 0:
+        return None, True
+    rewritten = abs(ratio - 1) > 1e-6
+    if rewritten:
+        stored = stored.copy()
+        price_columns = ['Open', 'High', 'Low', 'Close']
+        stored[price_columns] = stored[price_columns] / ratio
+        stored['Volume'] = stored['Volume'] * ratio
+        print(
+            f"  [Istoric] {symbol}: Yahoo a reajustat trecutul "
+            f"(factor {ratio:.4f}), istoricul stocat a fost rescalat"
+        )
+    merged = _merge_ohlcv_histories(stored, delta)
+    first_close = float(merged['Close'].iloc[0])
+    merged = adjust_for_unadjusted_splits(
+        merged, symbol, since=int(merged.index.searchsorted(overlap[0]))
+    )
+    if float(merged['Close'].iloc[0]) != first_close:
+        rewritten = True
+    return merged, rewritten
+
+
+def _store_full_history(store, symbol, history, period):
+    if store is not None and not history.empty:
+        store.write(
+            symbol,
+            _merge_ohlcv_histories(history),
+            covered_days=market_data._PERIOD_DAYS.get(period, 0),
+            replace=True,
+        )
+
+
+def _refresh_stored_history(store, symbol, stored, period, delta):
+    """Aplică delta descărcată peste magazin și întoarce perioada cerută."""
+    delta = _normalize_downloaded_history(delta)
+    if delta.empty:
+        # Sursa nu a răspuns: servim istoricul stocat, reverificat data viitoare.
+        return market_data._slice_period(stored, period)
+    merged, rewritten = _merge_history_delta(symbol, stored, delta)
+    if merged is None:
+        history = _normalize_downloaded_history(
+            _yf_download(symbol, period=period)
+        )
+        _store_full_history(store, symbol, history, period)
+        return history
+    if rewritten:
+        store.write(symbol, merged, replace=True)
+    else:
+        boundary = _merge_ohlcv_histories(delta).index.min()
+        store.write(symbol, merged[merged.index >= boundary])
+    return market_data._slice_period(merged, period)
+
+
 def _download_yahoo_history(symbol, period='1y'):
-    """Yahoo fără mesajele repetitive ale bibliotecii pentru simboluri absente."""
-    import contextlib
-    import io
+    """Istoricul Yahoo zilnic, ajustat, pentru perioada cerută.
+
+    Cu magazinul de istoric activ în rulare, se descarcă doar ședințele de
+    după ultima bară stocată (sau nimic, dacă a fost verificat recent).
+    """
+    store = market_data.run_cache('yahoo_history')
+    key = (str(symbol or '').strip().upper(), period)
+    if store is not None and key in store:
+        return store[key].copy()
+    history_store = market_data.run_history_store()
+    stored, action = _stored_history_plan(history_store, key[0], period)
+    if action == 'fresh':
+        return market_data._slice_period(stored, period)
+    if action == 'delta':
+        return _refresh_stored_history(
+            history_store, key[0], stored, period,
+            _yf_download(symbol, start=_delta_start(stored)),
+        )
+    history = _normalize_downloaded_history(_yf_download(symbol, period=period))
+    _store_full_history(history_store, key[0], history, period)
+    return history
+
+
+def _yahoo_download_symbol(ticker):
+    """Simbolul Yahoo folosit pentru descărcarea istoricului unui ticker."""
+    return market_data.yahoo_symbol(ticker)
+
+
+def _yahoo_symbol_missing(symbol):
+    """True doar dacă Yahoo confirmă că simbolul nu există / nu are prețuri.
+
+    Limitările de rată, erorile de crumb sau de rețea întorc False, ca o
+    pană Yahoo să nu marcheze drept moartă o variantă validă.
+    """
+    try:
+        from yfinance.exceptions import YFTickerMissingError
+    except ImportError:
+        return False
+    try:
+        market_data.throttle_host('yahoo')
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            yf.Ticker(symbol).history(period='5d', raise_errors=True)
+    except YFTickerMissingError:
+        return True
+    except Exception:
+        return False
+    return False
 
-    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
-        io.StringIO()
+
+def _probe_yahoo_history(symbol, period='1y'):
+    """Sondă de istoric pentru market_data.resolve_symbol."""
+    history = _download_yahoo_history(symbol, period=period)
+    if history.empty and _yahoo_symbol_missing(symbol):
+        raise market_data.SymbolNotFound(symbol)
+    return history
+
+
+def _symbol_suffix_currency(symbol, default):
+    """Moneda implicită a unei variante Yahoo după sufixul bursei."""
+    suffix = symbol.rsplit('.', 1)[-1] if '.' in symbol else ''
+    if suffix in {'DE', 'PA', 'AS', 'MI', 'MC'}:
+        return 'EUR'
+    if suffix == 'L':
+        return 'GBP'
+    return default
+
+
+def _batch_ticker_frame(frame, symbol, batch_size):
+    """Extrage un simbol din rezultatul yf.download(group_by='ticker')."""
+    if frame is None or frame.empty:
+        return pd.DataFrame()
+    if isinstance(frame.columns, pd.MultiIndex):
+        if symbol not in frame.columns.get_level_values(0):
+            return pd.DataFrame()
+        selected = frame[symbol]
+    elif batch_size == 1:
+        selected = frame
+    else:
+        return pd.DataFrame()
+    return _normalize_downloaded_history(selected.dropna(how='all'))
+
+
+def _batched_yahoo_download(chunk, **kwargs):
+    """Un singur yf.download pentru lot; {simbol: istoric normalizat}."""
+    try:
+        frame = _yf_download(chunk, group_by='ticker', **kwargs)
+    except Exception as exc:
+        print(f"  [Prefetch] Lot Yahoo eșuat ({len(chunk)} simboluri): {exc}")
+        return {}
+    return {
+        download_ticker: _batch_ticker_frame(frame, download_ticker, len(chunk))
+        for download_ticker in chunk
+    }
+
+
+def prefetch_yahoo_histories(
+    symbols, period='1y', chunk_size=YAHOO_PREFETCH_CHUNK_SIZE,
+):
+    """Descarcă în loturi multi-ticker istoricul Yahoo al simbolurilor scadente.
+
+    Cadrele ajung în magazinul rulării curente, de unde le citește
+    _download_yahoo_history. Sunt omise simbolurile BVB (sursa primară este
+    CSV-ul public) și cele cu istoric TWS proaspăt. Simbolurile aflate deja în
+    magazinul persistent de istoric primesc doar delta de la ultima bară. În
+    afara unei rulări funcția nu descarcă nimic. Returnează numărul de
+    istorice preîncărcate.
+    """
+    store = market_data.run_cache('yahoo_history')
+    if store is None:
+        return 0
+    history_store = market_data.run_history_store()
+    pending = []
+    deltas = {}
+    for symbol in symbols:
+        ticker = str(symbol or '').strip().upper()
+        if not ticker or ticker.endswith('.RO'):
+            continue
+        download_ticker = market_data.resolved_symbol(ticker)
+        if (
+            (download_ticker, period) in store
+            or download_ticker in pending
+            or download_ticker in deltas
+        ):
+            continue
+        if _load_tws_instrument(ticker):
+            continue
+        stored, action = _stored_history_plan(
+            history_store, download_ticker, period
+        )
+        if action == 'fresh':
+            # Verificat recent: intră în rulare direct din magazinul local.
+            store[(download_ticker, period)] = market_data._slice_period(
+                stored, period
+            )
+            continue
+        if action == 'delta':
+            deltas[download_ticker] = stored
+        else:
+            pending.append(download_ticker)
+    if not pending and not deltas:
+        return 0
+
+    loaded = 0
+    requests_made = 0
+    size = max(1, int(chunk_size))
+    for start in range(0, len(pending), size):
+        chunk = pending[start:start + size]
+        requests_made += 1
+        for download_ticker, history in _batched_yahoo_download(
+            chunk, period=period
+        ).items():
+            # Simbolurile lipsă din lot rămân pentru descărcarea individuală.
+            if not history.empty:
+                _store_full_history(
+                    history_store, download_ticker, history, period
+                )
+                store[(download_ticker, period)] = history
+                loaded += 1
+
+    # Deltele sunt grupate după data de start, ca un lot să nu ceară mult
+    # mai multe ședințe decât are nevoie fiecare simbol.
+    delta_symbols = sorted(deltas, key=lambda item: _delta_start(deltas[item]))
+    for start in range(0, len(delta_symbols), size):
+        chunk = delta_symbols[start:start + size]
+        requests_made += 1
+        frames = _batched_yahoo_download(
+            chunk, start=_delta_start(deltas[chunk[0]])
+        )
+        for download_ticker, delta in frames.items():
+            if delta.empty:
+                continue
+            store[(download_ticker, period)] = _refresh_stored_history(
+                history_store, download_ticker, deltas[download_ticker],
+                period, delta,
+            )
+            loaded += 1
+    print(
+        f"  [Prefetch] Istoric Yahoo {period}: {loaded}/"
+        f"{len(pending) + len(deltas)} simboluri ({len(deltas)} doar delta) "
+        f"în {requests_made} cereri"
+    )
+    return loaded
+
+
+def prefetch_bvb_history(symbols):
+    """Completează cache-ul public BVB o dată, înaintea poolului de tickere.
+
+    Firele citesc apoi istoricul .RO din cache-ul deja completat, fără să
+    aștepte fiecare backfillul. Returnează numărul de ședințe descărcate.
+    """
+    if not any(
+        str(symbol or '').strip().upper().endswith('.RO') for symbol in symbols
     ):
-        frame = yf.download(
-            symbol,
-            period=period,
-            auto_adjust=True,
-            progress=False,
+        return 0
+    try:
+        return bvb_public_market_data.backfill()
+    except Exception as exc:
+        print(f"  [BVB] Backfill CSV public eșuat: {exc}")
+        return 0
+
+
+def prime_watchlist_indicators(symbols, period='1y'):
+    """Calculează într-un singur panou indicatorii simbolurilor preîncărcate.
+
+    Folosește istoricele aflate deja în rulare (după prefetch_yahoo_histories)
+    și benchmarkul ^GSPC; process_watchlist_ticker citește apoi rezultatele
+    din cache. Returnează numărul de simboluri calculate.
+    """
+    store = market_data.run_cache('yahoo_history')
+    if store is None:
+        return 0
+    histories = {}
+    for symbol in symbols:
+        ticker = str(symbol or '').strip().upper()
+        if not ticker or ticker.endswith('.RO'):
+            continue
+        download_ticker = market_data.resolved_symbol(ticker)
+        history = store.get((download_ticker, period))
+        if history is not None and not history.empty:
+            histories[download_ticker] = history
+    if not histories:
+        return 0
+    try:
+        benchmark = market_data.get_benchmark_history(
+            '^GSPC', period='3mo', fetch=_download_yahoo_history
         )
-    return _normalize_downloaded_history(frame)
+    except Exception:
+        benchmark = pd.DataFrame()
+    return market_data.prime_indicator_cache(
+        histories,
+        '^GSPC',
+        None if benchmark.empty else benchmark['Close'],
+    )
 
 
 def _load_analysis_history(ticker, download_ticker, period='1y'):
@@ -1987,6 +2575,7 @@ def ensure_buy_research_candidates(
         research_universes['România / BVB'] = [
             item['symbol'] for item in bvb_universe
         ]
+    index = market_data.state_index(state)
     state_watchlist = list(state.get('watchlist', []))
     watchlist_symbols = set()
     if os.path.exists('watchlist.csv'):
@@ -2014,6 +2603,11 @@ def ensure_buy_research_candidates(
         item for item in state_watchlist
         if str(item.get('Ticker', '')).upper() in watchlist_symbols
     ]
+    research_symbols = {
+        symbol.upper()
+        for symbols in research_universes.values()
+        for symbol in symbols
+    }
     migrated_external = [
         dict(item, Candidate_Source='external_research')
         for item in state_watchlist
@@ -2021,11 +2615,7 @@ def ensure_buy_research_candidates(
             str(item.get('Ticker', '')).upper() not in watchlist_symbols
             and (
                 str(item.get('Ticker', '')).upper().endswith('.RO')
-                or str(item.get('Ticker', '')).upper() in {
-                symbol.upper()
-                for symbols in research_universes.values()
-                for symbol in symbols
-                }
+                or str(item.get('Ticker', '')).upper() in research_symbols
             )
             and str(item.get('Ticker', '')).upper() != 'TVBETETF.RO'
         )
@@ -2034,10 +2624,7 @@ def ensure_buy_research_candidates(
     # starea veche simbolurile mutate în cercetarea externă.
     state['watchlist'] = existing_results
     if migrated_external:
-        external_by_symbol = {
-            str(item.get('Ticker', '')).upper(): item
-            for item in state.get('external_buy_research', [])
-        }
+        external_by_symbol = index.mapping('external_buy_research')
         for item in migrated_external:
             external_by_symbol[str(item.get('Ticker', '')).upper()] = item
         state['external_buy_research'] = list(external_by_symbol.values())
@@ -2065,10 +2652,8 @@ def ensure_buy_research_candidates(
         str(item.get('Ticker', '')).upper(): item
         for item in list(state.get('external_buy_research', [])) + migrated_external
     }
-    watchlist_by_symbol = {
-        str(item.get('Ticker', '')).upper(): item
-        for item in existing_results
-    }
+    # state['watchlist'] conține acum exact existing_results.
+    watchlist_by_symbol = index.mapping('watchlist')
     bvb_metadata = {
         item['symbol']: item for item in bvb_universe
     }
@@ -2125,6 +2710,9 @@ def ensure_buy_research_candidates(
             )
         attempted_by_market[market] = len(symbols)
         completed_by_market[market] = 0
+        prefetch_yahoo_histories(symbols)
+        prime_watchlist_indicators(symbols)
+        prefetch_yahoo_quotes(symbols)
         for symbol in symbols:
             data = process_watchlist_ticker(symbol, vix_val, rates)
             if not data:
@@ -2307,30 +2895,27 @@ def load_watchlist(filename='watchlist.csv'):
         print(f"Eroare la citirea {filename}: {e}")
         return []
 
-def adjust_for_unadjusted_splits(df, ticker):
-    """Detectează și corectează split-urile neajustate în datele istorice yfinance."""
+def adjust_for_unadjusted_splits(df, ticker, since=0):
+    """Detectează și corectează split-urile neajustate în datele istorice yfinance.
+
+    Toate salturile sunt găsite deodată, iar fiecare bară este împărțită la
+    produsul split-urilor de după ea, deci sunt corectate și split-urile
+    multiple. Cu since, sunt verificate doar salturile de la acea poziție
+    încolo (de exemplu granița unei delte adăugate la istoricul stocat).
+    """
     if df.empty or len(df) < 2:
         return df
     try:
-        for i in range(1, len(df)):
-            ratio = df['Close'].iloc[i-1] / df['Close'].iloc[i]
-            if ratio > 50:
-                split_factor = 1.0
-                if 170 <= ratio <= 230:
-                    split_factor = 200.0
-                elif 80 <= ratio <= 120:
-                    split_factor = 100.0
-                elif 8 <= ratio <= 12:
-                    split_factor = 10.0
-                else:
-                    split_factor = float(round(ratio))
-                
-                print(f"  [Split Alert] Corecție split pentru {ticker} la data {df.index[i].strftime('%Y-%m-%d')} (factor: {split_factor}x)")
-                cols = ['Open', 'High', 'Low', 'Close']
-                df.iloc[:i, df.columns.get_indexer(cols)] /= split_factor
-                if 'Volume' in df.columns:
-                    df.iloc[:i, df.columns.get_indexer(['Volume'])] *= split_factor
-                break
+        scale, jumps = market_data.detect_unadjusted_splits(df['Close'], since=since)
+        if not jumps:
+            return df
+        for position, _, split_factor in jumps:
+            print(f"  [Split Alert] Corecție split pentru {ticker} la data {df.index[position].strftime('%Y-%m-%d')} (factor: {split_factor}x)")
+        for column in ('Open', 'High', 'Low', 'Close'):
+            if column in df.columns:
+                df[column] = df[column] / scale.to_numpy()
+        if 'Volume' in df.columns:
+            df['Volume'] = df['Volume'] * scale.to_numpy()
     except Exception as e:
         print(f"⚠️ Eroare la ajustare split pentru {ticker}: {e}")
     return df
@@ -2403,9 +2988,8 @@ def get_next_earnings_date(ticker_symbol):
     if _known_fund_profile(ticker_symbol):
         return None
     try:
-        lookup_symbol = ticker_symbol[:-3] if ticker_symbol.endswith('.US') else ticker_symbol
-        if lookup_symbol in ['LQQ.FR', 'FR.LQQ']:
-            lookup_symbol = 'LQQ.PA'
+        lookup_symbol = market_data.resolved_symbol(ticker_symbol)
+        market_data.throttle_host('yahoo')
         t = yf.Ticker(lookup_symbol)
         cal = t.calendar
         if cal and isinstance(cal, dict) and 'Earnings Date' in cal:
@@ -2422,22 +3006,6 @@ def get_next_earnings_date(ticker_symbol):
         pass
     return None
 
-def load_market_history():
-    if os.path.exists(market_utils.MARKET_HISTORY_FILE):
-        try:
-            with open(market_utils.MARKET_HISTORY_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-def save_market_history(history):
-    try:
-        with open(market_utils.MARKET_HISTORY_FILE, 'w') as f:
-            json.dump(history, f, indent=2)
-    except Exception as e:
-        print(f"Eroare salvare istoric: {e}")
-
 def calculate_historical_monthly_returns(cache_file=HISTORICAL_RETURNS_FILE, ttl_days=HISTORICAL_RETURNS_TTL_DAYS):
     """Calculate average monthly returns for S&P 500 and NASDAQ since 1950 (cached monthly)."""
     # Serve from cache if fresh
@@ -2526,10 +3094,87 @@ def calculate_historical_monthly_returns(cache_file=HISTORICAL_RETURNS_FILE, ttl
 
     return returns
 
+MARKET_INDICATORS_DEADLINE_SECONDS = 30
+
+
+def _download_indicator_histories(tickers):
+    """Istoricul pe 6 luni al indicatorilor, dintr-un singur yf.download."""
+    frame = _yf_download(
+        list(tickers),
+        period='6mo',
+        group_by='ticker',
+        timeout=MARKET_INDICATORS_DEADLINE_SECONDS,
+    )
+    return {
+        ticker: _batch_ticker_frame(frame, ticker, len(tickers))
+        for ticker in tickers
+    }
+
+
+def _fetch_crypto_fear_greed():
+    """Crypto Fear & Greed Index (alternative.me), ultimele 35 de zile."""
+    try:
+        # Cerem ultimele 35 de zile pentru istoric
+        response = requests.get('https://api.alternative.me/fng/?limit=35', timeout=5)
+        if response.status_code == 200:
+            data = response.json()
+            if 'data' in data and len(data['data']) > 0:
+                current_data = data['data'][0]
+                value = int(current_data['value'])
+                classification = current_data['value_classification']  # Extreme Fear, Fear, Neutral, Greed, Extreme Greed
+                
+                # Determinăm status și description
+                # Determinăm status și description (User Formula)
+                if value < 24:
+                    status = 'Panic'
+                    description = 'panica 24'
+                elif value < 49:
+                    status = 'Tension'
+                    description = '24 frica 49'
+                elif value < 74:
+                    status = 'Normal'
+                    description = '49 lacomie 74'
+                else:
+                    status = 'Perfect'
+                    description = '74 lacomie extrema'
+                
+                # Change (diferența față de ziua precedentă)
+                if len(data['data']) > 1:
+                    prev_value = int(data['data'][1]['value'])
+                    change = value - prev_value
+                else:
+                    change = 0
+                
+                # Sparkline data (ultimele 30 zile, inversat pentru cronologie vechi->nou)
+                sparkline_raw = data['data'][:30]
+                sparkline_data = [int(item['value']) for item in sparkline_raw][::-1]
+                history_raw = data['data'][:35][::-1]
+                
+                return {
+                    'value': value,
+                    'change': change,
+                    'status': status,
+                    'description': description,
+                    'sparkline': sparkline_data,
+                    'history': [int(item['value']) for item in history_raw],
+                    'history_dates': [
+                        datetime.datetime.fromtimestamp(
+                            int(item['timestamp']), datetime.timezone.utc
+                        ).strftime('%Y-%m-%d')
+                        for item in history_raw
+                    ],
+                    'ohlc': [],
+                    'ticker': 'alternative.me'
+                }
+    except Exception as e:
+        print(f"  ⚠ Eroare Crypto Fear: {str(e)[:40]}")
+    return None
+
+
 def get_market_indicators():
     """Preia indicatori volum și sentiment, cu persistență locală."""
     indicators = {}
-    history_db = load_market_history()
+    history_db = market_utils.load_market_series()
     today_str = datetime.datetime.now().strftime('%Y-%m-%d')
     
     # Lista de indicatori cu ticker-ele lor Yahoo Finance și thresholds
@@ -2569,43 +3214,43 @@ def get_market_indicators():
         'OVX': [(25, 'perfect 25'), (35, '25 teama 35'), (999, '35 panica')],
     }
     
+    # Un singur download multi-ticker, iar în paralel Fear & Greed și
+    # randamentele istorice, toate cu același termen.
+    side_results = market_data.run_with_deadline(
+        {
+            'Indicatori Yahoo': lambda: _download_indicator_histories(
+                tuple(tickers_map.values())
+            ),
+            'Crypto Fear': _fetch_crypto_fear_greed,
+            'Historical_Returns': calculate_historical_monthly_returns,
+        },
+        timeout=MARKET_INDICATORS_DEADLINE_SECONDS,
+    )
+    histories = side_results.get('Indicatori Yahoo') or {}
+    crypto_fear = side_results.get('Crypto Fear')
+
     for name, ticker in tickers_map.items():
         try:
-            time.sleep(0.5)
-            data = yf.Ticker(ticker)
-            # Încercăm să luăm istoric scurt pentru update, sau lung dacă nu avem local
-            hist = data.history(period="6mo")
-            if not hist.empty:
-                hist = hist.dropna(subset=['Close'])
+            hist = histories.get(ticker)
+            if hist is None:
+                hist = pd.DataFrame()
             
             current_val = None
             
-            # 1. Update Persistent History
+            # 1. Update Persistent History (upsert pe dată, ultimele 60 de zile)
             if not hist.empty:
-                # Iterăm prin ultimele zile și le adăugăm în DB
-                # Yahoo returnează index datetime, convertim la string YYYY-MM-DD
-                for date_idx, row in hist.iterrows():
-                    d_str = date_idx.strftime('%Y-%m-%d')
-                    val = float(row['Close'])
-                    if not pd.isna(val):
-                        # Init list if needed
-                        if name not in history_db: history_db[name] = []
-                        
-                        # Check exist
-                        existing = next((x for x in history_db[name] if x['date'] == d_str), None)
-                        if existing:
-                            existing['value'] = val
-                        else:
-                            history_db[name].append({'date': d_str, 'value': val})
-                
-                # Sort și Trim (ultimele 60 zile)
-                if name in history_db:
-                    history_db[name].sort(key=lambda x: x['date'])
-                    history_db[name] = history_db[name][-60:]
+                closes = hist['Close'].dropna()
+                history_db[name] = market_utils.merge_series(
+                    history_db.get(name, {}),
+                    zip(
+                        closes.index.strftime('%Y-%m-%d'),
+                        closes.astype(float).tolist(),
+                    ),
+                )
             
             # 2. Folosim datele din History DB pentru afișare
-            if name in history_db and history_db[name]:
-                data_points = [x['value'] for x in history_db[name]]
+            if history_db.get(name):
+                data_points = list(history_db[name].values())
                 current = data_points[-1]
                 
                 if len(data_points) >= 2:
@@ -2654,7 +3299,7 @@ def get_market_indicators():
                     'description': description,
                     'sparkline': sparkline_data,
                     'history': data_points[-60:],
-                    'history_dates': [x['date'] for x in history_db[name]][-60:],
+                    'history_dates': list(history_db[name])[-60:],
                     'ohlc': ohlc_data,
                     'ticker': ticker
                 }
@@ -2665,67 +3310,15 @@ def get_market_indicators():
             print(f"  ⚠ Eroare {name}: {str(e)[:40]}")
     
     # Salvarea istoricului actualizat
-    save_market_history(history_db)
-    
-    # Crypto Fear & Greed Index (separat, dar îl putem adăuga și pe el în DB dacă vrem, momentan e ok așa)
     try:
-        # Cerem ultimele 35 de zile pentru istoric
-        response = requests.get('https://api.alternative.me/fng/?limit=35', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if 'data' in data and len(data['data']) > 0:
-                current_data = data['data'][0]
-                value = int(current_data['value'])
-                classification = current_data['value_classification']  # Extreme Fear, Fear, Neutral, Greed, Extreme Greed
-                
-                # Determinăm status și description
-                # Determinăm status și description (User Formula)
-                if value < 24:
-                    status = 'Panic'
-                    description = 'panica 24'
-                elif value < 49:
-                    status = 'Tension'
-                    description = '24 frica 49'
-                elif value < 74:
-                    status = 'Normal'
-                    description = '49 lacomie 74'
-                else:
-                    status = 'Perfect'
-                    description = '74 lacomie extrema'
-                
-                # Change (diferența față de ziua precedentă)
-                if len(data['data']) > 1:
-                    prev_value = int(data['data'][1]['value'])
-                    change = value - prev_value
-                else:
-                    change = 0
-                
-                # Sparkline data (ultimele 30 zile, inversat pentru cronologie vechi->nou)
-                sparkline_raw = data['data'][:30]
-                sparkline_data = [int(item['value']) for item in sparkline_raw][::-1]
-                history_raw = data['data'][:35][::-1]
-                
-                indicators['Crypto Fear'] = {
-                    'value': value,
-                    'change': change,
-                    'status': status,
-                    'description': description,
-                    'sparkline': sparkline_data,
-                    'history': [int(item['value']) for item in history_raw],
-                    'history_dates': [
-                        datetime.datetime.fromtimestamp(
-                            int(item['timestamp']), datetime.timezone.utc
-                        ).strftime('%Y-%m-%d')
-                        for item in history_raw
-                    ],
-                    'ohlc': [],
-                    'ticker': 'alternative.me'
-                }
-    except Exception as e:
-        print(f"  ⚠ Eroare Crypto Fear: {str(e)[:40]}")
+        market_utils.save_market_series(history_db)
+    except OSError as e:
+        print(f"Eroare salvare istoric: {e}")
     
-    # Calculate historical monthly returns
-    historical_returns = calculate_historical_monthly_returns()
+    if crypto_fear:
+        indicators['Crypto Fear'] = crypto_fear
+
+    historical_returns = side_results.get('Historical_Returns')
     if historical_returns:
         indicators['Historical_Returns'] = historical_returns
     
@@ -2793,9 +3386,12 @@ def process_portfolio_ticker(row, vix_value, rates, spx_df=None, market_in_downt
     try:
         ticker = row.get('symbol', 'UNKNOWN').upper()
         is_bvb_position = ticker.endswith('.RO')
-        download_ticker = ticker[:-3] if ticker.endswith('.US') else ticker
-        if download_ticker in ['LQQ.FR', 'FR.LQQ']:
-            download_ticker = 'LQQ.PA'
+        normalized_ticker = _yahoo_download_symbol(ticker)
+        # Varianta confirmată într-o rulare anterioară (SXRZ -> SXRZ.DE).
+        download_ticker = (
+            normalized_ticker if is_bvb_position
+            else market_data.resolved_symbol(normalized_ticker)
+        )
         actual_download_ticker = download_ticker
         shares = float(row.get('shares', 0))
         buy_price_native = float(row.get('buy_price', 0))
@@ -2814,6 +3410,8 @@ def process_portfolio_ticker(row, vix_value, rates, spx_df=None, market_in_downt
              if '.RO' in ticker: currency = 'RON'
              elif '.PA' in ticker or '.DE' in ticker or '.AS' in ticker or '.FR' in ticker or 'LQQ' in ticker: currency = 'EUR'
              elif '.L' in ticker: currency = 'GBP'
+        if download_ticker != normalized_ticker:
+            currency = _symbol_suffix_currency(download_ticker, currency)
         
         rate = rates.get(currency, rates['USD'])
         if currency == 'EUR': rate = 1.0
@@ -2869,54 +3467,29 @@ def process_portfolio_ticker(row, vix_value, rates, spx_df=None, market_in_downt
              df = ticker_cache[download_ticker]
              # print(f"  [Cache] Used cached data for {download_ticker}")
         elif not ticker.endswith('.RO'):
-            time.sleep(2)
-            df = _download_yahoo_history(download_ticker, period='1y')
-            
-            # Retry with European suffixes if base ticker fails (common for IBKR ETFs like SXRZ)
-            # Retry with European suffixes if base ticker fails (common for IBKR ETFs like SXRZ)
-            if df.empty:
-                suffixes = ['.DE', '.PA', '.L', '.AS', '.MI', '.MC']
-                print(f"  ⚠️ Ticker {download_ticker} not found. Trying suffixes...")
-                for s in suffixes:
-                    alt_ticker = f"{download_ticker}{s}"
-                    # Check cache for alt ticker too
-                    if alt_ticker in ticker_cache and ticker_cache[alt_ticker] is not None:
-                        # print(f"  [Cache] Used cached data for {alt_ticker}")
-                        df_alt = ticker_cache[alt_ticker]
-                    else:
-                        print(f"    Trying {alt_ticker}...")
-                        time.sleep(1)
-                        df_alt = yf.download(alt_ticker, period="1y", auto_adjust=True, progress=False)
-                        if not df_alt.empty:
-                            if isinstance(df_alt.columns, pd.MultiIndex):
-                                try:
-                                    df_alt.columns = df_alt.columns.droplevel(1)
-                                except:
-                                    pass
-                            df_alt = df_alt.dropna(subset=['Close'])
-                        if not df_alt.empty:
-                             ticker_cache[alt_ticker] = df_alt # Cache successful alt
-
-                    if not df_alt.empty:
-                        print(f"    ✅ Found data for {alt_ticker}!")
-                        df = df_alt
-                        actual_download_ticker = alt_ticker
-
-                        
-                        # Update currency based on new suffix
-                        if '.DE' in s or '.PA' in s or '.AS' in s or '.MI' in s or '.MC' in s:
-                            currency = 'EUR'
-                        elif '.L' in s:
-                            currency = 'GBP'
-                        
-                        # Update rate
-                        rate = rates.get(currency, rates['USD'])
-                        if currency == 'EUR': rate = 1.0
-                        
-                        break
-                        
-            # Store in cache (even if empty, to avoid retrying failed download?)
-            # Usually better to cache success.
+            def probe_history(candidate):
+                cached_history = ticker_cache.get(candidate)
+                if cached_history is not None and not cached_history.empty:
+                    return cached_history
+                history = _probe_yahoo_history(candidate, period='1y')
+                if not history.empty:
+                    ticker_cache[candidate] = history
+                return history
+
+            # Variantele europene (comune pentru ETF-urile IBKR precum SXRZ)
+            # se încearcă doar dacă nu sunt deja marcate moarte.
+            resolved_ticker, df = market_data.resolve_symbol(
+                normalized_ticker, probe_history
+            )
+            if resolved_ticker is None:
+                print(f"  ⚠️ Ticker {download_ticker} not found on Yahoo")
+                df = pd.DataFrame()
+            elif resolved_ticker != download_ticker:
+                print(f"    ✅ Found data for {resolved_ticker}!")
+                actual_download_ticker = resolved_ticker
+                currency = _symbol_suffix_currency(resolved_ticker, currency)
+                rate = rates.get(currency, rates['USD'])
+                if currency == 'EUR': rate = 1.0
 
         company_name = ""
         try:
@@ -3593,32 +4166,40 @@ def process_watchlist_ticker(ticker, vix_value, rates):
     """Procesează un ticker din watchlist (fără date de ownership)."""
     
     def get_company_name(symbol, finviz_data=None):
-        try:
-            # 1. Try yfinance
-            lookup_symbol = symbol[:-3] if symbol.endswith('.US') else symbol
-            if lookup_symbol in ['LQQ.FR', 'FR.LQQ']:
-                lookup_symbol = 'LQQ.PA'
-            info = _get_yahoo_info(
-                lookup_symbol, tws_instrument=tws_instrument
-            )
+        contract = (
+            (tws_instrument or {}).get('contract', {})
+            if isinstance(tws_instrument, dict) else {}
+        )
+        # 0. Numele din contractul TWS nu depinde de varianta Yahoo.
+        if contract.get('long_name'):
+            return contract['long_name']
+
+        def probe_name(candidate):
+            try:
+                info = _get_yahoo_info(candidate)
+            except Exception:
+                info = {}
             name = info.get('longName') or info.get('shortName')
-            if name: return name
-        except:
-             pass
+            if not name and _yahoo_symbol_missing(candidate):
+                raise market_data.SymbolNotFound(candidate)
+            return name
+
+        # 1. Try yfinance (varianta confirmată sau simbolul de bază)
+        candidates = market_data.symbol_candidates(symbol, kind='name')
+        _, name = market_data.resolve_symbol(
+            symbol, probe_name, kind='name', candidates=candidates[:1]
+        )
+        if name: return name
         
         # 2. Try Finviz Fallback
         if finviz_data and 'Company' in finviz_data:
              return finviz_data['Company']
              
-        # 3. Try manual suffixes (last resort)
-        for s in ['.DE', '.PA', '.L', '.AS', '.MI', '.MC']:
-            try:
-                t_alt = yf.Ticker(f"{symbol}{s}")
-                info = t_alt.info
-                name = info.get('longName') or info.get('shortName')
-                if name: return name
-            except: continue
-        return ""
+        # 3. Try manual suffixes (last resort, fără variantele moarte)
+        _, name = market_data.resolve_symbol(
+            symbol, probe_name, kind='name', candidates=candidates[1:]
+        )
+        return name or contract.get('local_symbol') or ""
 
     try:
         # Detect Currency
@@ -3627,12 +4208,14 @@ def process_watchlist_ticker(ticker, vix_value, rates):
         elif '.PA' in ticker or '.DE' in ticker or '.AS' in ticker or '.FR' in ticker or 'LQQ' in ticker: currency = 'EUR'
         elif '.L' in ticker: currency = 'GBP'
         
-        rate = rates.get(currency, rates['USD'])
-        if currency == 'EUR': rate = 1.0
-        
-        download_ticker = ticker[:-3] if ticker.endswith('.US') else ticker
-        if download_ticker in ['LQQ.FR', 'FR.LQQ']:
-            download_ticker = 'LQQ.PA'
+        normalized_ticker = _yahoo_download_symbol(ticker)
+        # Varianta confirmată într-o rulare anterioară (SXRZ -> SXRZ.DE).
+        download_ticker = (
+            normalized_ticker if ticker.upper().endswith('.RO')
+            else market_data.resolved_symbol(normalized_ticker)
+        )
+        if download_ticker != normalized_ticker:
+            currency = _symbol_suffix_currency(download_ticker, currency)
         (
             df,
             selected_market_instrument,
@@ -3641,6 +4224,19 @@ def process_watchlist_ticker(ticker, vix_value, rates):
         ) = _load_analysis_history(
             ticker, download_ticker, period='1y'
         )
+        if df.empty and not ticker.upper().endswith('.RO'):
+            resolved_ticker, resolved_df = market_data.resolve_symbol(
+                normalized_ticker, _probe_yahoo_history
+            )
+            if resolved_ticker is not None:
+                if resolved_ticker != download_ticker:
+                    print(f"    ✅ Found data for {resolved_ticker}!")
+                download_ticker = resolved_ticker
+                df = resolved_df
+                currency = _symbol_suffix_currency(resolved_ticker, currency)
+
+        rate = rates.get(currency, rates['USD'])
+        if currency == 'EUR': rate = 1.0
         
         if df.empty:
             print(f"Nu există date pentru {download_ticker}")
@@ -3653,11 +4249,25 @@ def process_watchlist_ticker(ticker, vix_value, rates):
                 pass
         df = df.dropna(subset=['Close'])
         df = adjust_for_unadjusted_splits(df, download_ticker)
-            
-        df['ATR'] = calculate_atr(df)
-        df['RSI'] = calculate_rsi(df)
-        df['SMA_50'] = calculate_sma(df, 50)
-        df['SMA_200'] = calculate_sma(df, 200)
+
+        # BVB names must be judged against their local market rather than SPX.
+        # TVBETETF tracks the BET family with dividends and has reliable Yahoo
+        # history, making it a practical benchmark proxy for Romanian shares.
+        rs_benchmark = 'TVBETETF.RO' if ticker.upper().endswith('.RO') else '^GSPC'
+        try:
+            spx_df = market_data.get_benchmark_history(
+                rs_benchmark, period='3mo', fetch=_download_yahoo_history
+            )
+        except Exception:
+            spx_df = pd.DataFrame()
+        # ATR/RSI/SMA/RS vin din panoul calculat pentru tot lotul rulării;
+        # dacă istoricul de aici diferă, sunt calculate doar pentru acest ticker.
+        indicators = market_data.latest_indicators(
+            download_ticker,
+            df,
+            benchmark_symbol=rs_benchmark,
+            benchmark_close=None if spx_df.empty else spx_df['Close'],
+        )
         
         # Extrage ultimele 30 zile pentru sparkline
         sparkline_data = df['Close'].tail(30).tolist()
@@ -3670,12 +4280,12 @@ def process_watchlist_ticker(ticker, vix_value, rates):
             or market_data.get_scalar(last_row['Close'])
         )
         last_close = last_close_native * rate
-        last_atr = market_data.get_scalar(last_row['ATR']) * rate
+        last_atr = indicators['ATR'] * rate
         if pd.isna(last_atr): last_atr = 0.0
         
-        last_rsi = market_data.get_scalar(last_row['RSI'])
-        sma_50 = market_data.get_scalar(last_row['SMA_50']) * rate
-        sma_200 = market_data.get_scalar(last_row['SMA_200']) * rate
+        last_rsi = indicators['RSI']
+        sma_50 = indicators['SMA_50'] * rate
+        sma_200 = indicators['SMA_200'] * rate
         
         # Preluare Target din Finviz
         # Preluare date din Finviz (Target + Volatility)
@@ -3727,9 +4337,7 @@ def process_watchlist_ticker(ticker, vix_value, rates):
         
         try:
            # Folosim yf.Ticker pentru info detaliat
-           yt_ticker = ticker
-           if yt_ticker in ['LQQ.FR', 'FR.LQQ']:
-               yt_ticker = 'LQQ.PA'
+           yt_ticker = market_data.resolved_symbol(ticker)
            info = _get_yahoo_info(
                yt_ticker, tws_instrument=tws_instrument
            )
@@ -3765,36 +4373,17 @@ def process_watchlist_ticker(ticker, vix_value, rates):
         else:
             pct_to_target = None
 
-        # BVB names must be judged against their local market rather than SPX.
-        # TVBETETF tracks the BET family with dividends and has reliable Yahoo
-        # history, making it a practical benchmark proxy for Romanian shares.
-        rs_benchmark = 'TVBETETF.RO' if ticker.upper().endswith('.RO') else '^GSPC'
         rs_vs_spx = None
         rs_trend_up = False
         rs_status = "Neutral"
         try:
-            spx_df = _download_yahoo_history(rs_benchmark, period='3mo')
-            if not spx_df.empty:
-                if isinstance(spx_df.columns, pd.MultiIndex):
-                    try:
-                        spx_df.columns = spx_df.columns.droplevel(1)
-                    except:
-                        pass
-                spx_df = spx_df.dropna(subset=['Close'])
-            if not spx_df.empty and len(df) >= 60:
-                # Calculate 60-day RS (Medium Term)
-                stock_ret_60 = (df['Close'].iloc[-1] / df['Close'].iloc[-60] - 1) * 100
-                spx_ret_60 = (spx_df['Close'].iloc[-1] / spx_df['Close'].iloc[-60] - 1) * 100
-                rs_60 = stock_ret_60 - spx_ret_60
-                
-                # Calculate 20-day RS (Short Term / Momentum)
-                stock_ret_20 = (df['Close'].iloc[-1] / df['Close'].iloc[-20] - 1) * 100
-                spx_ret_20 = (spx_df['Close'].iloc[-1] / spx_df['Close'].iloc[-20] - 1) * 100
-                rs_20 = stock_ret_20 - spx_ret_20
-                
-                # Normalize values
-                rs_vs_spx = float(rs_60.iloc[0]) if hasattr(rs_60, 'iloc') else float(rs_60)
-                rs_20_val = float(rs_20.iloc[0]) if hasattr(rs_20, 'iloc') else float(rs_20)
+            # 60-day RS (Medium Term) and 20-day RS (Short Term / Momentum),
+            # on sessions common to the stock and the benchmark.
+            rs_60 = indicators['RS_60']
+            rs_20 = indicators['RS_20']
+            if not pd.isna(rs_60) and not pd.isna(rs_20):
+                rs_vs_spx = float(rs_60)
+                rs_20_val = float(rs_20)
                 
                 # Logic: RS is good if Positive AND Accelerating (Short term > Long term) or significantly positive
                 rs_trend_up = rs_20_val > rs_vs_spx # Is RS line trending up?
@@ -7112,14 +7701,18 @@ window.addEventListener('keydown',event=>{if(event.key==='Escape'){event.prevent
     )
     if tvbetetf_holdings:
         full_state['tvbetetf_holdings'] = tvbetetf_holdings
+    # Rotația, regimul și cardul swing citesc același context de piață.
+    market_context = analysis.fetch_market_context()
     us_sector_rotation = analysis.fetch_us_sector_rotation(
-        cached=(full_state or {}).get('us_sector_rotation')
+        cached=(full_state or {}).get('us_sector_rotation'),
+        context=market_context,
     )
     if us_sector_rotation:
         full_state['us_sector_rotation'] = us_sector_rotation
     us_market_regime = analysis.build_us_market_regime(
         full_state.get('market_indicators', {}),
         full_state.get('eco_phase'),
+        context=market_context,
     )
     full_state['us_market_regime'] = us_market_regime
     strict_buy_candidates = select_strict_buy_candidates(
@@ -9369,14 +9962,12 @@ def update_portfolio_data(state, rates, vix_val, sync_before_load=True):
     
     # Pre-fetch SPX data for Relative Strength (RS) usage AND Market Rule #1 (SPX < SMA200)
     print("  Pre-fetching SPX data (1y)...")
-    spx_df = yf.download("^GSPC", period="1y", auto_adjust=True, progress=False)
+    spx_df = market_data.get_benchmark_history(
+        '^GSPC', period='1y', fetch=_download_yahoo_history
+    )
     
     market_in_downtrend = False
     try:
-        if isinstance(spx_df.columns, pd.MultiIndex):
-            spx_df.columns = spx_df.columns.droplevel(1)
-        spx_df = spx_df.dropna(subset=['Close'])
-            
         # Calculate SPX SMA200 for Rule #1
         if len(spx_df) >= 200:
             spx_df['SMA_200'] = spx_df['Close'].rolling(window=200).mean()
@@ -9442,6 +10033,8 @@ def update_portfolio_data(state, rates, vix_val, sync_before_load=True):
         
         # Cache for redundant tickers (Lots)
         ticker_cache = {} 
+        prefetch_yahoo_histories(portfolio_data['symbol'].tolist())
+        prefetch_yahoo_quotes(portfolio_data['symbol'].tolist())
         
         for _, row in portfolio_data.iterrows():
             print(f"  > {row['symbol']}")
@@ -9493,6 +10086,8 @@ def update_portfolio_positions_only(state, rates, vix_val):
         "sau universuri de piață."
     )
     ticker_cache = {}
+    prefetch_yahoo_histories(portfolio_data['symbol'].tolist())
+    prefetch_yahoo_quotes(portfolio_data['symbol'].tolist())
     for _, row in portfolio_data.iterrows():
         print(f"  > {row['symbol']}")
         data = process_portfolio_ticker(
@@ -9508,6 +10103,19 @@ def update_portfolio_positions_only(state, rates, vix_val):
 # REFACTORED: cache helpers moved to market_data.py
 
 
+def _watchlist_worker_count(max_workers=None):
+    """Concurența pentru watchlist: argument explicit, variabilă de mediu, implicit."""
+    value = max_workers
+    if value is None:
+        value = os.environ.get(
+            'MARKET_SCANNER_WORKERS', WATCHLIST_REFRESH_WORKERS
+        )
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return WATCHLIST_REFRESH_WORKERS
+
+
 def update_watchlist_data(
     state,
     rates,
@@ -9517,6 +10125,7 @@ def update_watchlist_data(
     target_markets=None,
     sync_remote=True,
     cache_ttl_hours=5,
+    max_workers=None,
 ):
     """Actualizează datele din watchlist și le salvează în state."""
     selected_markets = set(target_markets or [])
@@ -9554,13 +10163,16 @@ def update_watchlist_data(
          return state
 
     total_tickers = len(watchlist_tickers)
-    print(f"Procesare {total_tickers} tickere...")
+    workers = _watchlist_worker_count(max_workers)
+    print(f"Procesare {total_tickers} tickere ({workers} în paralel)...")
     
     cached_count = 0
     updated_count = 0
         
     seen_tickers = set()
-    
+    index = market_data.state_index(state)
+    # 1. Planificare: decidem din cache ce tickere trebuie reîmprospătate.
+    plan = []
     for i, ticker in enumerate(watchlist_tickers, 1):
         if ticker in seen_tickers:
             continue
@@ -9568,7 +10180,7 @@ def update_watchlist_data(
         
         progress_str = f"[{i}/{total_tickers}]"
         # Check cache first
-        cached_data = market_data.get_cached_watchlist_ticker(state, ticker)
+        cached_data = index.get('watchlist', ticker)
         
         # Check if we need to backfill Smart Entry or Currency
         missing_fields = False
@@ -9590,42 +10202,61 @@ def update_watchlist_data(
             if 'Company_Name' not in cached_data or not cached_data['Company_Name']:
                     missing_fields = True
 
-        if (
+        use_cache = bool(
             cached_data
             and market_data.is_fresh(
                 cached_data, ttl_hours=cache_ttl_hours
             )
             and not missing_fields
-        ):
+        )
+        if missing_fields and not use_cache:
+            print(f"  {progress_str} ↻ {ticker} (refreshing for missing fields)")
+        plan.append((progress_str, ticker, cached_data, use_cache))
+
+    # 2. Reîmprospătare: pool limitat; rezultatele revin în ordinea planului.
+    refresh_tickers = [
+        ticker for _, ticker, _, use_cache in plan if not use_cache
+    ]
+    prefetch_bvb_history(refresh_tickers)
+    prefetch_yahoo_histories(refresh_tickers)
+    prime_watchlist_indicators(refresh_tickers)
+    prefetch_yahoo_quotes(refresh_tickers)
+    refreshed = dict(zip(
+        refresh_tickers,
+        market_data.map_bounded(
+            lambda symbol: process_watchlist_ticker(symbol, vix_val, rates),
+            refresh_tickers,
+            max_workers=workers,
+        ),
+    ))
+
+    # 3. Asamblare deterministă, identică cu rularea secvențială.
+    for progress_str, ticker, cached_data, use_cache in plan:
+        if use_cache:
             # Use cached data
             watchlist_results.append(cached_data)
             cached_count += 1
             print(f"  {progress_str} ✓ {ticker} (cached)")
-        else:
-            if missing_fields:
-                print(f"  {progress_str} ↻ {ticker} (refreshing for missing fields)")
-
-            # Process ticker
-            data = process_watchlist_ticker(ticker, vix_val, rates)
-            if data:
-                # Add timestamp for caching
-                import time
-                data['_cached_at'] = time.time()
-                watchlist_results.append(data)
-                updated_count += 1
-                print(f"  {progress_str} > {ticker} (updated)")
-            elif cached_data:
-                stale_data = dict(cached_data)
-                stale_data['Data_Refresh_Status'] = 'stale_cache'
-                stale_data['Data_Refresh_Warning'] = (
-                    'Actualizarea surselor a eșuat; sunt păstrate ultimele '
-                    'date valide, fără a le marca drept actualizate.'
-                )
-                watchlist_results.append(stale_data)
-                cached_count += 1
-                print(f"  {progress_str} ! {ticker} (stale cache)")
+            continue
+        data = refreshed.get(ticker)
+        if data:
+            # Add timestamp for caching
+            data['_cached_at'] = time.time()
+            watchlist_results.append(data)
+            updated_count += 1
+            print(f"  {progress_str} > {ticker} (updated)")
+        elif cached_data:
+            stale_data = dict(cached_data)
+            stale_data['Data_Refresh_Status'] = 'stale_cache'
+            stale_data['Data_Refresh_Warning'] = (
+                'Actualizarea surselor a eșuat; sunt păstrate ultimele '
+                'date valide, fără a le marca drept actualizate.'
+            )
+            watchlist_results.append(stale_data)
+            cached_count += 1
+            print(f"  {progress_str} ! {ticker} (stale cache)")
         
-        print(f"  → {cached_count} cached, {updated_count} updated")
+    print(f"  → {cached_count} cached, {updated_count} updated")
     
     state['watchlist'] = retained_results + watchlist_results
     return state
@@ -9643,7 +10274,17 @@ def main():
     )
     parser.add_argument('--tws', action='store_true', help='Try fetching active orders from local TWS (requires ib_insync)')
     args = parser.parse_args()
-    
+    # Istoricele preîncărcate și celelalte cache-uri de rulare trăiesc
+    # numai pe durata acestei execuții.
+    with market_data.run_scope(history_path=market_data.HISTORY_STORE_FILE):
+        try:
+            _run_scanner(args)
+        finally:
+            market_data.flush_finviz_cache()
+
+
+def _run_scanner(args):
+    """Execută etapele scannerului pentru modul ales în linia de comandă."""
     # Auto-enable TWS if local (not GitHub Actions) to prioritize live data
     if (
         not os.environ.get('GITHUB_ACTIONS')
@@ -9656,7 +10297,12 @@ def main():
     print(f"=== Rulează Market Scanner [Mod: {args.mode}] ===\n")
     
     # 1. Încărcăm starea anterioară
-    state = market_utils.load_state()
+    try:
+        state = market_utils.load_state()
+    except market_utils.ChartSeriesError as chart_error:
+        # Scannerul recalculează seriile; salvarea va scrie un sidecar nou.
+        print(f"⚠️ {chart_error}. Graficele se reconstruiesc la această rulare.")
+        state = market_utils.drop_chart_refs(market_utils.load_state(charts=False))
 
     if args.mode == 'ro' and not os.environ.get('GITHUB_ACTIONS'):
         print("=== Completare locală BVB din TWS ===")
@@ -11,8 +11,12 @@ import html
 import hashlib
 import math
 import tempfile
+import threading
 import urllib.parse
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+import market_data
 
 
 def _utc_now_naive():
@@ -293,14 +297,163 @@ def fetch_tvbetetf_holdings(cached=None, request_session=requests):
     return cached if isinstance(cached, dict) else None
 
 
-def fetch_us_sector_rotation(cached=None, ticker_factory=yf.Ticker):
-    """Măsoară rotația SUA față de SPY; păstrează cache-ul dacă datele lipsesc."""
+# Contextul pieței SUA (sectoare, indici, volatilitate, sentiment, breadth)
+# se descarcă o singură dată pe rulare: un yf.download pentru toate tickerele
+# și cererile CNN/Finviz în paralel, sub un termen comun.
+MARKET_CONTEXT_PERIOD = '2y'
+MARKET_CONTEXT_DEADLINE_SECONDS = 30
+MARKET_CONTEXT_FALLBACK_WORKERS = 4
+US_INDEX_TICKERS = ('^GSPC', '^NDX', '^VIX', '^SKEW')
+MARKET_CONTEXT_TICKERS = (
+    ('SPY',) + tuple(US_SECTOR_ETFS.values()) + US_INDEX_TICKERS
+)
+# Tickerele put/call sunt doar alternative la CNN: nu intră în lot și sunt
+# cerute separat numai când CNN nu are put/call.
+PCR_TICKERS = ('^CPC', '^PCR', '^PCX')
+CNN_FEAR_GREED_URL = 'https://production.dataviz.cnn.io/index/fearandgreed/graphdata'
+_MARKET_CONTEXT_LOCK = threading.Lock()
+# Regimul SUA folosește din context doar ultimele ședințe pe care le are și
+# istoricul indicatorilor SPX/NASDAQ (history[-60:]), ca mediile și deci
+# clasificarea să rămână cele de dinainte de context.
+REGIME_HISTORY_SESSIONS = 60
+
+
+def _fetch_cnn_fear_greed():
+    """Payloadul CNN Fear & Greed (include și put/call) sau None."""
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'application/json',
+        'Referer': 'https://edition.cnn.com',
+        'Origin': 'https://edition.cnn.com'
+    }
+    r = requests.get(CNN_FEAR_GREED_URL, headers=headers, timeout=10)
+    if r.status_code != 200:
+        return None
+    return r.json()
+
+
+def _download_context_ticker(ticker, period=MARKET_CONTEXT_PERIOD):
+    """Istoricul unui ticker lipsă din lotul Yahoo, cerut separat."""
     try:
-        histories = {}
-        for ticker in ['SPY'] + list(US_SECTOR_ETFS.values()):
-            history = ticker_factory(ticker).history(
-                period='6mo', interval='1d', auto_adjust=True
+        market_data.throttle_host('yahoo')
+        frame = yf.Ticker(ticker).history(period=period)
+    except Exception as e:
+        print(f"Error Market Context ({ticker}): {e}")
+        return pd.DataFrame()
+    return market_data._normalize_benchmark_frame(frame)
+
+
+def _build_market_context(tickers=MARKET_CONTEXT_TICKERS):
+    required = list(tickers)
+    results = market_data.run_with_deadline(
+        {
+            'Context Yahoo': lambda: market_data.download_histories(
+                required,
+                period=MARKET_CONTEXT_PERIOD,
+                timeout=MARKET_CONTEXT_DEADLINE_SECONDS,
+            ),
+            'CNN Fear & Greed': _fetch_cnn_fear_greed,
+            'Finviz Market Tide': get_finviz_market_tide,
+            'Finviz SMA200': lambda: get_finviz_count('sma200'),
+            'Finviz SMA50': lambda: get_finviz_count('sma50'),
+        },
+        timeout=MARKET_CONTEXT_DEADLINE_SECONDS,
+    )
+    histories = dict(results.get('Context Yahoo') or {})
+    missing = [
+        ticker for ticker in required
+        if ticker != '^GSPC'
+        and (histories.get(ticker) is None or histories[ticker].empty)
+    ]
+    if missing:
+        print(f"    -> Context piață: {len(missing)} tickere cerute separat")
+        frames = market_data.map_bounded(
+            _download_context_ticker,
+            missing,
+            max_workers=MARKET_CONTEXT_FALLBACK_WORKERS,
+        )
+        histories.update(zip(missing, frames))
+    # ^GSPC trece prin registrul de benchmarkuri al rulării: forța relativă
+    # a acțiunilor îl refolosește în loc să-l descarce din nou.
+    spx = histories.get('^GSPC')
+    seed = None
+    if spx is not None and not spx.empty:
+        seed = lambda symbol, period: spx
+    try:
+        if '^GSPC' in required:
+            histories['^GSPC'] = market_data.get_benchmark_history(
+                '^GSPC', period=MARKET_CONTEXT_PERIOD, fetch=seed
             )
+    except Exception as e:
+        print(f"Error Market Context (^GSPC): {e}")
+        histories['^GSPC'] = pd.DataFrame()
+    return {
+        'histories': histories,
+        'fear_greed': results.get('CNN Fear & Greed'),
+        'market_tide': results.get('Finviz Market Tide'),
+        'breadth_counts': {
+            'sma200': results.get('Finviz SMA200'),
+            'sma50': results.get('Finviz SMA50'),
+        },
+    }
+
+
+def fetch_market_context(tickers=None):
+    """Istoricele și sentimentul pieței SUA, comune pentru toată rularea.
+
+    Rotația sectorială, datele swing și regimul pieței citesc același context.
+    Într-o rulare contextul complet este construit o singură dată; în afara
+    ei fiecare apel descarcă numai tickerele cerute (implicit toate).
+    """
+    cache = market_data.run_cache('market_context')
+    if cache is None:
+        return _build_market_context(tickers or MARKET_CONTEXT_TICKERS)
+    with _MARKET_CONTEXT_LOCK:
+        if 'context' not in cache:
+            cache['context'] = _build_market_context()
+        return cache['context']
+
+
+def market_context_history(context, ticker, period=None):
+    """Copia istoricului din context, tăiată la perioada cerută; gol dacă lipsește."""
+    frame = (context or {}).get('histories', {}).get(ticker)
+    if frame is None or frame.empty:
+        return pd.DataFrame()
+    if period is None:
+        return frame.copy()
+    return market_data._slice_period(frame, period)
+
+
+def fetch_us_sector_rotation(cached=None, ticker_factory=None, context=None):
+    """Măsoară rotația SUA față de SPY; păstrează cache-ul dacă datele lipsesc.
+
+    Cu context explicit sau într-o rulare fără ticker_factory, istoricele vin
+    din contextul de piață. Altfel fiecare ETF este cerut separat prin
+    ticker_factory (implicit yf.Ticker), ca înainte de context.
+    """
+    try:
+        tickers = ['SPY'] + list(US_SECTOR_ETFS.values())
+        if (
+            context is None
+            and ticker_factory is None
+            and market_data.run_cache('market_context') is not None
+        ):
+            context = fetch_market_context()
+        if context is not None:
+            frames = {
+                ticker: market_context_history(context, ticker, '6mo')
+                for ticker in tickers
+            }
+        else:
+            factory = ticker_factory or yf.Ticker
+            frames = {
+                ticker: factory(ticker).history(
+                    period='6mo', interval='1d', auto_adjust=True
+                )
+                for ticker in tickers
+            }
+        histories = {}
+        for ticker, history in frames.items():
             if history is None or history.empty or 'Close' not in history:
                 raise ValueError(f'Istoric indisponibil pentru {ticker}')
             histories[ticker] = history['Close'].dropna().astype(float)
@@ -543,11 +696,21 @@ OPENAI_ANALYSIS_MODEL = 'gpt-5.6-terra'
 OPENAI_ANALYSIS_REASONING = {'effort': 'low'}
 OPENAI_PORTFOLIO_REASONING = {'effort': 'low'}
 PORTFOLIO_AI_CACHE_VERSION = 16
+# Dovezile sunt păstrate per simbol, fiecare cu propriul termen de valabilitate.
 PORTFOLIO_EVIDENCE_CACHE_HOURS = 12
+PORTFOLIO_EVIDENCE_WORKERS = 4
 ACTIONABLE_BUY_VERDICTS = {'Candidat valid', 'Pregătit la trigger'}
 BUY_RECOMMENDATION_HISTORY_DISPLAY_LIMIT = 50
 SEC_TICKER_MAP_URL = 'https://www.sec.gov/files/company_tickers.json'
 SEC_SUBMISSIONS_URL = 'https://data.sec.gov/submissions/CIK{cik:010d}.json'
+# Indexul SEC ticker→CIK (peste 10k intrări) se schimbă rar: copia de pe disc
+# este folosită fără cerere o săptămână, apoi revalidată condiționat.
+SEC_TICKER_MAP_CACHE_FILE = 'sec_ticker_map.json'
+SEC_TICKER_MAP_TTL_DAYS = 7
+SEC_USER_AGENT = 'MarketScanner risk dashboard admin@marketscanner.local'
+_SEC_TICKER_MAP = None
+_SEC_TICKER_MAP_LOCK = threading.Lock()
+_DEFAULT_SEC_CACHE = object()
 
 
 def _extract_openai_response_text(payload):
@@ -980,15 +1143,20 @@ def build_portfolio_market_context(portfolio_df, market_indicators=None):
     return markets
 
 
-def build_us_market_regime(market_indicators=None, economic_phase=None):
-    """Clasifică trendul SUA și ciclul fără să completeze date inexistente."""
+def build_us_market_regime(market_indicators=None, economic_phase=None, context=None):
+    """Clasifică trendul SUA și ciclul fără să completeze date inexistente.
+
+    Cu contextul de piață al rulării, indicii vin din istoricul lui, limitat
+    la aceleași REGIME_HISTORY_SESSIONS ședințe ca istoricul indicatorilor.
+    """
     indicators = market_indicators or {}
     benchmarks = []
-    for key in ('SPX', 'NASDAQ'):
-        values = [
-            _safe_number(value, None)
-            for value in indicators.get(key, {}).get('history', [])
-        ]
+    for key, ticker in (('SPX', '^GSPC'), ('NASDAQ', '^NDX')):
+        history = indicators.get(key, {}).get('history', [])
+        context_close = market_context_history(context, ticker).get('Close')
+        if context_close is not None and len(context_close) >= 50:
+            history = context_close.tolist()[-REGIME_HISTORY_SESSIONS:]
+        values = [_safe_number(value, None) for value in history]
         values = [value for value in values if value is not None and value > 0]
         if len(values) < 50:
             continue
@@ -1003,6 +1171,10 @@ def build_us_market_regime(market_indicators=None, economic_phase=None):
             'above_long_average': latest >= long_average,
         })
     vix = _safe_number(indicators.get('VIX', {}).get('value'), None)
+    if vix is None:
+        vix_close = market_context_history(context, '^VIX').get('Close')
+        if vix_close is not None and not vix_close.empty:
+            vix = _safe_number(vix_close.iloc[-1], None)
     phase = str(economic_phase or 'Date insuficiente')
     if not benchmarks:
         trend, trend_factor = 'date insuficiente', 0.6
@@ -1692,18 +1864,30 @@ def _clean_evidence_item(item):
     }
 
 
-def _evidence_cache_is_fresh(cached):
-    if not isinstance(cached, dict) or not cached.get('fetched_at'):
+def _evidence_is_fresh(fetched_at, now):
+    if not fetched_at:
         return False
     try:
-        fetched = datetime.datetime.fromisoformat(cached['fetched_at'].replace('Z', '+00:00'))
+        fetched = datetime.datetime.fromisoformat(str(fetched_at).replace('Z', '+00:00'))
         if fetched.tzinfo is not None:
             fetched = fetched.astimezone(datetime.timezone.utc).replace(tzinfo=None)
-        return _utc_now_naive() - fetched < datetime.timedelta(hours=PORTFOLIO_EVIDENCE_CACHE_HOURS)
+        return now - fetched < datetime.timedelta(hours=PORTFOLIO_EVIDENCE_CACHE_HOURS)
     except (TypeError, ValueError):
         return False
 
 
+def _evidence_session():
+    """Sesiune cu un pool de conexiuni pe măsura colectorului paralel."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=PORTFOLIO_EVIDENCE_WORKERS,
+        pool_maxsize=PORTFOLIO_EVIDENCE_WORKERS,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
 def _fetch_yahoo_company_news(symbol, session):
     encoded_symbol = urllib.parse.quote(symbol, safe='.-^')
     url = f'https://feeds.finance.yahoo.com/rss/2.0/headline?s={encoded_symbol}&region=US&lang=en-US'
@@ -1732,14 +1916,7 @@ def _fetch_yahoo_company_news(symbol, session):
     return items
 
 
-def _fetch_sec_ticker_map(session):
-    response = session.get(
-        SEC_TICKER_MAP_URL,
-        headers={'User-Agent': 'MarketScanner risk dashboard admin@marketscanner.local'},
-        timeout=15,
-    )
-    response.raise_for_status()
-    payload = response.json()
+def _parse_sec_ticker_map(payload):
     return {
         str(entry.get('ticker', '')).upper(): int(entry['cik_str'])
         for entry in payload.values()
@@ -1747,10 +1924,104 @@ def _fetch_sec_ticker_map(session):
     }
 
 
+def _load_sec_ticker_map_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as handle:
+            payload = json.load(handle)
+        tickers = payload['tickers']
+        checked_at = datetime.datetime.fromisoformat(payload['checked_at'])
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+    if not isinstance(tickers, dict) or not tickers:
+        return None
+    payload['checked_at'] = checked_at
+    return payload
+
+
+def _save_sec_ticker_map_cache(cache_path, tickers, checked_at, validators):
+    if not cache_path:
+        return
+    temp_path = f'{cache_path}.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(
+                {
+                    'version': 1,
+                    'checked_at': checked_at.isoformat(),
+                    'etag': validators.get('etag'),
+                    'last_modified': validators.get('last_modified'),
+                    'tickers': tickers,
+                },
+                handle,
+                separators=(',', ':'),
+                sort_keys=True,
+            )
+        os.replace(temp_path, cache_path)
+    except OSError:
+        try:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        except OSError:
+            pass
+
+
+def sec_ticker_map(session=None, cache_path=_DEFAULT_SEC_CACHE, now=None):
+    """Indexul SEC ticker→CIK, comun pentru proces și persistat între rulări.
+
+    Copia de pe disc este folosită fără cerere cât timp e mai nouă de
+    SEC_TICKER_MAP_TTL_DAYS; apoi este revalidată condiționat (ETag /
+    Last-Modified), iar un 304 o reînnoiește fără descărcare. La eroare
+    rămâne ultima copie validă. Cu o sesiune explicită, implicit nu se
+    citește și nu se scrie nimic pe disc.
+    """
+    global _SEC_TICKER_MAP
+    with _SEC_TICKER_MAP_LOCK:
+        if session is None and _SEC_TICKER_MAP is not None:
+            return _SEC_TICKER_MAP
+        if cache_path is _DEFAULT_SEC_CACHE:
+            cache_path = SEC_TICKER_MAP_CACHE_FILE if session is None else None
+        now = now or _utc_now_naive()
+        cached = _load_sec_ticker_map_cache(cache_path)
+        if cached and now - cached['checked_at'] < datetime.timedelta(
+            days=SEC_TICKER_MAP_TTL_DAYS
+        ):
+            tickers = cached['tickers']
+        else:
+            headers = {'User-Agent': SEC_USER_AGENT}
+            if cached and cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached and cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+            try:
+                market_data.throttle_host('sec.gov')
+                response = (session or requests).get(
+                    SEC_TICKER_MAP_URL, headers=headers, timeout=15
+                )
+                if cached and response.status_code == 304:
+                    tickers = cached['tickers']
+                    validators = cached
+                else:
+                    response.raise_for_status()
+                    tickers = _parse_sec_ticker_map(response.json())
+                    validators = {
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                    }
+                _save_sec_ticker_map_cache(cache_path, tickers, now, validators)
+            except (requests.RequestException, ValueError, TypeError, KeyError):
+                tickers = cached['tickers'] if cached else {}
+        if session is None and tickers:
+            _SEC_TICKER_MAP = tickers
+        return tickers
+
+
 def _fetch_sec_filings(symbol, cik, session):
+    market_data.throttle_host('sec.gov')
     response = session.get(
         SEC_SUBMISSIONS_URL.format(cik=cik),
-        headers={'User-Agent': 'MarketScanner risk dashboard admin@marketscanner.local'},
+        headers={'User-Agent': SEC_USER_AGENT},
         timeout=15,
     )
     response.raise_for_status()
@@ -1807,8 +2078,35 @@ def _bvb_calendar_evidence(symbol, calendar_events):
     return items[:4]
 
 
+def _fetch_symbol_evidence(symbol, session, sec_map, calendar_events):
+    """(dovezi, răspuns) pentru un simbol; răspuns dacă măcar o sursă a mers."""
+    items = []
+    responded = False
+    try:
+        items.extend(_fetch_yahoo_company_news(symbol, session))
+        responded = True
+    except (requests.RequestException, ValueError, TypeError, ET.ParseError):
+        pass
+    sec_symbol = symbol.split('.')[0]
+    if not symbol.upper().endswith('.RO') and sec_symbol in sec_map:
+        try:
+            items.extend(_fetch_sec_filings(symbol, sec_map[sec_symbol], session))
+            responded = True
+        except (requests.RequestException, ValueError, TypeError, KeyError, IndexError):
+            pass
+    if symbol.endswith('.RO') and calendar_events is not None:
+        items.extend(_bvb_calendar_evidence(symbol, calendar_events))
+        responded = True
+    return items, responded
+
+
 def collect_portfolio_evidence(snapshot, cached=None, request_session=None, now=None):
-    """Colectează metadate verificabile; la eroare păstrează ultimul cache valid."""
+    """Colectează metadate verificabile; la eroare păstrează ultimul cache valid.
+
+    Cache-ul este per simbol: sunt cerute din nou doar simbolurile noi sau
+    cele mai vechi de PORTFOLIO_EVIDENCE_CACHE_HOURS, în paralel pe o sesiune
+    comună. Un simbol fără niciun răspuns își păstrează dovezile anterioare.
+    """
     now = now or _utc_now_naive()
     symbols = [
         item['symbol']
@@ -1819,65 +2117,94 @@ def collect_portfolio_evidence(snapshot, cached=None, request_session=None, now=
         if item.get('symbol')
     ]
     symbols = list(dict.fromkeys(symbols))
+    cached = cached if isinstance(cached, dict) else {}
+    cached_items = [item for item in cached.get('items', []) if isinstance(item, dict)]
     cached_has_cross_market_sec = any(
         str(item.get('symbol', '')).upper().endswith('.RO')
         and '-sec-' in str(item.get('source_id', '')).lower()
-        for item in (cached or {}).get('items', [])
-        if isinstance(item, dict)
+        for item in cached_items
     )
-    if _evidence_cache_is_fresh(cached) and not cached_has_cross_market_sec:
-        cached_symbols = set(cached.get('symbols', []))
-        if cached_symbols == set(symbols):
-            return cached
-
-    session = request_session or requests.Session()
-    previous_items = [
-        clean for clean in (_clean_evidence_item(item) for item in (cached or {}).get('items', []))
-        if (
-            clean
-            and not (
-                clean['symbol'].endswith('.RO')
-                and '-sec-' in clean['source_id'].lower()
-            )
-        )
+    # Cache-urile vechi au un singur fetched_at pentru toate simbolurile.
+    symbol_fetched_at = cached.get('symbol_fetched_at')
+    if not isinstance(symbol_fetched_at, dict):
+        symbol_fetched_at = {
+            symbol: cached.get('fetched_at') for symbol in cached.get('symbols', [])
+        }
+    stale = [
+        symbol for symbol in symbols
+        if not _evidence_is_fresh(symbol_fetched_at.get(symbol), now)
     ]
-    items = []
-    sec_map = {}
-    try:
-        sec_map = _fetch_sec_ticker_map(session)
-    except (requests.RequestException, ValueError, TypeError, KeyError):
-        pass
-
-    calendar_events = []
-    try:
-        calendar_events = get_economic_events(now=datetime.datetime.now(), request_session=session)
-    except (requests.RequestException, ValueError, TypeError, KeyError):
-        pass
-
-    for symbol in symbols:
-        try:
-            items.extend(_fetch_yahoo_company_news(symbol, session))
-        except (requests.RequestException, ValueError, TypeError, ET.ParseError):
-            pass
-        sec_symbol = symbol.split('.')[0]
-        if not symbol.upper().endswith('.RO') and sec_symbol in sec_map:
+    if (
+        not stale
+        and not cached_has_cross_market_sec
+        and set(cached.get('symbols', [])) == set(symbols)
+        and 'symbol_fetched_at' in cached
+    ):
+        return cached
+
+    previous_by_symbol = {}
+    for item in cached_items:
+        clean = _clean_evidence_item(item)
+        if clean and not (
+            clean['symbol'].endswith('.RO')
+            and '-sec-' in clean['source_id'].lower()
+        ):
+            previous_by_symbol.setdefault(clean['symbol'], []).append(clean)
+
+    fetched_by_symbol = {}
+    if stale:
+        session = request_session or _evidence_session()
+        sec_map = {}
+        if any(not symbol.upper().endswith('.RO') for symbol in stale):
+            sec_map = sec_ticker_map(session=request_session)
+        calendar_events = None
+        if any(symbol.endswith('.RO') for symbol in stale):
             try:
-                items.extend(_fetch_sec_filings(symbol, sec_map[sec_symbol], session))
-            except (requests.RequestException, ValueError, TypeError, KeyError, IndexError):
+                calendar_events = get_economic_events(
+                    now=datetime.datetime.now(), request_session=session
+                )
+            except (requests.RequestException, ValueError, TypeError, KeyError):
                 pass
-        if symbol.endswith('.RO'):
-            items.extend(_bvb_calendar_evidence(symbol, calendar_events))
+        results = market_data.map_bounded(
+            lambda symbol: _fetch_symbol_evidence(
+                symbol, session, sec_map, calendar_events
+            ),
+            stale,
+            max_workers=PORTFOLIO_EVIDENCE_WORKERS,
+        )
+        fetched_by_symbol = {
+            symbol: symbol_items
+            for symbol, (symbol_items, responded) in zip(stale, results)
+            if responded
+        }
 
-    if not items:
-        items = previous_items
+    timestamp = now.isoformat(timespec='seconds')
+    refreshed = False
+    items = []
+    fetched_at = {}
+    for symbol in symbols:
+        previous = previous_by_symbol.get(symbol.upper(), [])
+        if symbol in fetched_by_symbol:
+            fetched_at[symbol] = timestamp
+            # Un flux gol nu șterge dovezile anterioare ale simbolului.
+            fresh_items = fetched_by_symbol[symbol]
+            if fresh_items and fresh_items != previous:
+                refreshed = True
+            items.extend(fresh_items or previous)
+        else:
+            if symbol_fetched_at.get(symbol):
+                fetched_at[symbol] = symbol_fetched_at[symbol]
+            items.extend(previous)
     unique = {}
     for item in items:
         unique[item['source_id']] = item
+    items = list(unique.values())[:60]
     return {
-        'fetched_at': now.isoformat(timespec='seconds'),
+        'fetched_at': timestamp if fetched_by_symbol else cached.get('fetched_at', timestamp),
         'symbols': symbols,
-        'items': list(unique.values())[:60],
-        'status': 'actualizat' if items and items != previous_items else (
+        'symbol_fetched_at': fetched_at,
+        'items': items,
+        'status': 'actualizat' if refreshed else (
             'cache păstrat' if items else 'indisponibil'
         ),
     }
@@ -4362,6 +4689,7 @@ def get_finviz_market_tide():
     
     try:
         # Increase timeout to 10s to avoid flakes
+        market_data.throttle_host('finviz.com')
         r = requests.get(url, headers=headers, timeout=10)
         
         if r.status_code != 200:
@@ -4455,6 +4783,7 @@ def get_finviz_count(filter_type):
     """Get count of S&P 500 stocks above a moving average from Finviz"""
     url = f'https://finviz.com/screener.ashx?v=111&f=idx_sp500,ta_{filter_type}_pa'
     try:
+        market_data.throttle_host('finviz.com')
         r = requests.get(url, headers=finviz_headers, timeout=5) # Short timeout
         match = re.search(r'(\d+)\s*Total', r.text)
         if match:
@@ -4545,14 +4874,16 @@ def get_fallback_breadth():
         return None
 
 
-def get_swing_trading_data(data=None):
+def get_swing_trading_data(data=None, context=None):
     """ Fetches data for Swing Trading Analysis including historical context. """
     if data is None: data = {}
+    # Toate seriile și cererile externe vin din contextul comun al rulării;
+    # în afara ei se descarcă numai indicii, fără ETF-urile sectoriale.
+    context = context or fetch_market_context(US_INDEX_TICKERS)
     
     # 1. SPX Data
     try:
-        spx = yf.Ticker("^GSPC")
-        hist = spx.history(period="2y") 
+        hist = market_context_history(context, "^GSPC", "2y")
         if not hist.empty:
             hist = hist.dropna(subset=['Close'])
             current_price = hist['Close'].iloc[-1]
@@ -4609,8 +4940,7 @@ def get_swing_trading_data(data=None):
 
     # 1b. Nasdaq (NDX) Data - "Motorul" pieței tech
     try:
-        ndx = yf.Ticker("^NDX")
-        hist_ndx = ndx.history(period="2y")
+        hist_ndx = market_context_history(context, "^NDX", "2y")
         if not hist_ndx.empty:
             hist_ndx = hist_ndx.dropna(subset=['Close'])
             ndx_price = hist_ndx['Close'].iloc[-1]
@@ -4661,8 +4991,7 @@ def get_swing_trading_data(data=None):
 
     # 1c. VIX Volatility Data
     try:
-        vix = yf.Ticker("^VIX")
-        hist_vix = vix.history(period="6mo")
+        hist_vix = market_context_history(context, "^VIX", "6mo")
         if not hist_vix.empty:
             hist_vix = hist_vix.dropna(subset=['Close'])
             vix_current = hist_vix['Close'].iloc[-1]
@@ -4686,8 +5015,7 @@ def get_swing_trading_data(data=None):
 
     # 1d. SKEW (Tail Risk / Black Swan Index)
     try:
-        skew_ticker = yf.Ticker("^SKEW")
-        hist_skew = skew_ticker.history(period="3mo")
+        hist_skew = market_context_history(context, "^SKEW", "3mo")
         if not hist_skew.empty:
             hist_skew = hist_skew.dropna(subset=['Close'])
             skew_current = hist_skew['Close'].iloc[-1]
@@ -4706,7 +5034,7 @@ def get_swing_trading_data(data=None):
         
         # 1e. Market Breadth Full Tide (from Finviz Home)
         try:
-            tide = get_finviz_market_tide()
+            tide = context.get('market_tide')
             if tide:
                 data['Market_Tide'] = tide
                 print(f"    -> Market Tide: Adv {tide.get('Advancing', '?')}/{tide.get('Declining', '?')}, Highs {tide.get('NewHighs', '?')}/{tide.get('NewLows', '?')}")
@@ -4714,8 +5042,8 @@ def get_swing_trading_data(data=None):
             print(f"    ⚠️ Error fetching Market Tide: {e}")
 
         # Try Finviz First
-        res_200 = get_finviz_count('sma200')
-        res_50 = get_finviz_count('sma50')
+        res_200 = context.get('breadth_counts', {}).get('sma200')
+        res_50 = context.get('breadth_counts', {}).get('sma50')
         
         above_200 = res_200[0] if res_200 else None
         above_50 = res_50[0] if res_50 else None
@@ -4773,63 +5101,56 @@ def get_swing_trading_data(data=None):
 
     # 2. Fear & Greed AND PCR from CNN
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json',
-            'Referer': 'https://edition.cnn.com',
-            'Origin': 'https://edition.cnn.com'
-        }
-        r = requests.get("https://production.dataviz.cnn.io/index/fearandgreed/graphdata", headers=headers, timeout=10)
+        j = context.get('fear_greed')
+        if not j:
+            raise ValueError('CNN Fear & Greed indisponibil')
         pcr_fetched_from_cnn = False
         
-        if r.status_code == 200:
-            j = r.json()
+        # F&G Logic
+        data['FG_Score'] = j.get('fear_and_greed', {}).get('score', 50)
+        data['FG_Rating'] = j.get('fear_and_greed', {}).get('rating', 'neutral')
+        hist = j.get('fear_and_greed_historical', {}).get('data', [])
+        if hist:
+            sorted_hist = sorted(hist, key=lambda x: x['x'])
+            data['Chart_FG'] = [item['y'] for item in sorted_hist[-60:]]
             
-            # F&G Logic
-            data['FG_Score'] = j.get('fear_and_greed', {}).get('score', 50)
-            data['FG_Rating'] = j.get('fear_and_greed', {}).get('rating', 'neutral')
-            hist = j.get('fear_and_greed_historical', {}).get('data', [])
-            if hist:
-                sorted_hist = sorted(hist, key=lambda x: x['x'])
-                data['Chart_FG'] = [item['y'] for item in sorted_hist[-60:]]
-                
-                # F&G SMA5 Logic (Trend Detection)
-                # Calculate SMA5 on full history
-                fg_series = pd.Series([item['y'] for item in sorted_hist])
-                if len(fg_series) >= 5:
-                    fg_sma5 = fg_series.rolling(window=5).mean().iloc[-1]
-                    data['FG_SMA5'] = float(fg_sma5)
-                    print(f"    -> Trend F&G: Score {data['FG_Score']:.0f} vs SMA5 {fg_sma5:.1f}")
-            else:
-                data['Chart_FG'] = [data['FG_Score']] * 60
-                
-            # PCR Logic from CNN (Priority)
-            if 'put_call_options' in j:
-                 try:
-                     pcr_list = j['put_call_options'].get('data', [])
-                     if pcr_list:
-                         sorted_pcr = sorted(pcr_list, key=lambda x: x['x'])
-                         last_item = sorted_pcr[-1]
-                         data['PCR_Value'] = last_item['y']
-                         data['Chart_PCR'] = [item['y'] for item in sorted_pcr[-60:]]
+            # F&G SMA5 Logic (Trend Detection)
+            # Calculate SMA5 on full history
+            fg_series = pd.Series([item['y'] for item in sorted_hist])
+            if len(fg_series) >= 5:
+                fg_sma5 = fg_series.rolling(window=5).mean().iloc[-1]
+                data['FG_SMA5'] = float(fg_sma5)
+                print(f"    -> Trend F&G: Score {data['FG_Score']:.0f} vs SMA5 {fg_sma5:.1f}")
+        else:
+            data['Chart_FG'] = [data['FG_Score']] * 60
+            
+        # PCR Logic from CNN (Priority)
+        if 'put_call_options' in j:
+             try:
+                 pcr_list = j['put_call_options'].get('data', [])
+                 if pcr_list:
+                     sorted_pcr = sorted(pcr_list, key=lambda x: x['x'])
+                     last_item = sorted_pcr[-1]
+                     data['PCR_Value'] = last_item['y']
+                     data['Chart_PCR'] = [item['y'] for item in sorted_pcr[-60:]]
+                     
+                     # Calculate MA10
+                     pcr_vals = [item['y'] for item in sorted_pcr[-70:]] # Get a bit more for rolling window
+                     if len(pcr_vals) >= 10:
+                         ma_series = pd.Series(pcr_vals).rolling(window=10).mean().iloc[-1]
+                         data['PCR_MA10'] = float(ma_series)
+                         
+                         # Generate MA10 Series for Chart
+                         # Need to align with Chart_PCR (last 60)
+                         # So we compute rolling on full history then slice last 60
+                         full_series = pd.Series([item['y'] for item in sorted_pcr])
+                         ma_full = full_series.rolling(window=10).mean()
+                         data['Chart_PCR_MA10'] = ma_full.iloc[-60:].fillna(0).tolist()
                          
-                         # Calculate MA10
-                         pcr_vals = [item['y'] for item in sorted_pcr[-70:]] # Get a bit more for rolling window
-                         if len(pcr_vals) >= 10:
-                             ma_series = pd.Series(pcr_vals).rolling(window=10).mean().iloc[-1]
-                             data['PCR_MA10'] = float(ma_series)
-                             
-                             # Generate MA10 Series for Chart
-                             # Need to align with Chart_PCR (last 60)
-                             # So we compute rolling on full history then slice last 60
-                             full_series = pd.Series([item['y'] for item in sorted_pcr])
-                             ma_full = full_series.rolling(window=10).mean()
-                             data['Chart_PCR_MA10'] = ma_full.iloc[-60:].fillna(0).tolist()
-                             
-                         pcr_fetched_from_cnn = True
-                         print(f"    -> PCR fetched from CNN (Value: {data['PCR_Value']:.2f}, MA10: {data.get('PCR_MA10', 'N/A')})")
-                 except Exception as e:
-                     print(f"Error parsing CNN PCR: {e}")
+                     pcr_fetched_from_cnn = True
+                     print(f"    -> PCR fetched from CNN (Value: {data['PCR_Value']:.2f}, MA10: {data.get('PCR_MA10', 'N/A')})")
+             except Exception as e:
+                 print(f"Error parsing CNN PCR: {e}")
 
     except Exception as e:
         print(f"Error Swing Data (CNN): {e}")
@@ -4840,11 +5161,10 @@ def get_swing_trading_data(data=None):
     if not data.get('PCR_Value'):
         try:
             # Try Yahoo Tickers
-            tickers = ['^CPC', '^PCR', '^PCX']
             pcr_found = False
-            for t in tickers:
+            for t in PCR_TICKERS:
                 try:
-                    temp = yf.Ticker(t).history(period="3mo")
+                    temp = _download_context_ticker(t, period="3mo")
                     if not temp.empty:
                         temp = temp.dropna(subset=['Close'])
                         data['PCR_Value'] = temp['Close'].iloc[-1]
@@ -1,102 +1,647 @@
 # -*- coding: utf-8 -*-
+import hashlib
+import io
 import os
 import json
+import re
+
+import numpy as np
 
 STATE_FILE = "dashboard_state.json"
+STATE_MANIFEST = "manifest.json"
 MARKET_HISTORY_FILE = "market_history.json"
 
-def load_state():
-    """Încărcare state din fișier JSON."""
-    if os.path.exists(STATE_FILE):
+def load_state(path=None, charts=True, on_error=None):
+    """Încărcare state din fișier JSON.
+
+    Cu charts=True seriile de grafic mutate în sidecar sunt refăcute în
+    înregistrări (vezi hydrate_chart_series). Un fișier ilizibil dă o stare
+    goală; excepția este transmisă lui on_error, dacă există.
+    """
+    path = path or STATE_FILE
+    if os.path.exists(path):
         try:
-            with open(STATE_FILE, 'r') as f:
-                return json.load(f)
-        except:
+            with open(path, 'r') as f:
+                state = json.load(f)
+        except Exception as e:
+            if on_error is not None:
+                on_error(e)
             return {}
+        if charts:
+            hydrate_chart_series(state, path)
+        return state
     return {}
 
-def save_state(state):
-    """Salvare state în fișier JSON."""
-    with open(STATE_FILE, 'w') as f:
-        json.dump(state, f, indent=2)
-        
+
+def state_sections_dir(path=None):
+    """Directorul cu câte un fișier JSON pentru fiecare secțiune a stării."""
+    return os.path.splitext(path or STATE_FILE)[0] + ".sections"
+
+
+def _section_filename(key):
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", key)[:60]
+    return f"{safe}-{_digest(key)[:8]}.json"
+
+
+class StateSections:
+    """Acces leneș, doar pentru citire, la secțiunile stării salvate.
+
+    Citește manifestul scris de save_state și încarcă o secțiune abia la
+    primul acces. Dacă manifestul lipsește sau nu corespunde fișierului
+    principal (de exemplu după un git checkout), parsează o singură dată
+    dashboard_state.json. Cu charts=True (implicit) seriile de grafic din
+    sidecar sunt refăcute în înregistrările secțiunii citite. on_error
+    primește eroarea când fișierul principal nu poate fi citit (vezi
+    load_state). Valorile întoarse sunt partajate: nu le modificați.
+    """
+
+    def __init__(self, path=None, charts=True, on_error=None):
+        self.path = path or STATE_FILE
+        self.charts = charts
+        self.on_error = on_error
+        self._signature = False
+        self._sections = None
+        self._values = {}
+        self._full = None
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            signature = None
+        if signature == self._signature:
+            return
+        self._signature = signature
+        self._values = {}
+        self._full = None
+        self._sections = None
+        if signature is None:
+            self._full = {}
+            return
+        manifest_path = os.path.join(state_sections_dir(self.path), STATE_MANIFEST)
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if [manifest.get("state_size"), manifest.get("state_mtime_ns")] == list(signature):
+            self._sections = manifest.get("sections") or {}
+
+    def _load_full(self):
+        if self._full is None:
+            self._full = load_state(
+                self.path, charts=self.charts, on_error=self.on_error
+            )
+        return self._full
+
+    def keys(self):
+        self._refresh()
+        if self._sections is None:
+            return list(self._load_full().keys())
+        return list(self._sections.keys())
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def get(self, key, default=None):
+        self._refresh()
+        if self._sections is None:
+            return self._load_full().get(key, default)
+        if key in self._values:
+            return self._values[key]
+        entry = self._sections.get(key)
+        if entry is None:
+            return default
+        try:
+            with open(os.path.join(state_sections_dir(self.path), entry["file"]), "r") as f:
+                value = json.load(f)
+        except (OSError, ValueError, KeyError):
+            self._sections = None
+            return self._load_full().get(key, default)
+        if self.charts:
+            hydrate_chart_series({key: value}, self.path)
+        self._values[key] = value
+        return value
+
+    def __getitem__(self, key):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+
+def load_state_sections(keys, path=None):
+    """Doar secțiunile cerute din stare, fără a parsa restul fișierului."""
+    sections = StateSections(path)
+    missing = object()
+    result = {}
+    for key in keys:
+        value = sections.get(key, missing)
+        if value is not missing:
+            result[key] = value
+    return result
+
+# Grupurile alfabetice ale watchlistului (pentru a evita ResponseTooLargeError în ChatGPT)
+WATCHLIST_GROUPS = {
+    "A_D": ("A", "B", "C", "D"),
+    "E_H": ("E", "F", "G", "H"),
+    "I_L": ("I", "J", "K", "L"),
+    "M_P": ("M", "N", "O", "P"),
+    "Q_T": ("Q", "R", "S", "T"),
+    "U_Z": ("U", "V", "W", "X", "Y", "Z")
+}
+INDICATOR_SECTIONS = ("rates", "market_indicators", "vix_val", "eco_phase", "eco_next_phase")
+
+# Amprenta conținutului scris ultima dată în fiecare fișier și a fiecărei
+# secțiuni din state la ultima salvare, pentru a rescrie doar ce s-a schimbat.
+_FILE_DIGESTS = {}
+_SECTION_DIGESTS = {}
+
+
+def _compact_json(value):
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def write_json_if_changed(path, payload=None, text=None):
+    """Scrie JSON compact atomic (temp + rename) doar dacă s-a schimbat conținutul.
+
+    Întoarce True dacă fișierul a fost rescris.
+    """
+    if text is None:
+        text = _compact_json(payload)
+    return _write_if_changed(path, text.encode("utf-8"))
+
+
+def _write_if_changed(path, data):
+    digest = hashlib.sha1(data).hexdigest()
+    known = _FILE_DIGESTS.get(path)
+    if known is None and os.path.exists(path):
+        with open(path, "rb") as f:
+            known = hashlib.sha1(f.read()).hexdigest()
+    if known == digest and os.path.exists(path):
+        _FILE_DIGESTS[path] = digest
+        return False
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    _FILE_DIGESTS[path] = digest
+    return True
+
+
+def _without_sparkline(item):
+    item_copy = dict(item)
+    item_copy.pop("Sparkline", None)
+    return item_copy
+
+
+def _watchlist_views(watchlist):
+    """Watchlist BUY, compact și pe grupuri alfabetice, într-o singură trecere."""
+    buy_watchlist = []
+    compact_watchlist = []
+    grouped_watchlists = {g: [] for g in WATCHLIST_GROUPS}
+    group_by_letter = {
+        letter: group_name
+        for group_name, letters in WATCHLIST_GROUPS.items()
+        for letter in letters
+    }
+    for item in watchlist:
+        item_copy = _without_sparkline(item)
+        compact_watchlist.append(item_copy)
+        decision = str(item.get("Decision", "")).upper()
+        consensus = str(item.get("Consensus", "")).upper()
+        if "BUY" in decision and "BUY" in consensus:
+            buy_watchlist.append(item_copy)
+        ticker = str(item.get("Ticker", "")).upper()
+        if ticker:
+            grouped_watchlists[group_by_letter.get(ticker[0], "A_D")].append(item_copy)
+    return buy_watchlist, compact_watchlist, grouped_watchlists
+
+
+def _save_state_sections(sections, digests, path=None):
+    """Câte un fișier per secțiune plus manifestul legat de fișierul principal."""
+    path = path or STATE_FILE
+    if not all(isinstance(key, str) for key in sections):
+        return
+    directory = state_sections_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    entries = {}
+    for key, text in sections.items():
+        filename = _section_filename(key)
+        write_json_if_changed(os.path.join(directory, filename), text=text)
+        entries[key] = {"file": filename, "sha1": digests[key]}
+    expected = {entry["file"] for entry in entries.values()} | {STATE_MANIFEST}
+    for filename in os.listdir(directory):
+        if filename.endswith(".json") and filename not in expected:
+            os.remove(os.path.join(directory, filename))
+            _FILE_DIGESTS.pop(os.path.join(directory, filename), None)
+    stat = os.stat(path)
+    write_json_if_changed(
+        os.path.join(directory, STATE_MANIFEST),
+        {
+            "version": 1,
+            "state_size": stat.st_size,
+            "state_mtime_ns": stat.st_mtime_ns,
+            "sections": entries,
+        },
+    )
+
+
+# Seriile de grafic (Chart_History/Chart_Dates/Chart_OHLC) sunt ~90% din
+# dashboard_state.json. Le ținem într-un sidecar columnar: o matrice float64
+# (rânduri = serii, coloane = axa comună de date; float32 rotunjea prețurile
+# mari) plus un index JSON cu rândurile fiecărei înregistrări; în stare rămâne
+# doar Chart_Ref. Sidecar-ul se comite împreună cu starea; fiecare Chart_Ref
+# poartă amprenta sidecar-ului scris odată cu ea, deci o pereche desincronizată
+# (sidecar lipsă sau din alt commit) dă ChartSeriesError, nu grafice goale.
+CHART_SERIES_FIELDS = ("Chart_History", "Chart_Dates", "Chart_OHLC")
+CHART_REF_FIELD = "Chart_Ref"
+_OHLC_FIELDS = ("open", "high", "low", "close")
+_OHLC_KEYS = frozenset(("date",) + _OHLC_FIELDS)
+_CHART_DECIMALS = 4
+
+
+class ChartSeriesError(RuntimeError):
+    """Sidecar-ul de grafic lipsește sau nu corespunde stării care îl referă."""
+
+
+def chart_series_paths(path=None):
+    """(matrice .npy, index .json) ale sidecar-ului pentru fișierul de stare."""
+    stem = os.path.splitext(path or STATE_FILE)[0]
+    return f"{stem}.charts.npy", f"{stem}.charts.json"
+
+
+def _finite_floats(values):
+    try:
+        floats = [float(value) for value in values]
+    except (TypeError, ValueError):
+        return None
+    if not all(np.isfinite(floats)):
+        return None
+    return floats
+
+
+def _columnar_chart(record):
+    """(câmpuri, date, istoric, bare OHLC) sau None dacă seriile nu se pot alinia."""
+    fields = [field for field in CHART_SERIES_FIELDS if field in record]
+    if not fields:
+        return None
+    history = record.get("Chart_History") or []
+    dates = record.get("Chart_Dates") or []
+    bars = record.get("Chart_OHLC") or []
+    if len(history) != len(dates) or len(set(dates)) != len(dates):
+        return None
+    history = _finite_floats(history)
+    if history is None:
+        return None
+    if not all(isinstance(bar, dict) and set(bar) == _OHLC_KEYS for bar in bars):
+        return None
+    bar_dates = [bar["date"] for bar in bars]
+    if len(set(bar_dates)) != len(bar_dates):
+        return None
+    if not all(isinstance(date, str) for date in list(dates) + bar_dates):
+        return None
+    ohlc = _finite_floats(bar[key] for bar in bars for key in _OHLC_FIELDS)
+    if ohlc is None:
+        return None
+    return fields, list(dates), history, bar_dates, ohlc
+
+
+def _split_chart_series(state):
+    """Copie a stării cu seriile mutate în sidecar: (stare, matrice, index).
+
+    Înregistrările ale căror serii nu pot fi aliniate pe date rămân inline.
+    """
+    persisted = dict(state)
+    charts = {}
+    for section, value in state.items():
+        if not isinstance(section, str) or not isinstance(value, list):
+            continue
+        records = None
+        for position, record in enumerate(value):
+            if not isinstance(record, dict):
+                continue
+            if CHART_REF_FIELD in record and not any(f in record for f in CHART_SERIES_FIELDS):
+                # Stare citită cu charts=False: salvarea ar pierde graficele.
+                raise ChartSeriesError(
+                    f"{section}: {record[CHART_REF_FIELD]} nu are seriile refăcute"
+                )
+            chart = _columnar_chart(record)
+            if chart is None:
+                continue
+            symbol = record.get("Ticker") or record.get("Symbol") or position
+            key = f"{section}/{symbol}"
+            if key in charts:
+                key = f"{key}#{position}"
+            charts[key] = chart
+            record = {
+                k: v for k, v in record.items()
+                if k not in CHART_SERIES_FIELDS and k != CHART_REF_FIELD
+            }
+            record[CHART_REF_FIELD] = key
+            if records is None:
+                records = list(value)
+            records[position] = record
+        if records is not None:
+            persisted[section] = records
+    if not charts:
+        return persisted, None, None
+
+    axis = sorted({d for chart in charts.values() for d in chart[1] + chart[3]})
+    column = {date: i for i, date in enumerate(axis)}
+    rows = sum((1 if chart[1] else 0) + (4 if chart[3] else 0) for chart in charts.values())
+    matrix = np.full((rows, len(axis)), np.nan, dtype=np.float64)
+    series = {}
+    row = 0
+    for key, (fields, dates, history, bar_dates, ohlc) in charts.items():
+        entry = {"fields": fields}
+        if dates:
+            matrix[row, [column[d] for d in dates]] = history
+            entry["history"] = row
+            row += 1
+        if bar_dates:
+            columns = [column[d] for d in bar_dates]
+            matrix[row:row + 4, columns] = np.asarray(ohlc).reshape(-1, 4).T
+            entry["ohlc"] = row
+            row += 4
+        series[key] = entry
+    index = {"version": 1, "dates": axis, "series": series}
+    tag = _chart_tag(matrix, index)
+    index["digest"] = tag
+    for section, value in persisted.items():
+        if not isinstance(value, list) or section not in state or value is state[section]:
+            continue
+        for record in value:
+            if isinstance(record, dict) and CHART_REF_FIELD in record:
+                record[CHART_REF_FIELD] = f"{record[CHART_REF_FIELD]}@{tag}"
+    return persisted, matrix, index
+
+
+def _chart_tag(matrix, index):
+    """Amprenta scurtă a matricei și a indexului, legată de fiecare Chart_Ref."""
+    digest = hashlib.sha1(matrix.tobytes())
+    digest.update(_compact_json(index).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def _save_chart_series(matrix, index, path=None):
+    """Scrie matricea și apoi indexul, fiecare atomic și doar dacă s-a schimbat."""
+    matrix_path, index_path = chart_series_paths(path)
+    buffer = io.BytesIO()
+    np.save(buffer, matrix, allow_pickle=False)
+    _write_if_changed(matrix_path, buffer.getvalue())
+    index = dict(index, shape=list(matrix.shape))
+    write_json_if_changed(index_path, index)
+
+
+def _chart_fields(entry, matrix, dates):
+    fields = {}
+    history, chart_dates, bars = [], [], []
+    row = entry.get("history")
+    if row is not None:
+        values = np.asarray(matrix[row], dtype=np.float64)
+        positions = np.flatnonzero(~np.isnan(values))
+        history = np.round(values[positions], _CHART_DECIMALS).tolist()
+        chart_dates = [dates[i] for i in positions.tolist()]
+    row = entry.get("ohlc")
+    if row is not None:
+        block = np.asarray(matrix[row:row + 4], dtype=np.float64)
+        positions = np.flatnonzero(~np.isnan(block[3]))
+        block = np.round(block[:, positions], _CHART_DECIMALS).tolist()
+        bars = [
+            {"date": dates[i], "open": o, "high": h, "low": l, "close": c}
+            for i, o, h, l, c in zip(positions.tolist(), *block)
+        ]
+    values = {"Chart_History": history, "Chart_Dates": chart_dates, "Chart_OHLC": bars}
+    for field in entry.get("fields", CHART_SERIES_FIELDS):
+        fields[field] = values[field]
+    return fields
+
+
+def hydrate_chart_series(state, path=None):
+    """Reface în loc seriile înregistrărilor care au doar Chart_Ref.
+
+    Matricea este deschisă cu memmap, deci se citesc doar rândurile cerute.
+    Dacă sidecar-ul lipsește, este corupt, provine din altă salvare sau nu
+    conține o referință, ridică ChartSeriesError înainte de a modifica starea.
+    """
+    records = [
+        record
+        for value in state.values() if isinstance(value, list)
+        for record in value
+        if isinstance(record, dict) and CHART_REF_FIELD in record
+    ]
+    if not records:
+        return state
+    matrix_path, index_path = chart_series_paths(path)
+    try:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        matrix = np.load(matrix_path, mmap_mode="r", allow_pickle=False)
+        if list(matrix.shape) != index.get("shape"):
+            raise ValueError("sidecar inconsistent")
+        dates = index["dates"]
+        series = index["series"]
+        tag = index["digest"]
+    except (OSError, ValueError, KeyError) as e:
+        raise ChartSeriesError(
+            f"Seriile de grafic nu pot fi încărcate din {matrix_path}: {e}"
+        ) from e
+    entries = []
+    for record in records:
+        key, _, ref_tag = str(record[CHART_REF_FIELD]).rpartition("@")
+        if ref_tag != tag:
+            raise ChartSeriesError(
+                f"{matrix_path} nu corespunde stării ({ref_tag} != {tag})"
+            )
+        entry = series.get(key)
+        if entry is None:
+            raise ChartSeriesError(f"{key} lipsește din {matrix_path}")
+        entries.append(entry)
+    for record, entry in zip(records, entries):
+        del record[CHART_REF_FIELD]
+        record.update(_chart_fields(entry, matrix, dates))
+    return state
+
+
+def drop_chart_refs(state):
+    """Elimină Chart_Ref-urile nehidratate, pentru a reconstrui graficele.
+
+    Doar pentru scanner, care recalculează seriile la rulare; cititorii stării
+    primesc ChartSeriesError și nu trebuie să piardă graficele în tăcere.
+    """
+    for value in state.values():
+        if isinstance(value, list):
+            for record in value:
+                if isinstance(record, dict):
+                    record.pop(CHART_REF_FIELD, None)
+    return state
+
+
+def save_state(state, path=None):
+    """Salvare state în fișier JSON.
+
+    Fiecare secțiune este serializată o singură dată; fișierele derivate sunt
+    reconstruite doar când secțiunile din care provin s-au schimbat, iar un
+    fișier este rescris doar dacă noul conținut diferă de cel de pe disc.
+    Seriile de grafic ale înregistrărilor merg în sidecar-ul columnar
+    (chart_series_paths), iar înregistrările păstrează doar Chart_Ref în
+    dashboard_state.json; portfolio.json și fișierele watchlist sunt
+    construite din înregistrările complete. path schimbă fișierul de stare
+    (implicit STATE_FILE); fișierele derivate sunt scrise lângă el.
+    """
+    path = path or STATE_FILE
+    directory = os.path.dirname(path)
+    full_state = state
+    persisted, matrix, chart_index = _split_chart_series(state)
+    chart_digest = None
+    try:
+        if matrix is not None:
+            _save_chart_series(matrix, chart_index, path)
+            chart_digest = chart_index["digest"]
+        state = persisted
+    except OSError as e:
+        # Fără sidecar, seriile rămân inline ca să nu pierdem graficele.
+        print(f"⚠️ Eroare la salvarea seriilor de grafic: {e}")
+    sections = {key: _compact_json(value) for key, value in state.items()}
+    if all(isinstance(key, str) for key in sections):
+        state_text = "{" + ",".join(
+            f"{json.dumps(key)}:{text}" for key, text in sections.items()
+        ) + "}"
+    else:
+        state_text = _compact_json(state)
+    write_json_if_changed(path, text=state_text)
+
+    digests = {key: _digest(text) for key, text in sections.items()}
+    try:
+        _save_state_sections(sections, digests, path)
+    except OSError as e:
+        print(f"⚠️ Eroare la salvarea secțiunilor stării: {e}")
+    previous = dict(_SECTION_DIGESTS)
+    _SECTION_DIGESTS.clear()
+    _SECTION_DIGESTS.update(digests)
+    # Seriile din sidecar nu apar în secțiuni; schimbarea lor reconstruiește
+    # și fișierele derivate.
+    _SECTION_DIGESTS[CHART_REF_FIELD] = chart_digest
+    digests = dict(_SECTION_DIGESTS)
+    state = full_state
+
+    def changed(*keys):
+        return not previous or any(digests.get(key) != previous.get(key) for key in keys)
+
+    def beside(name):
+        return os.path.join(directory, name)
+
     # Salvare fișiere secționate mai mici pentru ChatGPT / Custom GPTs
     try:
         # 1. Portofoliu curat (fără sparkline)
-        clean_portfolio = []
-        for item in state.get("portfolio", []):
-            item_copy = dict(item)
-            item_copy.pop("Sparkline", None)
-            clean_portfolio.append(item_copy)
-        with open("portfolio.json", "w") as f:
-            json.dump(clean_portfolio, f, indent=2)
-            
+        if changed("portfolio", CHART_REF_FIELD) or not os.path.exists(beside("portfolio.json")):
+            write_json_if_changed(
+                beside("portfolio.json"),
+                [_without_sparkline(item) for item in state.get("portfolio", [])],
+            )
+
         # 2. Indicatori macro și de piață
-        indicators = {
-            "rates": state.get("rates", {}),
-            "market_indicators": state.get("market_indicators", {}),
-            "vix_val": state.get("vix_val"),
-            "eco_phase": state.get("eco_phase"),
-            "eco_next_phase": state.get("eco_next_phase")
-        }
-        with open("market_indicators.json", "w") as f:
-            json.dump(indicators, f, indent=2)
-            
-        # 3. Watchlist cu decizii active de BUY și Consens Buy / Strong Buy
-        buy_watchlist = []
-        for item in state.get("watchlist", []):
-            decision = str(item.get("Decision", "")).upper()
-            consensus = str(item.get("Consensus", "")).upper()
-            if "BUY" in decision and "BUY" in consensus:
-                item_copy = dict(item)
-                item_copy.pop("Sparkline", None)
-                buy_watchlist.append(item_copy)
-        with open("watchlist_buy.json", "w") as f:
-            json.dump(buy_watchlist, f, indent=2)
-            
-        # 4. Watchlist compact (toate elementele, fără sparklines pentru a reduce dimensiunea)
-        compact_watchlist = []
-        for item in state.get("watchlist", []):
-            item_copy = dict(item)
-            item_copy.pop("Sparkline", None)
-            compact_watchlist.append(item_copy)
-        with open("watchlist_compact.json", "w") as f:
-            json.dump(compact_watchlist, f, indent=2)
-            
-        # 5. Watchlist-uri segmentate alfabetic (pentru a evita ResponseTooLargeError în ChatGPT)
-        groups = {
-            "A_D": ("A", "B", "C", "D"),
-            "E_H": ("E", "F", "G", "H"),
-            "I_L": ("I", "J", "K", "L"),
-            "M_P": ("M", "N", "O", "P"),
-            "Q_T": ("Q", "R", "S", "T"),
-            "U_Z": ("U", "V", "W", "X", "Y", "Z")
-        }
-        grouped_watchlists = {g: [] for g in groups}
-        
-        for item in state.get("watchlist", []):
-            ticker = str(item.get("Ticker", "")).upper()
-            if not ticker:
-                continue
-            first_letter = ticker[0]
-            placed = False
-            for group_name, letters in groups.items():
-                if first_letter in letters:
-                    item_copy = dict(item)
-                    item_copy.pop("Sparkline", None)
-                    grouped_watchlists[group_name].append(item_copy)
-                    placed = True
-                    break
-            if not placed:
-                item_copy = dict(item)
-                item_copy.pop("Sparkline", None)
-                grouped_watchlists["A_D"].append(item_copy)
-                
-        for group_name, watchlist_subset in grouped_watchlists.items():
-            filename = f"watchlist_{group_name.lower()}.json"
-            with open(filename, "w") as f:
-                json.dump(watchlist_subset, f, indent=2)
-            
+        if changed(*INDICATOR_SECTIONS) or not os.path.exists(beside("market_indicators.json")):
+            indicators = {
+                "rates": state.get("rates", {}),
+                "market_indicators": state.get("market_indicators", {}),
+                "vix_val": state.get("vix_val"),
+                "eco_phase": state.get("eco_phase"),
+                "eco_next_phase": state.get("eco_next_phase")
+            }
+            write_json_if_changed(beside("market_indicators.json"), indicators)
+
+        # 3-5. Watchlist BUY (decizie BUY și consens Buy / Strong Buy), compact
+        # (fără sparklines) și segmentat alfabetic
+        watchlist_files = ["watchlist_buy.json", "watchlist_compact.json"] + [
+            f"watchlist_{group_name.lower()}.json" for group_name in WATCHLIST_GROUPS
+        ]
+        if changed("watchlist", CHART_REF_FIELD) or not all(
+            os.path.exists(beside(f)) for f in watchlist_files
+        ):
+            buy_watchlist, compact_watchlist, grouped_watchlists = _watchlist_views(
+                state.get("watchlist", [])
+            )
+            write_json_if_changed(beside("watchlist_buy.json"), buy_watchlist)
+            write_json_if_changed(beside("watchlist_compact.json"), compact_watchlist)
+            for group_name, watchlist_subset in grouped_watchlists.items():
+                write_json_if_changed(
+                    beside(f"watchlist_{group_name.lower()}.json"),
+                    watchlist_subset,
+                )
+
     except Exception as e:
         print(f"⚠️ Eroare la salvarea fișierelor secționate JSON: {e}")
 
+
+
+# Istoricul indicatorilor de piață (market_history.json): câte o serie
+# {dată: valoare} pe indicator, ordonată după dată. Pe disc seriile sunt
+# coloane (dates/values); fișierele vechi, liste de {date, value}, sunt citite
+# în continuare.
+MARKET_HISTORY_RETENTION = 60
+
+
+def load_market_series(path=None):
+    """{indicator: {dată: valoare}} din market_history.json ({} dacă lipsește)."""
+    path = path or MARKET_HISTORY_FILE
+    try:
+        with open(path, "r") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(payload, dict):
+        return {}
+    series = {}
+    if payload.get("version") == 2:
+        for name, columns in (payload.get("series") or {}).items():
+            try:
+                series[name] = dict(zip(columns["dates"], columns["values"]))
+            except (KeyError, TypeError):
+                continue
+        return series
+    for name, points in payload.items():
+        if isinstance(points, list):
+            series[name] = {
+                point["date"]: point["value"]
+                for point in points
+                if isinstance(point, dict) and "date" in point and "value" in point
+            }
+    return series
+
+
+def save_market_series(series, path=None):
+    """Scrie seriile pe coloane, atomic și doar dacă s-au schimbat."""
+    write_json_if_changed(
+        path or MARKET_HISTORY_FILE,
+        {
+            "version": 2,
+            "series": {
+                name: {"dates": list(points), "values": list(points.values())}
+                for name, points in series.items()
+            },
+        },
+    )
+
+
+def merge_series(points, bars, retention=MARKET_HISTORY_RETENTION):
+    """Upsert al barelor (dată, valoare) într-o singură trecere, apoi retenția.
+
+    points este o serie {dată ISO: valoare} ordonată; barele existente sunt
+    înlocuite, iar rezultatul păstrează ultimele `retention` date.
+    """
+    merged = dict(points)
+    merged.update(bars)
+    dates = list(merged)
+    if any(earlier > later for earlier, later in zip(dates, dates[1:])):
+        dates.sort()
+    if retention is not None:
+        dates = dates[-retention:]
+    return {date: merged[date] for date in dates}
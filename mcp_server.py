@@ -6,6 +6,8 @@ import subprocess
 import traceback
 import pandas as pd
 
+import market_utils
+
 DASHBOARD_STATE_PATH = '/Users/danieldragomir/antigravity/dashboard_state.json'
 WATCHLIST_CSV_PATH = '/Users/danieldragomir/antigravity/watchlist.csv'
 WATCHLIST_JSON_PATH = '/Users/danieldragomir/antigravity/watchlist.json'
@@ -15,15 +17,21 @@ def log(msg):
     sys.stderr.write(f"[Server] {msg}\n")
     sys.stderr.flush()
 
+_STATE_SECTIONS = None
+
 def load_state():
-    if not os.path.exists(DASHBOARD_STATE_PATH):
-        return {}
-    try:
-        with open(DASHBOARD_STATE_PATH, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        log(f"Error loading state: {e}")
-        return {}
+    """Lazy view over the saved state, kept across tool calls.
+
+    Each tool only reads the sections it needs; the view re-reads them only
+    after the scanner saves a new state.
+    """
+    global _STATE_SECTIONS
+    if _STATE_SECTIONS is None or _STATE_SECTIONS.path != DASHBOARD_STATE_PATH:
+        _STATE_SECTIONS = market_utils.StateSections(
+            DASHBOARD_STATE_PATH,
+            on_error=lambda e: log(f"Error loading state: {e}"),
+        )
+    return _STATE_SECTIONS
 
 def send_response(id_val, result=None, error=None):
     res = {
@@ -65,6 +65,9 @@ if os.path.exists('tws_orders.csv') and os.path.exists('portfolio.csv'):
 
 # Resetează fișierele de dashboard la versiunea din remote (evită conflicte)
 git checkout origin/main -- dashboard_state.json index.html market_history.json 2>/dev/null || true
+# Sidecar-ul seriilor de grafic se resetează separat: lipsa lui pe remote nu
+# trebuie să anuleze resetarea celorlalte fișiere.
+git checkout origin/main -- dashboard_state.charts.npy dashboard_state.charts.json 2>/dev/null || true
 
 # Pull ultimele modificări
 git pull origin main >> dashboard.log 2>&1 || true
@@ -0,0 +1,32 @@
+"""Microbenchmark pentru parserul Finviz (lxml față de BeautifulSoup).
+
+Nu face parte din suita unitară (pytest colectează doar test_*.py).
+Rulare: python -m tests.bench_finviz_parser
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import market_data
+from tests.test_finviz_parser import _load_fixture, _parse_with_beautifulsoup
+
+
+def main(runs=20, repeat=3):
+    html = _load_fixture('finviz_quote_aapl.html')
+    legacy = min(timeit.repeat(
+        lambda: _parse_with_beautifulsoup(html), number=runs, repeat=repeat
+    ))
+    fast = min(timeit.repeat(
+        lambda: market_data._parse_finviz_quote(html), number=runs, repeat=repeat
+    ))
+    print(
+        f"Finviz parse ({len(html) // 1024} KB): "
+        f"BeautifulSoup {legacy / runs * 1000:.2f} ms, "
+        f"lxml {fast / runs * 1000:.2f} ms ({legacy / fast:.1f}x)"
+    )
+
+
+if __name__ == '__main__':
+    main()
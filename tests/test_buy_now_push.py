@@ -6,6 +6,7 @@ import unittest
 from unittest import mock
 
 import buy_now_push
+import market_utils
 
 
 class FakeResponse:
@@ -301,6 +302,13 @@ class BuyNowPushTests(unittest.TestCase):
                 "current_symbols": ["WST"],
                 "notified_active_symbols": [],
             },
+            "portfolio": [
+                {
+                    "Symbol": "WST",
+                    "Chart_History": [250.5, 251.25],
+                    "Chart_Dates": ["2026-07-29", "2026-07-30"],
+                },
+            ],
         }
         with tempfile.TemporaryDirectory() as temporary_directory:
             state_path = os.path.join(
@@ -317,8 +325,13 @@ class BuyNowPushTests(unittest.TestCase):
                 **self.delivery_options(),
             )
             with open(state_path, "r", encoding="utf-8") as handle:
-                persisted = json.load(handle)
+                compact_text = handle.read()
+            persisted = market_utils.load_state(state_path)
 
+        # Rescrisă prin save_state: JSON compact, seriile în sidecar.
+        self.assertNotIn("\n", compact_text)
+        self.assertIn("Chart_Ref", compact_text)
+        self.assertEqual(persisted["portfolio"], cached_state["portfolio"])
         self.assertEqual(diagnostic["status"], "sent")
         self.assertEqual(diagnostic["delivered_symbols"], ["WST"])
         self.assertEqual(
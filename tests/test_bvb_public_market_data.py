@@ -1,7 +1,11 @@
+import json
 import os
 import sys
 import tempfile
+import time
 import unittest
+import unittest.mock
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock
 
 import pandas as pd
@@ -20,9 +24,11 @@ SAMPLE_DAILY_CSV = b'''"Symbol","Name","Market","Trades","Volume","Value","Open"
 
 class TestBVBPublicMarketData(unittest.TestCase):
     def setUp(self):
-        bvb_public_market_data._CACHE_FRAMES.clear()
+        bvb_public_market_data._CACHE_STORES.clear()
         bvb_public_market_data._REQUESTED_DATES.clear()
         bvb_public_market_data._UNAVAILABLE_CACHE_KEYS.clear()
+        bvb_public_market_data._SOURCE_ERRORS.clear()
+        bvb_public_market_data._CLOSED_DATES.clear()
 
     def test_daily_csv_keeps_regular_market_and_includes_aero_symbol(self):
         frame = bvb_public_market_data.parse_daily_csv(
@@ -111,6 +117,249 @@ class TestBVBPublicMarketData(unittest.TestCase):
                 )
         self.assertEqual(session.get.call_count, 3)
 
+    def test_store_appends_new_days_and_compacts_once(self):
+        dates = pd.bdate_range(end="2026-07-28", periods=58)
+        cached = pd.DataFrame({
+            "Date": [date.date().isoformat() for date in dates],
+            "Symbol": ["DN"] * 58,
+            "Market": ["XRS1"] * 58,
+            "Open": [1.20] * 58,
+            "High": [1.30] * 58,
+            "Low": [1.15] * 58,
+            "Close": [1.25] * 58,
+            "Volume": [10000] * 58,
+            "Value": [12500] * 58,
+        })
+        session = Mock()
+        response = Mock()
+        response.content = SAMPLE_DAILY_CSV
+        response.raise_for_status.return_value = None
+        session.get.return_value = response
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = os.path.join(temp_dir, "bvb_daily_cache.csv")
+            cached.to_csv(cache_path, index=False)
+
+            store = bvb_public_market_data.BVBDailyStore(cache_path)
+            daily = bvb_public_market_data.parse_daily_csv(
+                SAMPLE_DAILY_CSV, "2026-07-29"
+            )
+            store.ingest("2026-07-29", daily)
+            with unittest.mock.patch.object(
+                bvb_public_market_data.os, "replace"
+            ) as replace:
+                store.flush()
+            replace.assert_not_called()
+            self.assertEqual(len(pd.read_csv(cache_path)), 60)
+            self.assertEqual(len(store.history("TLV")), 1)
+            self.assertEqual(len(store.history("DN")), 59)
+
+            frame, metadata = bvb_public_market_data.fetch_history(
+                "DN.RO",
+                cache_path=cache_path,
+                session=session,
+                now="2026-07-31",
+                lookback_days=5,
+            )
+            on_disk = pd.read_csv(cache_path)
+
+        # Doar 31 și 30 iulie; 29 iulie a fost deja anexat pe disc.
+        self.assertEqual(session.get.call_count, 2)
+        self.assertEqual(len(frame), 61)
+        self.assertEqual(metadata["market_data"]["close"], 1.27)
+        self.assertEqual(len(on_disk), 58 + 3 * 2)
+        self.assertTrue(on_disk["Date"].is_monotonic_increasing)
+
+    def test_store_appends_refreshed_days_until_compaction_threshold(self):
+        dates = ["2026-07-27", "2026-07-28", "2026-07-29", "2026-07-30"]
+        daily = bvb_public_market_data.parse_daily_csv(
+            SAMPLE_DAILY_CSV, dates[0]
+        )
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = os.path.join(temp_dir, "bvb_daily_cache.csv")
+            store = bvb_public_market_data.BVBDailyStore(cache_path)
+            with unittest.mock.patch.object(
+                bvb_public_market_data.os, "replace", wraps=os.replace
+            ) as replace:
+                for date_text in dates:
+                    store.ingest(date_text, daily)
+                store.flush()
+                self.assertEqual(replace.call_count, 1)
+
+                # Prima reîmprospătare se anexează; versiunea nouă câștigă.
+                store.ingest(dates[-1], daily.assign(Close=daily["Close"] + 1))
+                store.flush()
+                self.assertEqual(replace.call_count, 1)
+                self.assertEqual(len(pd.read_csv(cache_path)), 10)
+                reloaded = bvb_public_market_data.BVBDailyStore(cache_path)
+                self.assertEqual(
+                    reloaded.history("DN")["Close"].tolist(),
+                    [1.27, 1.27, 1.27, 2.27],
+                )
+
+                # A doua depășește pragul: fișierul este compactat.
+                store.ingest(dates[-1], daily)
+                store.flush()
+                self.assertEqual(replace.call_count, 2)
+            on_disk = pd.read_csv(cache_path)
+
+        self.assertEqual(len(on_disk), 8)
+        self.assertEqual(store.history("DN")["Close"].tolist(), [1.27] * 4)
+
+    def test_universe_backfill_fetches_missing_days_once_in_one_batch(self):
+        session = Mock()
+        response = Mock()
+        response.content = SAMPLE_DAILY_CSV
+        response.raise_for_status.return_value = None
+        session.get.return_value = response
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = os.path.join(temp_dir, "bvb_daily_cache.csv")
+            with unittest.mock.patch.object(
+                bvb_public_market_data.os, "replace", wraps=os.replace
+            ) as replace:
+                downloaded = bvb_public_market_data.backfill(
+                    cache_path=cache_path,
+                    session=session,
+                    now="2026-07-31",
+                    lookback_days=13,
+                    max_workers=3,
+                )
+                frame, _ = bvb_public_market_data.fetch_history(
+                    "TLV.RO",
+                    cache_path=cache_path,
+                    session=session,
+                    now="2026-07-31",
+                    min_observations=10,
+                    lookback_days=13,
+                )
+            on_disk = pd.read_csv(cache_path)
+
+        requested = sorted(
+            call.kwargs["params"]["day"] for call in session.get.call_args_list
+        )
+        self.assertEqual(downloaded, 10)
+        self.assertEqual(requested, [
+            date.strftime("%Y%m%d")
+            for date in pd.bdate_range("2026-07-18", "2026-07-31")
+        ])
+        self.assertEqual(replace.call_count, 1)
+        self.assertEqual(len(frame), 10)
+        self.assertEqual(len(on_disk), 20)
+
+
+    def test_parallel_fetches_share_one_backfill(self):
+        def get(url, params, timeout):
+            time.sleep(0.005)
+            response = Mock()
+            response.content = SAMPLE_DAILY_CSV
+            response.raise_for_status.return_value = None
+            return response
+
+        dates = pd.bdate_range(end="2026-10-09", periods=60)
+        cached = pd.DataFrame([
+            {
+                "Date": date.date().isoformat(), "Symbol": symbol,
+                "Market": "REGS", "Open": 1.20, "High": 1.30, "Low": 1.15,
+                "Close": 1.25, "Volume": 10000, "Value": 12500,
+            }
+            for date in dates for symbol in ("TLV", "DN")
+        ])
+        symbols = ["TLV.RO", "DN.RO", "TLV", "DN"]
+
+        def fetch_all(cache_path, session):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                return list(executor.map(
+                    lambda symbol: bvb_public_market_data.fetch_history(
+                        symbol,
+                        cache_path=cache_path,
+                        session=session,
+                        now="2026-10-16",
+                        lookback_days=100,
+                    )[0],
+                    symbols,
+                ))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            seeded_path = os.path.join(temp_dir, "seeded.csv")
+            cached.to_csv(seeded_path, index=False)
+            seeded_session = Mock()
+            seeded_session.get.side_effect = get
+            seeded = fetch_all(seeded_path, seeded_session)
+
+            empty_session = Mock()
+            empty_session.get.side_effect = get
+            from_empty = fetch_all(
+                os.path.join(temp_dir, "empty.csv"), empty_session
+            )
+
+        self.assertEqual(
+            [frame.index[-1].date().isoformat() for frame in seeded],
+            ["2026-10-16"] * 4,
+        )
+        # 12-16 octombrie, plus 8 și 9 octombrie reîmprospătate: o dată fiecare.
+        self.assertEqual(seeded_session.get.call_count, 5)
+        self.assertEqual([len(frame) for frame in from_empty], [73] * 4)
+        self.assertEqual(empty_session.get.call_count, 73)
+
+    def test_holidays_are_remembered_and_not_counted_as_source_errors(self):
+        holidays = {"20260722", "20260723", "20260724"}
+
+        def get(url, params, timeout):
+            response = Mock()
+            response.content = SAMPLE_DAILY_CSV
+            response.status_code = 404 if params["day"] in holidays else 200
+            response.raise_for_status.side_effect = (
+                bvb_public_market_data.requests.HTTPError(response=response)
+                if params["day"] in holidays
+                else None
+            )
+            return response
+
+        session = Mock()
+        session.get.side_effect = get
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = os.path.join(temp_dir, "bvb_daily_cache.csv")
+            first = bvb_public_market_data.backfill(
+                cache_path=cache_path,
+                session=session,
+                now="2026-07-31",
+                lookback_days=13,
+                max_workers=1,
+            )
+            unavailable = set(bvb_public_market_data._UNAVAILABLE_CACHE_KEYS)
+
+            # Rulare nouă: doar ziua nouă și cele două ședințe reîmprospătate.
+            bvb_public_market_data._CACHE_STORES.clear()
+            bvb_public_market_data._REQUESTED_DATES.clear()
+            bvb_public_market_data._CLOSED_DATES.clear()
+            session.get.reset_mock()
+            bvb_public_market_data.backfill(
+                cache_path=cache_path,
+                session=session,
+                now="2026-08-03",
+                lookback_days=16,
+            )
+            with open(
+                bvb_public_market_data._closed_dates_path(cache_path),
+                encoding="utf-8",
+            ) as handle:
+                closed = json.load(handle)
+
+        self.assertEqual(first, 7)
+        self.assertEqual(unavailable, set())
+        self.assertEqual(
+            closed, ["2026-07-22", "2026-07-23", "2026-07-24"]
+        )
+        self.assertEqual(
+            sorted(
+                call.kwargs["params"]["day"]
+                for call in session.get.call_args_list
+            ),
+            ["20260731", "20260803"],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import market_data
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def _load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as handle:
+        return handle.read()
+
+
+def _parse_with_beautifulsoup(text):
+    """Parserul vechi (arbore html.parser complet), păstrat ca referință."""
+    data = {'Target': None, 'ATR': None, 'VolW': None, 'VolM': None}
+    soup = BeautifulSoup(text, 'html.parser')
+    for row in soup.find_all('tr', class_='table-dark-row'):
+        cells = row.find_all('td')
+        for i, cell in enumerate(cells):
+            txt = cell.get_text()
+            if i + 1 >= len(cells):
+                continue
+            val_txt = cells[i + 1].get_text().strip()
+            if 'Target Price' in txt and val_txt and val_txt != '-':
+                data['Target'] = float(val_txt.replace('$', '').replace(',', ''))
+            elif 'ATR' in txt and val_txt and val_txt != '-':
+                data['ATR'] = float(val_txt)
+            elif 'Volatility' in txt:
+                parts = val_txt.split()
+                if len(parts) >= 2:
+                    data['VolW'] = float(parts[0].replace('%', ''))
+                    data['VolM'] = float(parts[1].replace('%', ''))
+    page_title = soup.title.string if soup.title else None
+    company = market_data._finviz_company_from_title(page_title)
+    if company:
+        data['Company'] = company
+    return data
+
+
+class TestFinvizQuoteParser(unittest.TestCase):
+    def test_lxml_parser_matches_reference_on_fixture(self):
+        html = _load_fixture('finviz_quote_aapl.html')
+
+        parsed = market_data._parse_finviz_quote(html)
+
+        self.assertEqual(parsed, _parse_with_beautifulsoup(html))
+        self.assertEqual(parsed, {
+            'Target': 252.83,
+            'ATR': 3.87,
+            'VolW': 1.29,
+            'VolM': 1.48,
+            'Company': 'Apple Inc.',
+        })
+
+    def test_missing_values_and_broken_pages_leave_fields_empty(self):
+        html = (
+            '<html><head><title>XYZ - Xyz Corp Stock Price | Quote</title></head>'
+            '<body><table><tr class="table-dark-row is-hovered">'
+            '<td>Target Price</td><td>-</td><td>ATR (14)</td><td>n/a</td>'
+            '<td>Volatility</td><td>-</td></tr></table></body></html>'
+        )
+        self.assertEqual(market_data._parse_finviz_quote(html), {
+            'Target': None, 'ATR': None, 'VolW': None, 'VolM': None,
+            'Company': 'Xyz Corp',
+        })
+        self.assertEqual(market_data._parse_finviz_quote(''), {
+            'Target': None, 'ATR': None, 'VolW': None, 'VolM': None,
+        })
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -23,20 +23,17 @@ class TestMarketHistory(unittest.TestCase):
     def test_save_and_load_history(self):
         """Test simple save and load functionality."""
         test_data = {
-            "TEST_IND": [
-                {"date": "2025-01-01", "value": 10.5},
-                {"date": "2025-01-02", "value": 11.0}
-            ]
+            "TEST_IND": {"2025-01-01": 10.5, "2025-01-02": 11.0}
         }
         
         # Save
-        market_scanner.save_market_history(test_data)
+        market_utils.save_market_series(test_data)
         
         # Verify file exists
         self.assertTrue(os.path.exists("test_market_history.json"))
         
         # Load
-        loaded_data = market_scanner.load_market_history()
+        loaded_data = market_utils.load_market_series()
         self.assertEqual(loaded_data, test_data)
 
     def test_load_history_no_file(self):
@@ -44,48 +41,64 @@ class TestMarketHistory(unittest.TestCase):
         if os.path.exists("test_market_history.json"):
             os.remove("test_market_history.json")
             
-        data = market_scanner.load_market_history()
+        data = market_utils.load_market_series()
         self.assertEqual(data, {})
 
-    @patch('market_scanner.yf.Ticker')
-    def test_history_accumulation_logic(self, mock_ticker):
+    def test_market_series_merge_upserts_in_one_pass_and_reads_legacy_file(self):
+        """Bars are upserted by date, kept sorted and trimmed to the window."""
+        with open("test_market_history.json", "w") as f:
+            json.dump({"VIX": [
+                {"date": "2025-01-02", "value": 14.0},
+                {"date": "2025-01-03", "value": 15.0},
+            ]}, f, indent=2)
+        series = market_utils.load_market_series()
+        self.assertEqual(series, {"VIX": {"2025-01-02": 14.0, "2025-01-03": 15.0}})
+
+        merged = market_utils.merge_series(
+            series["VIX"],
+            [("2025-01-01", 13.0), ("2025-01-03", 15.5), ("2025-01-06", 16.0)],
+            retention=3,
+        )
+        self.assertEqual(list(merged.items()), [
+            ("2025-01-02", 14.0), ("2025-01-03", 15.5), ("2025-01-06", 16.0),
+        ])
+
+        market_utils.save_market_series({"VIX": merged})
+        with open("test_market_history.json") as f:
+            self.assertEqual(json.load(f)["series"]["VIX"], {
+                "dates": ["2025-01-02", "2025-01-03", "2025-01-06"],
+                "values": [14.0, 15.5, 16.0],
+            })
+        self.assertEqual(market_utils.load_market_series(), {"VIX": merged})
+
+    @patch('market_scanner._yf_download')
+    def test_history_accumulation_logic(self, mock_download):
         """
         Test that get_market_indicators properly accumulates history
         and limits it to 60 days.
         """
         # Create dummy initial history with 59 entries
-        history = {"LTV": []}
         start_date = datetime(2025, 1, 1)
-        for i in range(59):
-            d = start_date + timedelta(days=i)
-            history["LTV"].append({
-                "date": d.strftime("%Y-%m-%d"),
-                "value": 10.0 + i
-            })
+        history = {"LTV": {
+            (start_date + timedelta(days=i)).strftime("%Y-%m-%d"): 10.0 + i
+            for i in range(59)
+        }}
             
         # Save initial history
-        market_scanner.save_market_history(history)
+        market_utils.save_market_series(history)
         
         # Mock Yahoo Finance to return data for a NEW day (Day 60)
         # and another NEW day (Day 61) to test limiting
         
-        # We need to mock Ticker().history() to return a DataFrame
+        # The batched download returns one column group per ticker;
+        # only ^LTV has data, the others are absent
         mock_hist_df = pd.DataFrame({
             'Close': [100.0, 101.0]
         }, index=pd.to_datetime([
             start_date + timedelta(days=59), # Day 60
             start_date + timedelta(days=60)  # Day 61
         ]))
-        
-        def ticker_side_effect(ticker_symbol):
-            mock_instance = MagicMock()
-            if ticker_symbol == '^LTV':
-                mock_instance.history.return_value = mock_hist_df
-            else:
-                mock_instance.history.return_value = pd.DataFrame() # Empty for others
-            return mock_instance
-            
-        mock_ticker.side_effect = ticker_side_effect
+        mock_download.return_value = pd.concat({'^LTV': mock_hist_df}, axis=1)
         
         # Run function
         # We assume standard thresholds since we can't patch local var
@@ -93,8 +106,8 @@ class TestMarketHistory(unittest.TestCase):
         indicators = market_scanner.get_market_indicators()
                 
         # Now verify the history file
-        updated_history = market_scanner.load_market_history()
-        ltv_hist = updated_history["LTV"]
+        updated_history = market_utils.load_market_series()
+        ltv_hist = list(updated_history["LTV"].items())
         
         # Should have added the new points
         # Total was 59 + 2 = 61. Limit is 60.
@@ -102,31 +115,23 @@ class TestMarketHistory(unittest.TestCase):
         
         # Check that the oldest point (Day 1) was removed
         expected_first_date = (start_date + timedelta(days=1)).strftime("%Y-%m-%d")
-        self.assertEqual(ltv_hist[0]['date'], expected_first_date)
+        self.assertEqual(ltv_hist[0][0], expected_first_date)
         
         # Check that the newest points are present
-        self.assertEqual(ltv_hist[-1]['value'], 101.0) # Day 61
-        self.assertEqual(ltv_hist[-2]['value'], 100.0) # Day 60
+        self.assertEqual(ltv_hist[-1][1], 101.0) # Day 61
+        self.assertEqual(ltv_hist[-2][1], 100.0) # Day 60
 
-    @patch('market_scanner.yf.Ticker')
-    def test_sparkline_generation(self, mock_ticker):
+    @patch('market_scanner._yf_download')
+    def test_sparkline_generation(self, mock_download):
         """Test that sparkline contains exactly the last 30 points."""
         # Create history with 40 points
-        history = {"LTV": []}
-        for i in range(40):
-            history["LTV"].append({
-                "date": f"2025-01-{i+1:02d}",
-                "value": float(i)
-            })
-        market_scanner.save_market_history(history)
+        history = {"LTV": {
+            f"2025-01-{i+1:02d}": float(i) for i in range(40)
+        }}
+        market_utils.save_market_series(history)
         
-        def ticker_side_effect(ticker_symbol):
-            mock_instance = MagicMock()
-            # Return empty to force usage of history DB
-            mock_instance.history.return_value = pd.DataFrame() 
-            return mock_instance
-            
-        mock_ticker.side_effect = ticker_side_effect
+        # Return empty to force usage of history DB
+        mock_download.return_value = pd.DataFrame()
         
         # Run function
         indicators = market_scanner.get_market_indicators()
@@ -141,6 +146,252 @@ class TestMarketHistory(unittest.TestCase):
         self.assertEqual(len(sparkline), 30)
         self.assertEqual(sparkline[0], 10.0)
         self.assertEqual(sparkline[-1], 39.0)
+    @patch('market_scanner.calculate_historical_monthly_returns')
+    @patch('market_scanner._fetch_crypto_fear_greed')
+    @patch('market_scanner._yf_download')
+    def test_indicators_use_one_batched_download_and_shared_deadline(
+        self, mock_download, mock_fear, mock_returns
+    ):
+        """All Yahoo indicators come from one download; slow side fetches are skipped."""
+        import threading
+        release = threading.Event()
+        mock_download.return_value = pd.concat({
+            '^VIX': pd.DataFrame(
+                {'Open': [14.0], 'High': [16.0], 'Low': [13.5], 'Close': [15.5]},
+                index=pd.to_datetime(['2025-03-03']),
+            ),
+        }, axis=1)
+        mock_fear.side_effect = lambda: release.wait(5) and None
+        mock_returns.return_value = {'SP500': {'avg_monthly_return': 0.7}}
+
+        with patch.object(market_scanner, 'MARKET_INDICATORS_DEADLINE_SECONDS', 0.5):
+            indicators = market_scanner.get_market_indicators()
+        release.set()
+
+        mock_download.assert_called_once()
+        self.assertEqual(len(mock_download.call_args.args[0]), 12)
+        self.assertEqual(indicators['VIX']['value'], 15.5)
+        self.assertEqual(indicators['VIX']['ohlc'][0]['high'], 16.0)
+        self.assertNotIn('Crypto Fear', indicators)
+        self.assertEqual(indicators['Historical_Returns'], mock_returns.return_value)
+
+    def test_deadline_leaves_late_tasks_on_daemon_threads(self):
+        """A task past the deadline must not keep the interpreter alive at exit."""
+        import threading
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        results = market_scanner.market_data.run_with_deadline(
+            {'slow': lambda: release.wait(5), 'fast': lambda: 42},
+            timeout=0.2,
+        )
+
+        self.assertEqual(results, {'fast': 42})
+        late = [
+            thread for thread in threading.enumerate()
+            if thread.name == 'market-scanner-slow'
+        ]
+        self.assertTrue(late)
+        self.assertTrue(all(thread.daemon for thread in late))
+
+
+class TestStatePersistence(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.original_cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+        market_utils._FILE_DIGESTS.clear()
+        market_utils._SECTION_DIGESTS.clear()
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        self.tmpdir.cleanup()
+        market_utils._FILE_DIGESTS.clear()
+        market_utils._SECTION_DIGESTS.clear()
+
+    def test_save_state_rewrites_only_changed_artifacts(self):
+        state = {
+            "portfolio": [{"Symbol": "AAPL", "Sparkline": [1, 2]}],
+            "rates": {"USD": 0.9},
+            "vix_val": 15.2,
+            "watchlist": [
+                {"Ticker": "MSFT", "Decision": "BUY", "Consensus": "Strong Buy", "Sparkline": [1]},
+                {"Ticker": "TLV.RO", "Decision": "WAIT", "Consensus": "Hold"},
+                {"Ticker": "1ABC", "Decision": "BUY", "Consensus": "Hold"},
+            ],
+        }
+        market_utils.save_state(state)
+
+        with open(market_utils.STATE_FILE) as f:
+            self.assertEqual(json.load(f), state)
+        with open("watchlist_buy.json") as f:
+            self.assertEqual(json.load(f), [
+                {"Ticker": "MSFT", "Decision": "BUY", "Consensus": "Strong Buy"}
+            ])
+        with open("watchlist_a_d.json") as f:
+            self.assertEqual([item["Ticker"] for item in json.load(f)], ["1ABC"])
+        with open("watchlist_q_t.json") as f:
+            self.assertEqual([item["Ticker"] for item in json.load(f)], ["TLV.RO"])
+        with open("portfolio.json") as f:
+            self.assertNotIn("\n", f.read())
+
+        with patch("market_utils.os.replace", wraps=os.replace) as replace:
+            market_utils.save_state(json.loads(json.dumps(state)))
+            replace.assert_not_called()
+
+            state["watchlist"][1]["Decision"] = "BUY"
+            market_utils.save_state(state)
+        written = sorted(call.args[1] for call in replace.call_args_list)
+        sections_dir = market_utils.state_sections_dir()
+        self.assertEqual(written, [
+            market_utils.STATE_FILE,
+            os.path.join(sections_dir, "manifest.json"),
+            os.path.join(sections_dir, market_utils._section_filename("watchlist")),
+            "watchlist_compact.json",
+            "watchlist_q_t.json",
+        ])
+
+    def test_state_sections_load_only_requested_sections(self):
+        state = {
+            "rates": {"USD": 0.9},
+            "watchlist": [{"Ticker": "MSFT"}],
+            "portfolio": [{"Symbol": "AAPL"}],
+        }
+        market_utils.save_state(state)
+
+        sections = market_utils.StateSections()
+        with patch("market_utils.load_state") as full_parse:
+            self.assertEqual(sections.get("rates"), {"USD": 0.9})
+            self.assertEqual(sections["portfolio"], [{"Symbol": "AAPL"}])
+            self.assertIsNone(sections.get("missing"))
+            self.assertEqual(sections.keys(), ["rates", "watchlist", "portfolio"])
+            full_parse.assert_not_called()
+        self.assertNotIn("watchlist", sections._values)
+
+        # Fișierul principal rescris de alt proces: manifestul nu mai corespunde.
+        state["rates"] = {"USD": 0.5}
+        with open(market_utils.STATE_FILE, "w") as f:
+            json.dump(state, f, indent=2)
+        self.assertEqual(sections.get("rates"), {"USD": 0.5})
+        self.assertEqual(
+            market_utils.load_state_sections(["portfolio", "nope"]),
+            {"portfolio": [{"Symbol": "AAPL"}]},
+        )
+
+    def test_state_sections_report_unreadable_state(self):
+        with open(market_utils.STATE_FILE, "w") as f:
+            f.write('{"portfolio": [')
+        errors = []
+
+        sections = market_utils.StateSections(on_error=errors.append)
+
+        self.assertIsNone(sections.get("portfolio"))
+        self.assertEqual(sections.keys(), [])
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], ValueError)
+
+    def test_chart_series_move_to_columnar_sidecar_and_round_trip(self):
+        dates = ["2025-01-02", "2025-01-03", "2025-01-06"]
+        aapl = {
+            "Symbol": "AAPL",
+            "Sparkline": [1.5, 2.25],
+            "Chart_History": [190.1234, 191.5, 12345.6789],
+            "Chart_Dates": dates,
+            "Chart_OHLC": [
+                {"date": d, "open": 189.5, "high": 192.25, "low": 188.1, "close": c}
+                for d, c in zip(dates[1:], [191.5, 12345.6789])
+            ],
+        }
+        state = {
+            "portfolio": [aapl],
+            "watchlist": [
+                {"Ticker": "MSFT", "Chart_History": [401.75], "Chart_Dates": ["2025-01-07"]},
+                {"Ticker": "BAD", "Chart_History": [1.0, None], "Chart_Dates": dates[:2]},
+            ],
+            "rates": {"USD": 0.9},
+        }
+        original = json.loads(json.dumps(state))
+        market_utils.save_state(state)
+
+        with open(market_utils.STATE_FILE) as f:
+            saved = json.load(f)
+        _, index_path = market_utils.chart_series_paths()
+        with open(index_path) as f:
+            tag = json.load(f)["digest"]
+        self.assertEqual(saved["portfolio"], [
+            {"Symbol": "AAPL", "Sparkline": [1.5, 2.25], "Chart_Ref": f"portfolio/AAPL@{tag}"}
+        ])
+        self.assertEqual(
+            saved["watchlist"][0], {"Ticker": "MSFT", "Chart_Ref": f"watchlist/MSFT@{tag}"}
+        )
+        # Serii care nu se pot alinia pe date rămân inline.
+        self.assertEqual(saved["watchlist"][1], original["watchlist"][1])
+        self.assertEqual(state, original)
+
+        matrix_path, _ = market_utils.chart_series_paths()
+        matrix = market_utils.np.load(matrix_path, mmap_mode="r")
+        self.assertEqual(matrix.dtype, market_utils.np.float64)
+        self.assertEqual(matrix.shape, (6, 4))
+
+        self.assertEqual(market_utils.load_state(), original)
+        self.assertIn("Chart_Ref", market_utils.load_state(charts=False)["portfolio"][0])
+        # Fișierele derivate și cititorul pe secțiuni (MCP) văd seriile complete.
+        with open("portfolio.json") as f:
+            portfolio_view = json.load(f)
+        self.assertEqual(portfolio_view[0]["Chart_History"], aapl["Chart_History"])
+        self.assertNotIn("Chart_Ref", portfolio_view[0])
+        with open("watchlist_compact.json") as f:
+            self.assertEqual(json.load(f)[0]["Chart_History"], [401.75])
+        self.assertEqual(
+            market_utils.StateSections()["portfolio"], original["portfolio"]
+        )
+
+        # O stare citită fără serii nu poate fi salvată peste sidecar.
+        with self.assertRaises(market_utils.ChartSeriesError):
+            market_utils.save_state(market_utils.load_state(charts=False))
+
+    def test_chart_series_sidecar_missing_or_stale_fails_loudly(self):
+        state = {
+            "portfolio": [
+                {"Symbol": "AAPL", "Chart_History": [190.5], "Chart_Dates": ["2025-01-02"]}
+            ],
+        }
+        market_utils.save_state(json.loads(json.dumps(state)))
+        paths = market_utils.chart_series_paths()
+        previous = {}
+        for path in paths:
+            with open(path, "rb") as f:
+                previous[path] = f.read()
+
+        state["portfolio"][0]["Chart_History"] = [191.0]
+        market_utils.save_state(json.loads(json.dumps(state)))
+        self.assertEqual(market_utils.load_state(), state)
+
+        # Sidecar din altă salvare (de exemplu restaurat dintr-un cache vechi).
+        for path, data in previous.items():
+            with open(path, "wb") as f:
+                f.write(data)
+        with self.assertRaises(market_utils.ChartSeriesError):
+            market_utils.load_state()
+        with self.assertRaises(market_utils.ChartSeriesError):
+            market_utils.StateSections().get("portfolio")
+
+        # Sidecar lipsă: eroare, nu înregistrări fără grafic.
+        os.remove(paths[0])
+        with self.assertRaises(market_utils.ChartSeriesError):
+            market_utils.load_state()
+
+        # Scannerul (proces nou) renunță explicit la referințe și scrie un
+        # sidecar nou.
+        market_utils._FILE_DIGESTS.clear()
+        rebuilt = market_utils.drop_chart_refs(market_utils.load_state(charts=False))
+        self.assertEqual(rebuilt["portfolio"], [{"Symbol": "AAPL"}])
+        rebuilt["portfolio"][0].update(state["portfolio"][0])
+        market_utils.save_state(rebuilt)
+        self.assertEqual(market_utils.load_state(), state)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -145,7 +145,7 @@ class TestHtmlIntegrity(unittest.TestCase):
         self.assertIn("window.open('', '_blank')", content)
         self.assertIn("'ohlc': ohlc_data", content)
         self.assertIn("'history': data_points[-60:]", content)
-        self.assertIn("'history_dates': [x['date'] for x in history_db[name]][-60:]", content)
+        self.assertIn("'history_dates': list(history_db[name])[-60:]", content)
         self.assertIn("hasUsableIndicatorOhlc(detail.ohlc)", content)
         self.assertIn("candles.length < 5", content)
         self.assertIn("nonFlat.length / valid.length >= 0.2", content)
@@ -8,6 +8,7 @@ import json
 import sys
 import os
 import tempfile
+import threading
 import time
 import warnings
 from unittest.mock import Mock, patch, MagicMock
@@ -1312,6 +1313,101 @@ class TestPortfolioAIAnalysis(unittest.TestCase):
         self.assertEqual(technology['status'], 'lider')
         self.assertGreater(technology['relative_3m_vs_spy_pct'], 2)
 
+    def test_market_context_is_fetched_once_and_shared_per_run(self):
+        dates = pd.bdate_range(end='2026-10-16', periods=300)
+
+        def history(start, end):
+            return pd.DataFrame(
+                {'Close': np.linspace(start, end, len(dates))}, index=dates
+            )
+
+        tickers = (
+            ['SPY'] + list(market_scanner_analysis.US_SECTOR_ETFS.values())
+            + list(market_scanner_analysis.US_INDEX_TICKERS)
+        )
+        frames = {ticker: history(100, 110) for ticker in tickers}
+        frames['XLK'] = history(100, 130)
+        frames['^VIX'] = history(15, 15)
+        analysis_data = market_scanner_analysis.market_data
+
+        with patch.object(
+            analysis_data, 'download_histories', return_value=frames
+        ) as download, patch.object(
+            market_scanner_analysis, '_fetch_cnn_fear_greed',
+            return_value={
+                'fear_and_greed': {'score': 62, 'rating': 'greed'},
+                'put_call_options': {'data': [{'x': 1, 'y': 0.9}]},
+            },
+        ) as cnn, patch.object(
+            market_scanner_analysis, 'get_finviz_market_tide',
+            return_value=None,
+        ), patch.object(
+            market_scanner_analysis, 'get_finviz_count',
+            return_value=(300, 505),
+        ), patch.object(
+            market_scanner_analysis.yf, 'Ticker',
+            side_effect=AssertionError('cerere Yahoo separată'),
+        ), analysis_data.run_scope():
+            rotation = market_scanner_analysis.fetch_us_sector_rotation()
+            swing = market_scanner_analysis.get_swing_trading_data()
+            regime = market_scanner_analysis.build_us_market_regime(
+                {}, 'Expansion',
+                context=market_scanner_analysis.fetch_market_context(),
+            )
+            spx = analysis_data.get_benchmark_history('^GSPC', period='1y')
+
+        download.assert_called_once()
+        # Tickerele put/call rămân alternative leneșe, în afara lotului.
+        self.assertEqual(list(download.call_args.args[0]), tickers)
+        cnn.assert_called_once()
+        self.assertEqual(rotation['sectors']['Technology']['status'], 'lider')
+        self.assertAlmostEqual(swing['SPX_Price'], 110.0)
+        self.assertEqual(swing['FG_Score'], 62)
+        self.assertAlmostEqual(swing['PCR_Value'], 0.9)
+        self.assertEqual(regime['market_stage'], 'creștere confirmată')
+        self.assertEqual(regime['benchmarks'][0]['long_window_days'], 60)
+        self.assertAlmostEqual(float(spx['Close'].iloc[-1]), 110.0)
+
+    @patch.object(market_scanner_analysis, 'fetch_market_context')
+    @patch.object(market_scanner_analysis.yf, 'Ticker')
+    def test_us_sector_rotation_outside_a_run_skips_the_market_context(
+        self, ticker_factory, fetch_context,
+    ):
+        ticker_factory.return_value.history.return_value = pd.DataFrame(
+            {'Close': np.linspace(100, 110, 80)}
+        )
+        rotation = market_scanner_analysis.fetch_us_sector_rotation()
+
+        fetch_context.assert_not_called()
+        self.assertEqual(
+            ticker_factory.call_count,
+            1 + len(market_scanner_analysis.US_SECTOR_ETFS),
+        )
+        self.assertIn('Technology', rotation['sectors'])
+
+    def test_us_market_regime_context_keeps_the_indicator_window(self):
+        # Peste 200 de ședințe media lungă ar fi 136.5 (trend descendent);
+        # pe fereastra indicatorilor este 105, deci creștere confirmată.
+        closes = [150.0] * 160 + list(np.linspace(100, 110, 60))
+        context = {'histories': {
+            ticker: pd.DataFrame({'Close': closes})
+            for ticker in ('^GSPC', '^NDX')
+        }}
+        indicators = {
+            'SPX': {'history': closes[-60:]},
+            'NASDAQ': {'history': closes[-60:]},
+        }
+
+        with_context = market_scanner_analysis.build_us_market_regime(
+            {}, 'Expansion', context=context,
+        )
+        without_context = market_scanner_analysis.build_us_market_regime(
+            indicators, 'Expansion',
+        )
+
+        self.assertEqual(with_context['market_stage'], 'creștere confirmată')
+        self.assertEqual(with_context, without_context)
+
     def test_us_market_regime_combines_trend_cycle_and_vix(self):
         rising = list(np.linspace(100, 140, 220))
         regime = market_scanner_analysis.build_us_market_regime(
@@ -1721,6 +1817,193 @@ class TestPortfolioAIAnalysis(unittest.TestCase):
         self.assertEqual(selected[0]['Market'], 'Europa / Nasdaq-100')
         self.assertEqual(selected[0]['Eligible_Brokers'], ['IBKR', 'Tradeville'])
 
+    @patch('market_scanner.yf.Ticker')
+    @patch('market_scanner._yahoo_raw_json')
+    def test_yahoo_info_is_memoized_per_run_and_stored_by_field_group(
+        self, raw_json, ticker_factory,
+    ):
+        md = market_scanner.market_data
+        modules = {
+            'price': {'longName': 'Apple Inc.', 'shortName': 'Apple'},
+            'assetProfile': {
+                'sector': 'Technology', 'industry': 'Consumer Electronics',
+            },
+            'financialData': {
+                'recommendationKey': 'buy', 'numberOfAnalystOpinions': 40,
+                'targetMeanPrice': 250.0,
+            },
+            'summaryDetail': {'averageVolume': 50_000_000},
+        }
+        raw_json.side_effect = lambda url, params: {'quoteSummary': {'result': [{
+            name: modules[name] for name in params['modules'].split(',')
+        }]}}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'history.sqlite')
+            self.addCleanup(lambda: md._HISTORY_STORES.pop(path).close())
+            with md.run_scope(history_path=path):
+                market_scanner._get_yahoo_info('AAPL')
+                market_scanner._get_yahoo_info('AAPL.US')
+            self.assertEqual(raw_json.call_count, 1)
+
+            with md.run_scope(history_path=path):
+                cached = market_scanner._get_yahoo_info('AAPL')
+            self.assertEqual(raw_json.call_count, 1)
+            self.assertEqual(cached['sector'], 'Technology')
+            self.assertEqual(cached['numberOfAnalystOpinions'], 40)
+
+            # Grupul 'quote' expiră zilnic; profilul rămâne valabil și nu
+            # mai este cerut din nou.
+            md.history_store(path).write_fundamentals(
+                'AAPL', {'quote': {'recommendationKey': 'hold'}},
+                fetched_at=time.time() - 2 * 24 * 3600,
+            )
+            modules['price']['longName'] = 'Renamed Inc.'
+            with md.run_scope(history_path=path):
+                refreshed = market_scanner._get_yahoo_info('AAPL')
+            groups = md.history_store(path).load_fundamentals('AAPL')
+
+        self.assertEqual(
+            [call.args[0] for call in raw_json.call_args_list],
+            [market_scanner.YAHOO_SUMMARY_URL + 'AAPL'] * 2,
+        )
+        self.assertEqual(
+            raw_json.call_args.kwargs['params']['modules'],
+            'financialData,summaryDetail',
+        )
+        ticker_factory.assert_not_called()
+        self.assertEqual(refreshed['recommendationKey'], 'buy')
+        self.assertEqual(refreshed['longName'], 'Apple Inc.')
+        self.assertEqual(
+            groups['profile'][0],
+            {'longName': 'Apple Inc.', 'shortName': 'Apple',
+             'sector': 'Technology', 'industry': 'Consumer Electronics'},
+        )
+
+    @patch('market_scanner.yf.Ticker')
+    @patch('market_scanner._yahoo_raw_json', return_value=None)
+    def test_yahoo_info_falls_back_to_ticker_info_without_yfinance_session(
+        self, raw_json, ticker_factory,
+    ):
+        ticker_factory.return_value.info = {
+            'longName': 'Apple Inc.', 'recommendationKey': 'buy',
+        }
+        info = market_scanner._get_yahoo_info('AAPL')
+
+        ticker_factory.assert_called_once_with('AAPL')
+        self.assertEqual(info['longName'], 'Apple Inc.')
+        self.assertEqual(info['recommendationKey'], 'buy')
+
+    @patch('market_scanner._yahoo_quote_json')
+    def test_yahoo_quotes_are_prefetched_in_multi_symbol_batches(
+        self, quote_json,
+    ):
+        md = market_scanner.market_data
+
+        def respond(symbols):
+            return {'quoteResponse': {'result': [
+                {'symbol': symbol, 'averageDailyVolume3Month': 1_000_000,
+                 'averageAnalystRating': '1.6 - Strong Buy'}
+                for symbol in symbols
+            ]}}
+
+        quote_json.side_effect = respond
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'history.sqlite')
+            self.addCleanup(lambda: md._HISTORY_STORES.pop(path).close())
+            with md.run_scope(history_path=path):
+                loaded = market_scanner.prefetch_yahoo_quotes(
+                    ['AAPL', 'MSFT.US', 'NVDA', 'LQQ.PA', 'AAPL'],
+                    chunk_size=2,
+                )
+                again = market_scanner.prefetch_yahoo_quotes(['AAPL', 'NVDA'])
+            groups = md.history_store(path).load_fundamentals('MSFT')
+
+        self.assertEqual(loaded, 3)
+        self.assertEqual(again, 0)
+        self.assertEqual(
+            [call.args[0] for call in quote_json.call_args_list],
+            [['AAPL', 'MSFT'], ['NVDA']],
+        )
+        self.assertEqual(groups['quote'][0], {
+            'averageVolume': 1_000_000, 'recommendationKey': 'strong_buy',
+        })
+
+    @patch.dict(sys.modules, {'yfinance.data': None})
+    def test_yahoo_quote_prefetch_stops_when_yfinance_session_is_missing(self):
+        md = market_scanner.market_data
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'history.sqlite')
+            self.addCleanup(lambda: md._HISTORY_STORES.pop(path).close())
+            with md.run_scope(history_path=path), \
+                    patch('market_scanner.market_data.throttle_host') as throttle:
+                loaded = market_scanner.prefetch_yahoo_quotes(
+                    ['AAPL', 'MSFT'], chunk_size=1,
+                )
+
+        self.assertEqual(loaded, 0)
+        throttle.assert_not_called()
+
+    def test_symbol_resolution_persists_found_and_dead_variants(self):
+        md = market_scanner.market_data
+        probed = []
+
+        def probe(candidate):
+            probed.append(candidate)
+            if candidate != 'SXRZ.DE':
+                raise md.SymbolNotFound(candidate)
+            return 'iShares Core DAX'
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'history.sqlite')
+            self.addCleanup(lambda: md._HISTORY_STORES.pop(path).close())
+            for _ in range(2):
+                with md.run_scope(history_path=path):
+                    found = md.resolve_symbol('SXRZ.US', probe)
+                    # A doua sondare din aceeași rulare nu mai cere baza.
+                    md.resolve_symbol('SXRZ', probe)
+            self.assertEqual(found, ('SXRZ.DE', 'iShares Core DAX'))
+            self.assertEqual(
+                probed, ['SXRZ', 'SXRZ.DE', 'SXRZ.DE'] * 2
+            )
+
+            # După două rulări cu 404, baza intră în backoff și varianta
+            # confirmată este folosită direct, fără nicio sondare.
+            probed.clear()
+            with md.run_scope(history_path=path):
+                self.assertEqual(md.resolved_symbol('SXRZ'), 'SXRZ.DE')
+                # Starea numelor este separată de cea a istoricului.
+                self.assertEqual(md.resolved_symbol('SXRZ', kind='name'), 'SXRZ')
+                md.resolve_symbol('SXRZ', probe)
+                later = md.symbol_candidates(
+                    'SXRZ', now=time.time() + 13 * 3600
+                )
+        self.assertEqual(probed, ['SXRZ.DE'])
+        self.assertEqual(later[:2], ['SXRZ', 'SXRZ.DE'])
+        self.assertEqual(md.resolved_symbol('SXRZ'), 'SXRZ')
+
+    def test_symbol_resolution_ignores_transient_yahoo_errors(self):
+        md = market_scanner.market_data
+
+        def rate_limited(candidate):
+            if candidate == 'AAPL':
+                raise RuntimeError('Too Many Requests')
+            return 'Apple Inc.' if candidate == 'AAPL.DE' else None
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'history.sqlite')
+            self.addCleanup(lambda: md._HISTORY_STORES.pop(path).close())
+            for _ in range(3):
+                with md.run_scope(history_path=path):
+                    md.resolve_symbol('AAPL', rate_limited)
+            with md.run_scope(history_path=path):
+                resolved = md.resolved_symbol('AAPL')
+                known = md.history_store(path).load_resolutions(
+                    'AAPL', 'history'
+                )
+
+        self.assertEqual(resolved, 'AAPL')
+        self.assertNotIn('AAPL', known)
+
     @patch('market_scanner.yf.Ticker')
     def test_lqq_skips_yahoo_fundamentals_and_earnings(self, ticker_factory):
         info = market_scanner._get_yahoo_info('LQQ.PA')
@@ -1798,6 +2081,533 @@ class TestPortfolioAIAnalysis(unittest.TestCase):
         self.assertEqual(float(frame['Close'].iloc[-1]), 61)
         self.assertIsNone(stale)
 
+    def test_state_index_stays_consistent_with_replaced_records(self):
+        first_aapl = {'Ticker': 'AAPL', 'Price': 1}
+        last_aapl = {'Ticker': 'aapl', 'Price': 2}
+        state = {
+            'watchlist': [first_aapl, {'Ticker': 'MSFT'}, last_aapl],
+            'portfolio': [{'Symbol': 'JPM'}],
+        }
+        index = market_scanner.market_data.StateIndex(state)
+
+        self.assertIs(index.get('watchlist', 'aapl'), first_aapl)
+        self.assertIs(index.mapping('watchlist')['AAPL'], last_aapl)
+        self.assertEqual(index.get('portfolio', 'JPM'), {'Symbol': 'JPM'})
+
+        state['watchlist'].append({'Ticker': 'NVDA'})
+        self.assertEqual(index.get('watchlist', 'NVDA'), {'Ticker': 'NVDA'})
+        state['watchlist'] = [{'Ticker': 'TLV.RO'}]
+        self.assertIsNone(index.get('watchlist', 'AAPL'))
+        self.assertEqual(
+            market_scanner.market_data.get_cached_watchlist_ticker(
+                state, 'TLV.RO'
+            ),
+            {'Ticker': 'TLV.RO'},
+        )
+
+    def test_state_index_sees_in_place_record_replacement(self):
+        state = {'watchlist': [{'Ticker': 'AAPL', 'Price': 1}, {'Ticker': 'MSFT'}]}
+        index = market_scanner.market_data.StateIndex(state)
+        self.assertEqual(index.get('watchlist', 'AAPL')['Price'], 1)
+
+        records = state['watchlist']
+        index.replace('watchlist', {'Ticker': 'aapl', 'Price': 2})
+        self.assertIs(state['watchlist'], records)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(index.get('watchlist', 'AAPL')['Price'], 2)
+        self.assertEqual(index.mapping('watchlist')['AAPL']['Price'], 2)
+
+        # Atribuire directă, aceeași listă și aceeași lungime.
+        records[1] = {'Ticker': 'NVDA'}
+        index.invalidate('watchlist')
+        self.assertIsNone(index.get('watchlist', 'MSFT'))
+        self.assertEqual(index.get('watchlist', 'NVDA'), {'Ticker': 'NVDA'})
+
+        index.replace('portfolio', {'Symbol': 'JPM'})
+        self.assertEqual(state['portfolio'], [{'Symbol': 'JPM'}])
+        self.assertEqual(index.get('portfolio', 'jpm'), {'Symbol': 'JPM'})
+
+    def _finviz_cache_sandbox(self, cache_path):
+        md = market_scanner.market_data
+        patches = [
+            patch.object(md, 'FINVIZ_CACHE_FILE', cache_path),
+            patch.object(md, '_FINVIZ_STORE', None),
+            patch.object(md, '_FINVIZ_STORE_PATH', None),
+            patch.object(md, '_FINVIZ_STORE_DIRTY', False),
+            patch.dict(md._finviz_cache, clear=True),
+            patch.object(md, 'throttle_host'),
+        ]
+        for item in patches:
+            item.start()
+            self.addCleanup(item.stop)
+        return md
+
+    def test_finviz_cache_persists_fields_and_negative_results(self):
+        html = (
+            '<html><head><title>AAPL - Apple Inc. Stock Price and Quote'
+            '</title></head><body><table><tr class="table-dark-row">'
+            '<td>Target Price</td><td>250.50</td><td>ATR (14)</td><td>4.10</td>'
+            '<td>Volatility</td><td>1.50% 2.05%</td></tr></table></body></html>'
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_path = os.path.join(tmpdir, 'finviz_cache.json')
+            md = self._finviz_cache_sandbox(cache_path)
+            ok = Mock(status_code=200, text=html)
+            missing = Mock(status_code=404, text='')
+            with patch.object(md.requests, 'get', side_effect=[ok, missing]) as get:
+                first = md.get_finviz_data('AAPL')
+                md.get_finviz_data('NOPE')
+                self.assertTrue(md.flush_finviz_cache())
+
+                md._finviz_cache.clear()
+                md._FINVIZ_STORE = None
+                self.assertEqual(md.get_finviz_data('AAPL'), first)
+                self.assertIsNone(md.get_finviz_data('NOPE')['Target'])
+            self.assertEqual(get.call_count, 2)
+            self.assertEqual(first['Target'], 250.5)
+            self.assertEqual(first['VolM'], 2.05)
+            self.assertEqual(first['Company'], 'Apple Inc.')
+            with open(cache_path, encoding='utf-8') as handle:
+                payload = json.load(handle)
+            self.assertIn('failed_at', payload['entries']['NOPE'])
+
+    def test_finviz_cache_serves_stale_values_while_revalidating(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            md = self._finviz_cache_sandbox(
+                os.path.join(tmpdir, 'finviz_cache.json')
+            )
+            now = time.time()
+            md._finviz_store()['MSFT'] = {
+                'values': {'Target': 500.0, 'ATR': 7.0, 'VolW': 1.0,
+                           'VolM': 2.0, 'Company': 'Microsoft'},
+                'fetched_at': now - 30 * 3600,
+            }
+            md._finviz_store()['OLD'] = {
+                'values': {'Target': 1.0}, 'fetched_at': now - 200 * 3600,
+            }
+            fresh = {'Target': 510.0, 'ATR': 7.5, 'VolW': 1.1, 'VolM': 2.1}
+            with patch.object(
+                md, '_fetch_finviz_quote', return_value=(fresh, True)
+            ) as fetch:
+                served = md.get_finviz_data('MSFT')
+                md.flush_finviz_cache()
+                expired = md.get_finviz_data('OLD')
+
+            self.assertEqual(served['Target'], 500.0)
+            self.assertEqual(expired, fresh)
+            self.assertEqual(
+                [call.args[0] for call in fetch.call_args_list], ['MSFT', 'OLD']
+            )
+            self.assertEqual(md._finviz_store()['MSFT']['values']['Target'], 510.0)
+            self.assertEqual(md.get_finviz_data('MSFT'), fresh)
+
+    def test_finviz_cache_keeps_last_values_when_refetch_fails(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            md = self._finviz_cache_sandbox(
+                os.path.join(tmpdir, 'finviz_cache.json')
+            )
+            md._finviz_store()['OLD'] = {
+                'values': {'Target': 42.0, 'ATR': 1.5, 'Company': 'Old Co'},
+                'fetched_at': time.time() - 200 * 3600,
+            }
+            empty = {'Target': None, 'ATR': None, 'VolW': None, 'VolM': None}
+            with patch.object(
+                md, '_fetch_finviz_quote', return_value=(empty, False)
+            ) as fetch:
+                served = md.get_finviz_data('OLD')
+                md._finviz_cache.clear()
+                again = md.get_finviz_data('OLD')
+
+        fetch.assert_called_once_with('OLD')
+        self.assertEqual(served['Target'], 42.0)
+        self.assertEqual(served['Company'], 'Old Co')
+        self.assertEqual(again, served)
+
+    def test_indicator_panel_matches_per_ticker_calculations(self):
+        md = market_scanner.market_data
+        rng = np.random.default_rng(7)
+        us_dates = pd.date_range('2025-06-02', periods=260, freq='B')
+        eu_dates = us_dates.delete([40, 41, 250])
+        histories = {}
+        for symbol, dates in (('AAA', us_dates), ('BBB', us_dates), ('CCC.DE', eu_dates)):
+            close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+            histories[symbol] = pd.DataFrame({
+                'Open': close, 'High': close * 1.02, 'Low': close * 0.97,
+                'Close': close, 'Volume': np.full(len(dates), 1e5),
+            }, index=dates)
+        benchmark = pd.Series(
+            np.linspace(5000, 5600, 63), index=us_dates[-63:]
+        )
+
+        latest = md.batch_latest_indicators(histories, benchmark)
+
+        for symbol, frame in histories.items():
+            row = latest.loc[symbol]
+            self.assertAlmostEqual(row['ATR'], market_scanner.calculate_atr(frame).iloc[-1])
+            self.assertAlmostEqual(row['RSI'], market_scanner.calculate_rsi(frame).iloc[-1])
+            self.assertAlmostEqual(row['SMA_50'], market_scanner.calculate_sma(frame, 50).iloc[-1])
+            self.assertAlmostEqual(row['SMA_200'], market_scanner.calculate_sma(frame, 200).iloc[-1])
+            self.assertAlmostEqual(
+                row['Return_20'],
+                (frame['Close'].iloc[-1] / frame['Close'].iloc[-21] - 1) * 100,
+            )
+            for sessions in (20, 60):
+                expected = md.relative_return_gap(frame['Close'], benchmark, sessions)
+                if expected is None:
+                    self.assertTrue(np.isnan(row[f'RS_{sessions}']))
+                else:
+                    self.assertAlmostEqual(row[f'RS_{sessions}'], expected)
+
+        with md.run_scope():
+            md.prime_indicator_cache(histories, '^GSPC', benchmark)
+            with patch.object(md, 'batch_latest_indicators') as recompute:
+                cached = md.latest_indicators(
+                    'AAA', histories['AAA'].copy(), '^GSPC', benchmark
+                )
+            recompute.assert_not_called()
+            adjusted = histories['AAA'].copy()
+            adjusted.iloc[:10, adjusted.columns.get_loc('Close')] /= 2
+            fresh = md.latest_indicators('AAA', adjusted, '^GSPC', benchmark)
+        self.assertEqual(cached['SMA_50'], latest.loc['AAA', 'SMA_50'])
+        self.assertAlmostEqual(
+            fresh['SMA_200'], market_scanner.calculate_sma(adjusted, 200).iloc[-1]
+        )
+
+    def test_split_adjustment_handles_every_unadjusted_split(self):
+        dates = pd.date_range('2026-03-02', periods=8, freq='B')
+        closes = [2000.0, 2010.0, 20.0, 20.5, 21.0, 0.105, 0.11, 0.12]
+        frame = pd.DataFrame({
+            'Open': closes, 'High': closes, 'Low': closes, 'Close': closes,
+            'Volume': [10] * 8,
+        }, index=dates)
+
+        with patch('builtins.print') as log:
+            adjusted = market_scanner.adjust_for_unadjusted_splits(
+                frame.copy(), 'XYZ'
+            )
+
+        np.testing.assert_allclose(
+            adjusted['Close'],
+            [0.1, 0.1005, 0.1, 0.1025, 0.105, 0.105, 0.11, 0.12],
+        )
+        self.assertEqual(adjusted['Volume'].tolist()[:2], [200000.0] * 2)
+        self.assertEqual(adjusted['Volume'].iloc[3], 2000.0)
+        messages = [call.args[0] for call in log.call_args_list]
+        self.assertEqual(len(messages), 2)
+        self.assertIn('2026-03-04 (factor: 100.0x)', messages[0])
+        self.assertIn('2026-03-09 (factor: 200.0x)', messages[1])
+
+        with patch('builtins.print'):
+            tail_only = market_scanner.adjust_for_unadjusted_splits(
+                frame.copy(), 'XYZ', since=4
+            )
+        self.assertEqual(float(tail_only['Close'].iloc[0]), 10.0)
+        self.assertEqual(float(tail_only['Close'].iloc[3]), 20.5 / 200)
+
+        panel = pd.DataFrame({'XYZ': closes, 'FLAT': [5.0] * 8}, index=dates)
+        scale, jumps = market_scanner.market_data.detect_unadjusted_splits(panel)
+        self.assertEqual(
+            jumps, [(2, 'XYZ', 100.0), (5, 'XYZ', 200.0)]
+        )
+        self.assertTrue((scale['FLAT'] == 1.0).all())
+
+    def test_benchmark_registry_fetches_once_per_run_and_slices(self):
+        dates = pd.date_range('2024-08-01', '2026-07-31', freq='B')
+        benchmark = pd.DataFrame(
+            {'Close': np.linspace(100, 200, len(dates))},
+            index=dates.tz_localize('America/New_York'),
+        )
+        fetch = Mock(return_value=benchmark)
+
+        with market_scanner.market_data.run_scope():
+            short = market_scanner.market_data.get_benchmark_history(
+                '^GSPC', period='3mo', fetch=fetch
+            )
+            full = market_scanner.market_data.get_benchmark_history(
+                '^GSPC', period='2y', fetch=fetch
+            )
+            short['Close'] = 0
+
+            again = market_scanner.market_data.get_benchmark_history(
+                '^GSPC', period='3mo', fetch=fetch
+            )
+
+        fetch.assert_called_once_with('^GSPC', period='2y')
+        self.assertIsNone(again.index.tz)
+        self.assertLess(len(again), 70)
+        self.assertEqual(len(full), len(dates))
+        self.assertEqual(float(again['Close'].iloc[-1]), 200.0)
+
+    def test_relative_strength_aligns_sessions_by_date(self):
+        dates = pd.date_range('2026-05-01', periods=30, freq='B')
+        benchmark = pd.Series(np.linspace(100, 110, 30), index=dates)
+        # Acțiunea nu are a zecea ședință; comparația nu trebuie decalată.
+        stock = pd.Series(np.linspace(50, 60, 30), index=dates).drop(dates[9])
+
+        gap = market_scanner.market_data.relative_return_gap(
+            stock, benchmark, 20
+        )
+
+        common = dates.drop(dates[9])[-20:]
+        expected = (
+            (stock[common[-1]] / stock[common[0]] - 1)
+            - (benchmark[common[-1]] / benchmark[common[0]] - 1)
+        ) * 100
+        self.assertAlmostEqual(gap, expected)
+        self.assertIsNone(market_scanner.market_data.relative_return_gap(
+            stock, benchmark, 60
+        ))
+
+    def test_tws_instrument_store_parses_once_and_reloads_on_change(self):
+        def snapshot(close):
+            return {
+                'fetched_at': '2026-07-28T06:00:00+00:00',
+                'instruments': {
+                    'LQQ.PA': {
+                        'aliases': ['LQQ', 'LQQ.FR'],
+                        'bars': [{
+                            'date': '2026-07-27', 'open': close,
+                            'high': close, 'low': close, 'close': close,
+                        }],
+                    },
+                },
+            }
+
+        now = datetime(2026, 7, 28, 7, tzinfo=timezone.utc)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'tws_instruments.json')
+            with open(path, 'w', encoding='utf-8') as handle:
+                json.dump(snapshot(10), handle)
+            with patch(
+                'market_scanner.json.load', wraps=json.load
+            ) as json_load:
+                first = market_scanner._load_tws_instrument(
+                    'LQQ', path=path, now=now
+                )
+                second = market_scanner._load_tws_instrument(
+                    'lqq.fr', path=path, now=now
+                )
+                frame = market_scanner._tws_instrument_history_frame(first)
+                frame['Close'] = 0
+                cached_frame = market_scanner._tws_instrument_history_frame(
+                    second
+                )
+                self.assertEqual(json_load.call_count, 1)
+
+                with open(path, 'w', encoding='utf-8') as handle:
+                    json.dump(snapshot(12.5), handle)
+                stat = os.stat(path)
+                os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+                updated = market_scanner._load_tws_instrument(
+                    'LQQ.PA', path=path, now=now
+                )
+                self.assertEqual(json_load.call_count, 2)
+
+        self.assertIs(first, second)
+        self.assertEqual(float(cached_frame['Close'].iloc[-1]), 10)
+        self.assertEqual(updated['bars'][0]['close'], 12.5)
+        self.assertIsNone(market_scanner._load_tws_instrument(
+            'MISSING', path=os.path.join(temp_dir, 'absent.json')
+        ))
+
+    @patch('market_scanner._load_tws_instrument', return_value=None)
+    @patch('market_scanner.yf.download')
+    def test_prefetch_uses_the_resolved_exchange_variant(
+        self, yahoo_download, _load_tws,
+    ):
+        md = market_scanner.market_data
+        dates = pd.date_range('2026-07-01', periods=3, freq='B')
+        yahoo_download.return_value = pd.DataFrame({
+            'Open': [1.0, 2.0, 3.0], 'High': [1.5, 2.5, 3.5],
+            'Low': [0.5, 1.5, 2.5], 'Close': [1.0, 2.0, 3.0],
+            'Volume': [10, 20, 30],
+        }, index=dates)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'history.sqlite')
+            self.addCleanup(lambda: md._HISTORY_STORES.pop(path).close())
+            store = md.history_store(path)
+            for _ in range(2):
+                store.record_resolution('SXRZ', 'history', 'SXRZ', False)
+            store.record_resolution('SXRZ', 'history', 'SXRZ.DE', True)
+            with md.run_scope(history_path=path):
+                loaded = market_scanner.prefetch_yahoo_histories(['SXRZ'])
+                history = market_scanner._download_yahoo_history('SXRZ.DE')
+
+        self.assertEqual(loaded, 1)
+        yahoo_download.assert_called_once()
+        self.assertEqual(yahoo_download.call_args.args[0], ['SXRZ.DE'])
+        self.assertEqual(float(history['Close'].iloc[-1]), 3.0)
+
+    @patch('market_scanner._load_tws_instrument', return_value=None)
+    @patch('market_scanner.yf.download')
+    def test_prefetch_batches_yahoo_histories_for_the_current_run(
+        self, yahoo_download, _load_tws,
+    ):
+        dates = pd.date_range('2026-07-01', periods=3, freq='B')
+        batch = pd.concat(
+            {
+                symbol: pd.DataFrame({
+                    'Open': [1.0, 2.0, 3.0], 'High': [1.5, 2.5, 3.5],
+                    'Low': [0.5, 1.5, 2.5], 'Close': close,
+                    'Volume': [10, 20, 30],
+                }, index=dates)
+                for symbol, close in (
+                    ('AAPL', [1.0, 2.0, 3.0]), ('LQQ.PA', [4.0, 5.0, 6.0]),
+                )
+            },
+            axis=1,
+        )
+        yahoo_download.return_value = batch
+
+        self.assertEqual(market_scanner.prefetch_yahoo_histories(['AAPL']), 0)
+        yahoo_download.assert_not_called()
+        with market_scanner.market_data.run_scope():
+            loaded = market_scanner.prefetch_yahoo_histories(
+                ['AAPL', 'LQQ.FR', 'TLV.RO', 'AAPL']
+            )
+            aapl = market_scanner._download_yahoo_history('AAPL')
+            lqq = market_scanner._download_yahoo_history('LQQ.PA')
+
+        self.assertEqual(loaded, 2)
+        yahoo_download.assert_called_once()
+        self.assertEqual(yahoo_download.call_args.args[0], ['AAPL', 'LQQ.PA'])
+        self.assertEqual(float(aapl['Close'].iloc[-1]), 3.0)
+        self.assertEqual(float(lqq['Close'].iloc[-1]), 6.0)
+        self.assertIsNone(
+            market_scanner.market_data.run_cache('yahoo_history')
+        )
+
+    @staticmethod
+    def _ohlcv(dates, closes):
+        closes = np.asarray(closes, dtype=float)
+        return pd.DataFrame({
+            'Open': closes, 'High': closes * 1.01, 'Low': closes * 0.99,
+            'Close': closes, 'Volume': np.full(len(closes), 1000.0),
+        }, index=pd.DatetimeIndex(dates, name='Date'))
+
+    def test_stored_history_is_rechecked_on_every_portfolio_run(self):
+        md = market_scanner.market_data
+        dates = pd.date_range('2025-08-01', '2026-07-31', freq='B')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'history.sqlite')
+            self.addCleanup(lambda: md._HISTORY_STORES.pop(path).close())
+            store = md.history_store(path)
+            frame = self._ohlcv(dates, np.linspace(100, 150, len(dates)))
+            store.write('AAPL', frame, covered_days=366,
+                        checked_at=time.time() - 5 * 60)
+            _, recent = market_scanner._stored_history_plan(store, 'AAPL', '1y')
+            # Rularea de portofoliu anterioară a fost acum 30 de minute.
+            store.write('AAPL', frame.iloc[-1:],
+                        checked_at=time.time() - 30 * 60)
+            _, previous_run = market_scanner._stored_history_plan(
+                store, 'AAPL', '1y'
+            )
+
+        self.assertEqual(recent, 'fresh')
+        self.assertEqual(previous_run, 'delta')
+
+    @patch.object(market_scanner, 'YAHOO_HISTORY_RECHECK_MINUTES', 0)
+    @patch('market_scanner.yf.download')
+    def test_history_store_downloads_only_the_delta_between_runs(
+        self, yahoo_download,
+    ):
+        md = market_scanner.market_data
+        dates = pd.date_range('2025-08-01', '2026-07-31', freq='B')
+        closes = np.linspace(100, 150, len(dates))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'history.sqlite')
+            self.addCleanup(lambda: md._HISTORY_STORES.pop(path).close())
+
+            yahoo_download.return_value = self._ohlcv(dates, closes)
+            with md.run_scope(history_path=path):
+                first = market_scanner._download_yahoo_history('AAPL')
+            self.assertEqual(len(first), len(dates))
+            self.assertEqual(yahoo_download.call_args.kwargs['period'], '1y')
+
+            new_dates = pd.date_range('2026-07-27', '2026-08-04', freq='B')
+            yahoo_download.return_value = self._ohlcv(
+                new_dates, list(closes[-5:]) + [151.0, 152.0]
+            )
+            with md.run_scope(history_path=path):
+                second = market_scanner._download_yahoo_history('AAPL')
+            self.assertEqual(
+                yahoo_download.call_args.kwargs['start'], '2026-07-24'
+            )
+            self.assertNotIn('period', yahoo_download.call_args.kwargs)
+            self.assertEqual(second.index[-1], pd.Timestamp('2026-08-04'))
+            self.assertEqual(float(second['Close'].iloc[-1]), 152.0)
+
+            # Yahoo a ajustat retroactiv un split 2:1: barele comune sunt la
+            # jumătate, deci istoricul stocat trebuie rescalat, nu dublat.
+            split_dates = pd.date_range('2026-07-28', '2026-08-05', freq='B')
+            yahoo_download.return_value = self._ohlcv(
+                split_dates, [c / 2 for c in second['Close'].iloc[-6:]] + [77.0]
+            )
+            with md.run_scope(history_path=path):
+                third = market_scanner._download_yahoo_history('AAPL')
+            stored, meta = md.history_store(path).load('AAPL')
+
+        self.assertEqual(yahoo_download.call_count, 3)
+        self.assertAlmostEqual(
+            float(stored.loc['2026-07-01', 'Close']),
+            float(first.loc['2026-07-01', 'Close']) / 2,
+        )
+        self.assertEqual(float(third['Close'].iloc[-1]), 77.0)
+        self.assertEqual(meta['covered_days'], 366)
+        self.assertFalse(third['Close'].pct_change().abs().gt(0.2).any())
+
+    def test_history_store_prunes_bars_outside_the_covered_window(self):
+        md = market_scanner.market_data
+        dates = pd.date_range('2024-08-01', '2026-07-31', freq='B')
+        frame = self._ohlcv(dates, np.linspace(100, 150, len(dates)))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'history.sqlite')
+            self.addCleanup(lambda: md._HISTORY_STORES.pop(path).close())
+            store = md.history_store(path)
+            # Barele anexate prin delte au depășit fereastra de un an.
+            store.write('AAPL', frame, covered_days=366)
+            # Simbol ieșit din watchlist, neverificat de peste un an.
+            store.write('OLD', frame, covered_days=366,
+                        checked_at=time.time() - 400 * 86400)
+            expected = market_scanner.market_data._slice_period(frame, '1y')
+
+            with md.run_scope(history_path=path):
+                pass
+            aapl, meta = store.load('AAPL')
+            old, old_meta = store.load('OLD')
+
+        self.assertEqual(len(aapl), len(expected))
+        self.assertEqual(aapl.index[0], expected.index[0])
+        self.assertEqual(meta['covered_days'], 366)
+        self.assertTrue(old.empty)
+        self.assertIsNone(old_meta)
+
+    @patch('market_scanner.yf.download')
+    def test_history_store_fixes_unadjusted_split_at_delta_boundary(
+        self, yahoo_download,
+    ):
+        dates = pd.date_range('2026-06-01', '2026-06-12', freq='B')
+        stored = self._ohlcv(dates, np.full(len(dates), 1000.0))
+        delta = self._ohlcv(
+            pd.date_range('2026-06-10', '2026-06-16', freq='B'),
+            [1000.0, 1000.0, 1000.0, 10.0, 10.5],
+        )
+
+        merged, rewritten = market_scanner._merge_history_delta(
+            'XYZ', stored, delta
+        )
+
+        self.assertTrue(rewritten)
+        self.assertEqual(float(merged['Close'].iloc[0]), 10.0)
+        self.assertEqual(float(merged['Close'].iloc[-1]), 10.5)
+        yahoo_download.assert_not_called()
+        self.assertEqual(
+            market_scanner._merge_history_delta(
+                'XYZ', stored, self._ohlcv(['2026-07-01'], [10.0])
+            ),
+            (None, True),
+        )
+
     @patch('market_scanner.bvb_public_market_data.fetch_history')
     @patch('market_scanner._load_tws_instrument', return_value=None)
     @patch('market_scanner._download_yahoo_history')
@@ -2590,6 +3400,121 @@ class TestPortfolioAIAnalysis(unittest.TestCase):
         )
         self.assertEqual(result['us_universe_stats']['last_batch_attempted'], 1)
 
+    @patch('market_scanner.process_watchlist_ticker')
+    @patch('market_scanner.load_watchlist')
+    def test_parallel_watchlist_refresh_keeps_order_and_cache_semantics(
+        self, mock_load_watchlist, mock_process
+    ):
+        mock_load_watchlist.return_value = ['SLOW', 'FRESH', 'FAST', 'GONE']
+        complete_fields = {
+            'Currency': 'USD', 'Strategy': 'Trend', 'Volume': 1,
+            'Company_Name': 'Cached Inc.',
+        }
+        state = {'watchlist': [
+            dict(complete_fields, Ticker='FRESH', _cached_at=time.time()),
+            dict(
+                complete_fields, Ticker='GONE',
+                _cached_at=time.time() - 86400,
+            ),
+        ]}
+
+        def process(symbol, _vix, _rates):
+            if symbol == 'SLOW':
+                time.sleep(0.05)
+            if symbol == 'GONE':
+                return None
+            return {'Ticker': symbol}
+
+        mock_process.side_effect = process
+        result = market_scanner.update_watchlist_data(
+            state, {'EUR': 1, 'USD': 1}, 15,
+            sync_remote=False, max_workers=3,
+        )
+
+        self.assertEqual(
+            [item['Ticker'] for item in result['watchlist']],
+            ['SLOW', 'FRESH', 'FAST', 'GONE'],
+        )
+        self.assertEqual(
+            sorted(call.args[0] for call in mock_process.call_args_list),
+            ['FAST', 'GONE', 'SLOW'],
+        )
+        self.assertEqual(
+            result['watchlist'][3]['Data_Refresh_Status'], 'stale_cache'
+        )
+        self.assertIn('_cached_at', result['watchlist'][0])
+
+    @patch('market_scanner.process_watchlist_ticker')
+    @patch('market_scanner.load_watchlist')
+    def test_parallel_watchlist_refresh_backfills_bvb_once(
+        self, mock_load_watchlist, mock_process
+    ):
+        bvb = market_scanner.bvb_public_market_data
+        symbols = ['TLV.RO', 'DN.RO', 'AROBS.RO', 'ALW.RO']
+        mock_load_watchlist.return_value = symbols
+        daily_csv = (
+            b'"Symbol","Market","Volume","Value","Open","Low","High","Close"\n'
+            + b''.join(
+                f'"{symbol[:-3]}","REGS","100","1000","10","9","11","10.5"\n'
+                .encode()
+                for symbol in symbols
+            )
+        )
+
+        def get(url, params, timeout):
+            time.sleep(0.001)
+            response = MagicMock()
+            response.content = daily_csv
+            response.raise_for_status.return_value = None
+            return response
+
+        session = MagicMock()
+        session.get.side_effect = get
+
+        def process(symbol, _vix, _rates):
+            history, _ = bvb.fetch_history(symbol, min_observations=1)
+            return {
+                'Ticker': symbol,
+                'Sessions': len(history),
+                'Last': history.index[-1].date().isoformat(),
+            }
+
+        mock_process.side_effect = process
+        original_backfill = bvb.backfill
+        backfill_threads = []
+
+        def backfill(**kwargs):
+            backfill_threads.append(threading.current_thread())
+            return original_backfill(**kwargs)
+
+        original_cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.chdir(tmpdir)
+            self.addCleanup(os.chdir, original_cwd)
+            with patch.object(bvb, '_session', return_value=session), \
+                    patch.object(bvb, 'MIN_REQUEST_INTERVAL_SECONDS', 0), \
+                    patch.object(bvb, 'backfill', side_effect=backfill):
+                result = market_scanner.update_watchlist_data(
+                    {}, {'EUR': 1, 'USD': 1}, 15,
+                    sync_remote=False, max_workers=4,
+                )
+                candidates = len(bvb._candidate_dates(
+                    datetime.now().astimezone().date(),
+                    bvb.DEFAULT_LOOKBACK_DAYS,
+                ))
+            bvb._CACHE_STORES.pop(os.path.abspath(bvb.DEFAULT_CACHE_FILE), None)
+            os.chdir(original_cwd)
+
+        # Backfillul rulează întâi din firul principal, înaintea poolului;
+        # firele doar citesc cache-ul, fără cereri suplimentare.
+        self.assertIs(backfill_threads[0], threading.main_thread())
+        self.assertGreater(len(backfill_threads), 1)
+        self.assertEqual(session.get.call_count, candidates)
+        rows = result['watchlist']
+        self.assertEqual([row['Ticker'] for row in rows], symbols)
+        self.assertEqual({row['Sessions'] for row in rows}, {candidates})
+        self.assertEqual(len({row['Last'] for row in rows}), 1)
+
     def test_us_selection_limits_two_candidates_per_sector(self):
         external = [
             {
@@ -2824,9 +3749,12 @@ class TestPortfolioAIAnalysis(unittest.TestCase):
 
     def test_portfolio_evidence_prefers_official_sec_filings_and_keeps_links(self):
         class FakeResponse:
+            status_code = 200
+
             def __init__(self, payload=None, content=b''):
                 self._payload = payload
                 self.content = content
+                self.headers = {}
             def raise_for_status(self):
                 return None
             def json(self):
@@ -2859,9 +3787,12 @@ class TestPortfolioAIAnalysis(unittest.TestCase):
 
     def test_bvb_symbol_is_never_matched_to_same_named_sec_ticker(self):
         class FakeResponse:
+            status_code = 200
+
             def __init__(self, payload=None, content=b''):
                 self._payload = payload
                 self.content = content
+                self.headers = {}
             def raise_for_status(self):
                 return None
             def json(self):
@@ -2919,6 +3850,115 @@ class TestPortfolioAIAnalysis(unittest.TestCase):
             )
         self.assertEqual(evidence['items'], [])
         
+    def test_portfolio_evidence_refreshes_only_new_or_expired_symbols(self):
+        class FakeResponse:
+            def __init__(self, content):
+                self.content = content
+            def raise_for_status(self):
+                return None
+
+        class FakeSession:
+            def __init__(self):
+                self.urls = []
+            def get(self, url, **kwargs):
+                self.urls.append(url)
+                if 'company_tickers' in url:
+                    raise market_scanner_analysis.requests.RequestException()
+                symbol = url.split('s=')[1].split('&')[0]
+                return FakeResponse((
+                    '<rss><channel><item><title>Știre ' + symbol
+                    + '</title><link>https://example.com/' + symbol
+                    + '</link></item></channel></rss>'
+                ).encode())
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        expired = now - timedelta(
+            hours=market_scanner_analysis.PORTFOLIO_EVIDENCE_CACHE_HOURS + 1
+        )
+
+        def cached_item(symbol):
+            return {
+                'source_id': f'{symbol}-news-1', 'symbol': symbol,
+                'title': f'Vechi {symbol}', 'url': f'https://example.com/old/{symbol}',
+            }
+
+        cached = {
+            'fetched_at': now.isoformat(),
+            'symbols': ['AAA', 'OLD'],
+            'symbol_fetched_at': {
+                'AAA': now.isoformat(), 'OLD': expired.isoformat(),
+            },
+            'items': [cached_item('AAA'), cached_item('OLD')],
+        }
+        session = FakeSession()
+        evidence = market_scanner_analysis.collect_portfolio_evidence(
+            {
+                'positions': [{'symbol': 'AAA'}, {'symbol': 'OLD'}],
+                'buy_candidates': [{'symbol': 'NEW'}],
+            },
+            cached=cached,
+            request_session=session,
+            now=now,
+        )
+
+        rss_symbols = sorted(
+            url.split('s=')[1].split('&')[0]
+            for url in session.urls if 'feeds.finance.yahoo.com' in url
+        )
+        self.assertEqual(rss_symbols, ['NEW', 'OLD'])
+        titles = {item['symbol']: item['title'] for item in evidence['items']}
+        self.assertEqual(titles, {
+            'AAA': 'Vechi AAA', 'OLD': 'Știre OLD', 'NEW': 'Știre NEW',
+        })
+        self.assertEqual(
+            evidence['symbol_fetched_at']['AAA'], now.isoformat()
+        )
+        self.assertEqual(
+            evidence['symbol_fetched_at']['NEW'], now.isoformat(timespec='seconds')
+        )
+        self.assertEqual(evidence['status'], 'actualizat')
+
+    def test_sec_ticker_map_is_persisted_and_revalidated_weekly(self):
+        session = Mock()
+        session.get.return_value = Mock(
+            status_code=200,
+            headers={'ETag': '"v1"', 'Last-Modified': 'Mon, 05 Oct 2026 00:00:00 GMT'},
+            json=Mock(return_value={
+                '0': {'ticker': 'aapl', 'cik_str': 320193},
+                '1': {'ticker': 'MSFT', 'cik_str': 789019},
+            }),
+        )
+        now = datetime(2026, 10, 18, 12, 0)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, 'sec_ticker_map.json')
+            first = market_scanner_analysis.sec_ticker_map(
+                session=session, cache_path=cache_path, now=now
+            )
+            within_ttl = market_scanner_analysis.sec_ticker_map(
+                session=session, cache_path=cache_path,
+                now=now + timedelta(days=3),
+            )
+            self.assertEqual(session.get.call_count, 1)
+
+            session.get.return_value = Mock(status_code=304, headers={})
+            revalidated = market_scanner_analysis.sec_ticker_map(
+                session=session, cache_path=cache_path,
+                now=now + timedelta(days=8),
+            )
+            with open(cache_path, encoding='utf-8') as handle:
+                saved = json.load(handle)
+
+        self.assertEqual(first, {'AAPL': 320193, 'MSFT': 789019})
+        self.assertEqual(within_ttl, first)
+        self.assertEqual(revalidated, first)
+        self.assertEqual(session.get.call_count, 2)
+        headers = session.get.call_args.kwargs['headers']
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertEqual(
+            headers['If-Modified-Since'], 'Mon, 05 Oct 2026 00:00:00 GMT'
+        )
+        self.assertEqual(saved['checked_at'], (now + timedelta(days=8)).isoformat())
+
     def test_nasdaq_affects_probability_calculation(self):
         """Test that NASDAQ affects probability direction calculation."""
         # Test with bullish NASDAQ
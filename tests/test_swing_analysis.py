@@ -18,10 +18,13 @@ from market_scanner_analysis import (
 
 class TestSwingAnalysis(unittest.TestCase):
 
+    @patch('market_scanner_analysis.yf.download', return_value=pd.DataFrame())
     @patch('market_scanner_analysis.yf.Ticker')
     @patch('market_scanner_analysis.requests.get')
-    def test_get_swing_data_success(self, mock_get, mock_ticker):
+    def test_get_swing_data_success(self, mock_get, mock_ticker, _mock_download):
         """ Test extracting data when APIs work correctly """
+        # The batched context download returns nothing, so every ticker
+        # falls back to its own Ticker.history request below.
         
         # 1. Mock SPX Data
         mock_spx = MagicMock()
@@ -110,12 +113,14 @@ class TestSwingAnalysis(unittest.TestCase):
         self.assertIsInstance(data.get('Chart_SPX', {}).get('price'), list)
         self.assertEqual(len(data.get('Chart_SPX', {}).get('sma200', [])), 60) 
 
+    @patch('market_scanner_analysis.yf.download')
     @patch('market_scanner_analysis.yf.Ticker')
     @patch('market_scanner_analysis.requests.get')
-    def test_get_swing_data_failures(self, mock_get, mock_ticker):
+    def test_get_swing_data_failures(self, mock_get, mock_ticker, mock_download):
         """ Test robust handling when APIs fail """
         
         # Mock exceptions
+        mock_download.side_effect = Exception("Yahoo Down")
         mock_ticker.side_effect = Exception("Yahoo Down")
         mock_get.side_effect = Exception("CNN Down")
         
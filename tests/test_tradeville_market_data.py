@@ -3,6 +3,7 @@ import json
 import os
 import tempfile
 import unittest
+import unittest.mock
 from unittest.mock import Mock
 
 import pandas as pd
@@ -22,6 +23,21 @@ def _payload(rows):
     }
 
 
+def _legacy_cache_rows(frame):
+    """Barele în formatul vechi al cache-ului ({"symbols": {...: {"bars"}}})."""
+    return [
+        {
+            "date": pd.Timestamp(date_index).date().isoformat(),
+            "open": float(row["Open"]),
+            "high": float(row["High"]),
+            "low": float(row["Low"]),
+            "close": float(row["Close"]),
+            "volume": float(row["Volume"]),
+        }
+        for date_index, row in frame.iterrows()
+    ]
+
+
 class TestTradevilleMarketData(unittest.TestCase):
     def test_default_session_retries_temporary_connection_failures(self):
         tradeville_market_data._RETRY_SESSION = None
@@ -66,6 +82,44 @@ class TestTradevilleMarketData(unittest.TestCase):
         self.assertIn("ALR", symbols)
         self.assertNotIn("TALD", symbols)
 
+    def test_listed_symbols_are_persisted_and_revalidated_after_ttl(self):
+        links = "".join(
+            f'<a href="/actiuni/S{index}">Companie</a>'
+            for index in range(25)
+        )
+        listing = Mock(status_code=200, text=links, headers={"ETag": '"v1"'})
+        not_modified = Mock(status_code=304, text="", headers={})
+        session = Mock()
+        session.get.side_effect = [listing, not_modified]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = os.path.join(temp_dir, "listed.json")
+            for _ in range(3):
+                symbols = tradeville_market_data.fetch_listed_symbols(
+                    session=session, cache_path=cache_path
+                )
+            self.assertIn("S24", symbols)
+            session.get.assert_called_once()
+
+            with open(cache_path, encoding="utf-8") as handle:
+                payload = json.load(handle)
+            payload["checked_at"] = "2026-01-01T00:00:00+00:00"
+            with open(cache_path, "w", encoding="utf-8") as handle:
+                json.dump(payload, handle)
+
+            symbols = tradeville_market_data.fetch_listed_symbols(
+                session=session, cache_path=cache_path
+            )
+            with open(cache_path, encoding="utf-8") as handle:
+                revalidated = json.load(handle)
+
+        self.assertEqual(len(symbols), 25)
+        self.assertEqual(
+            session.get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'}
+        )
+        self.assertEqual(revalidated["etag"], '"v1"')
+        self.assertGreater(revalidated["checked_at"], "2026-01-01T00:00:00")
+
     def test_parses_valid_ohlcv_and_scientific_volume(self):
         rows = []
         start = datetime.date(2026, 4, 29)
@@ -191,7 +245,7 @@ class TestTradevilleMarketData(unittest.TestCase):
                     "symbols": {
                         "ALR": {
                             "fetched_at": "2026-07-28T06:00:00+00:00",
-                            "bars": tradeville_market_data._frame_to_cache_rows(
+                            "bars": _legacy_cache_rows(
                                 source_frame
                             ),
                         }
@@ -209,6 +263,69 @@ class TestTradevilleMarketData(unittest.TestCase):
         self.assertTrue(metadata["cache_fallback"])
         self.assertIn("cache local", metadata["data_provider"])
 
+    def test_cache_store_appends_one_line_per_saved_symbol(self):
+        rows = []
+        start = datetime.date(2026, 4, 29)
+        for index in range(90):
+            day = start + datetime.timedelta(days=index)
+            rows.append(f"{day.isoformat()},10,11,9,{10 + index / 100},{index}")
+        frame = tradeville_market_data.parse_chart_payload(
+            _payload(rows),
+            now=datetime.date(2026, 7, 28),
+        )
+        symbols = ["ALR", "TLV", "SNP"]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = os.path.join(temp_dir, "bvb_market_cache.json")
+            with open(cache_path, "w", encoding="utf-8") as handle:
+                json.dump({
+                    "version": 1,
+                    "symbols": {
+                        "BRD": {
+                            "fetched_at": "2026-07-27T06:00:00+00:00",
+                            "bars": _legacy_cache_rows(
+                                frame
+                            ),
+                        }
+                    },
+                }, handle, indent=2)
+            with unittest.mock.patch(
+                "builtins.open", wraps=open
+            ) as opened:
+                for symbol in symbols:
+                    tradeville_market_data._save_cache_entry(
+                        cache_path, symbol, frame, "2026-07-28T06:00:00+00:00"
+                    )
+            # Cache-ul vechi este citit și convertit o dată; restul simbolurilor
+            # sunt anexate fără recitirea fișierului.
+            self.assertEqual(
+                [call.args[1] for call in opened.call_args_list],
+                ["r", "w", "a", "a"],
+            )
+
+            tradeville_market_data._STORES.clear()
+            for symbol in symbols + ["BRD"]:
+                cached, _ = tradeville_market_data._cached_history(
+                    cache_path, symbol, now=datetime.date(2026, 7, 28)
+                )
+                pd.testing.assert_frame_equal(cached, frame, check_dtype=False)
+
+            # Actualizările sunt anexate, iar când liniile înlocuite depășesc
+            # simbolurile fișierul este compactat la o linie pe simbol.
+            for _ in range(5):
+                tradeville_market_data._save_cache_entry(
+                    cache_path, "ALR", frame, "2026-07-28T07:00:00+00:00"
+                )
+            with open(cache_path, encoding="utf-8") as handle:
+                lines = handle.read().splitlines()
+        tradeville_market_data._STORES.clear()
+
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(
+            sorted(json.loads(line)["symbol"] for line in lines),
+            ["ALR", "BRD", "SNP", "TLV"],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
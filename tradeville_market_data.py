@@ -40,12 +40,17 @@ LAST_VALID_LISTED_SYMBOLS = frozenset({
 DEFAULT_MAX_AGE_DAYS = 10
 DEFAULT_MIN_OBSERVATIONS = 60
 DEFAULT_CACHE_FILE = "bvb_market_cache.json"
+LISTED_SYMBOLS_CACHE_FILE = "tradeville_listed_symbols.json"
+LISTED_SYMBOLS_TTL_HOURS = 24
 _RETRY_SESSION = None
 _LISTED_SYMBOLS = None
 _REQUEST_LOCK = threading.Lock()
 _LAST_REQUEST_AT = 0.0
 MIN_REQUEST_INTERVAL_SECONDS = 1.0
 _DEFAULT_CACHE = object()
+_CACHE_COLUMNS = ("open", "high", "low", "close", "volume")
+_STORES = {}
+_STORES_LOCK = threading.Lock()
 
 
 class TradevilleDataError(ValueError):
@@ -130,25 +135,101 @@ def parse_listed_symbols(html):
     return symbols
 
 
-def fetch_listed_symbols(*, session=None, timeout=15):
-    """Încarcă o singură dată universul public Tradeville din rularea curentă."""
+def _load_listed_symbols_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, "r", encoding="utf-8") as handle:
+            payload = json.load(handle)
+        symbols = payload["symbols"]
+        checked_at = datetime.datetime.fromisoformat(payload["checked_at"])
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+    if not isinstance(symbols, list) or len(symbols) < 20:
+        return None
+    payload["symbols"] = set(symbols)
+    payload["checked_at"] = checked_at
+    return payload
+
+
+def _save_listed_symbols_cache(cache_path, symbols, checked_at, validators):
+    if not cache_path:
+        return
+    temp_path = f"{cache_path}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(
+                {
+                    "version": 1,
+                    "checked_at": checked_at.isoformat(),
+                    "etag": validators.get("etag"),
+                    "last_modified": validators.get("last_modified"),
+                    "symbols": sorted(symbols),
+                },
+                handle,
+                separators=(",", ":"),
+            )
+        os.replace(temp_path, cache_path)
+    except OSError:
+        try:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        except OSError:
+            pass
+
+
+def fetch_listed_symbols(*, session=None, timeout=15, cache_path=_DEFAULT_CACHE):
+    """Universul public Tradeville, partajat în rulare și persistat între rulări.
+
+    Lista salvată este folosită fără cerere cât timp e mai nouă de
+    LISTED_SYMBOLS_TTL_HOURS; apoi este revalidată condiționat (ETag /
+    Last-Modified), iar un 304 o reînnoiește fără a reparsa pagina.
+    """
     global _LISTED_SYMBOLS
     if session is None and _LISTED_SYMBOLS is not None:
         return set(_LISTED_SYMBOLS)
-    client = session or _retry_session()
-    try:
-        response = (
-            client.get(TRADEVILLE_LIST_URL, timeout=timeout)
-            if session is not None
-            else _throttled_get(client, TRADEVILLE_LIST_URL, timeout=timeout)
-        )
-        response.raise_for_status()
-        symbols = parse_listed_symbols(response.text)
-    except (requests.RequestException, TradevilleDataError):
-        symbols = set(LAST_VALID_LISTED_SYMBOLS)
+    if cache_path is _DEFAULT_CACHE:
+        cache_path = LISTED_SYMBOLS_CACHE_FILE if session is None else None
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cached = _load_listed_symbols_cache(cache_path)
+    if cached and now - cached["checked_at"] < datetime.timedelta(
+        hours=LISTED_SYMBOLS_TTL_HOURS
+    ):
+        symbols = cached["symbols"]
+    else:
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        request_kwargs = {"timeout": timeout}
+        if headers:
+            request_kwargs["headers"] = headers
+        client = session or _retry_session()
+        try:
+            response = (
+                client.get(TRADEVILLE_LIST_URL, **request_kwargs)
+                if session is not None
+                else _throttled_get(client, TRADEVILLE_LIST_URL, **request_kwargs)
+            )
+            if cached and response.status_code == 304:
+                symbols = cached["symbols"]
+                validators = cached
+            else:
+                response.raise_for_status()
+                symbols = parse_listed_symbols(response.text)
+                validators = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+            _save_listed_symbols_cache(cache_path, symbols, now, validators)
+        except (requests.RequestException, TradevilleDataError):
+            symbols = (
+                cached["symbols"] if cached else set(LAST_VALID_LISTED_SYMBOLS)
+            )
     if session is None:
         _LISTED_SYMBOLS = set(symbols)
-    return symbols
+    return set(symbols)
 
 
 def parse_chart_payload(
@@ -195,6 +276,22 @@ def parse_chart_payload(
     volume_column = normalized_columns.get("volum")
     selected["Volume"] = frame[volume_column] if volume_column else 0
 
+    return _validated_frame(
+        selected,
+        now=now,
+        max_age_days=max_age_days,
+        min_observations=min_observations,
+    )
+
+
+def _validated_frame(
+    selected,
+    *,
+    now=None,
+    max_age_days=DEFAULT_MAX_AGE_DAYS,
+    min_observations=DEFAULT_MIN_OBSERVATIONS,
+):
+    """Curăță barele OHLCV și respinge seriile insuficiente sau vechi."""
     selected["Date"] = pd.to_datetime(selected["Date"], errors="coerce")
     for column in ("Open", "High", "Low", "Close", "Volume"):
         selected[column] = pd.to_numeric(selected[column], errors="coerce")
@@ -243,83 +340,204 @@ def parse_chart_payload(
     ]
 
 
-def _frame_to_cache_rows(frame):
-    rows = []
-    for date_index, row in frame.iterrows():
-        rows.append({
-            "date": pd.Timestamp(date_index).date().isoformat(),
-            "open": _finite_number(row.get("Open")),
-            "high": _finite_number(row.get("High")),
-            "low": _finite_number(row.get("Low")),
-            "close": _finite_number(row.get("Close")),
-            "volume": _finite_number(row.get("Volume")) or 0,
-        })
-    return rows
+def _frame_to_cache_columns(frame):
+    return {
+        "date": [
+            pd.Timestamp(date_index).date().isoformat()
+            for date_index in frame.index
+        ],
+        **{
+            column.lower(): frame[column].astype(float).tolist()
+            for column in ("Open", "High", "Low", "Close", "Volume")
+        },
+    }
+
+
+def _cache_rows_to_columns(rows):
+    """Convertește barele din formatul vechi (listă de dict-uri) pe coloane."""
+    bars = [item for item in rows or [] if isinstance(item, dict)]
+    columns = {"date": [item.get("date") for item in bars]}
+    for column in _CACHE_COLUMNS:
+        columns[column] = [item.get(column) for item in bars]
+    columns["volume"] = [value or 0 for value in columns["volume"]]
+    return columns
 
 
-def _cache_rows_to_frame(
-    rows,
+def _cache_columns_to_frame(
+    entry,
     *,
     now=None,
     max_age_days=DEFAULT_MAX_AGE_DAYS,
     min_observations=DEFAULT_MIN_OBSERVATIONS,
 ):
-    if not isinstance(rows, list):
-        raise TradevilleDataError("Cache-ul Tradeville este invalid")
-    payload_rows = [
-        (
-            f"{item.get('date')},{item.get('open')},{item.get('high')},"
-            f"{item.get('low')},{item.get('close')},{item.get('volume', 0)}"
-        )
-        for item in rows
-        if isinstance(item, dict)
-    ]
-    return parse_chart_payload(
-        {
-            "data": (
-                "data,deschide,maxim,minim,last,volum\n"
-                + "\n".join(payload_rows)
-                + "\n"
-            )
-        },
+    try:
+        selected = pd.DataFrame({
+            "Date": entry["date"],
+            **{
+                column.capitalize(): entry[column]
+                for column in _CACHE_COLUMNS
+            },
+        })
+    except (KeyError, TypeError, ValueError) as exc:
+        raise TradevilleDataError("Cache-ul Tradeville este invalid") from exc
+    return _validated_frame(
+        selected,
         now=now,
         max_age_days=max_age_days,
         min_observations=min_observations,
     )
 
 
-def _load_cache(cache_path):
-    if not cache_path or not os.path.exists(cache_path):
-        return {}
+def _file_signature(path):
     try:
-        with open(cache_path, "r", encoding="utf-8") as handle:
-            payload = json.load(handle)
-        return payload if isinstance(payload, dict) else {}
-    except (OSError, ValueError, TypeError):
-        return {}
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class TradevilleHistoryStore:
+    """Cache-ul Tradeville pe simbol, numai cu adăugare (JSON Lines).
+
+    Fiecare linie conține un simbol cu barele pe coloane, iar ultima linie a
+    unui simbol câștigă. put() ține intrarea în memorie; flush() o anexează
+    la fișier, care este rescris compact doar când liniile înlocuite depășesc
+    numărul de simboluri. Se citește și formatul vechi ({"symbols": ...}).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._pending = {}
+        self._lines = 0
+        self._appendable = True
+        self._signature = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse(text):
+        records = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Linie trunchiată de o scriere întreruptă.
+                continue
+            if isinstance(record, dict):
+                records.append(record)
+        if not records and text.strip():
+            # Cache vechi, scris ca un singur document formatat.
+            try:
+                records = [json.loads(text)]
+            except ValueError:
+                records = []
+        entries = {}
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            if isinstance(record.get("symbols"), dict):
+                for symbol, entry in record["symbols"].items():
+                    if isinstance(entry, dict):
+                        entries[symbol] = {
+                            "fetched_at": entry.get("fetched_at"),
+                            **_cache_rows_to_columns(entry.get("bars")),
+                        }
+            elif isinstance(record.get("symbol"), str):
+                entries[record.pop("symbol")] = record
+        return entries, len(records)
+
+    def _refresh(self):
+        signature = _file_signature(self.path)
+        if signature == self._signature:
+            return
+        text = ""
+        if signature is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as handle:
+                    text = handle.read()
+            except OSError:
+                text = ""
+        self._entries, self._lines = self._parse(text)
+        # Formatul vechi sau o linie finală trunchiată nu se pot continua
+        # prin anexare; primul flush rescrie fișierul.
+        self._appendable = not text or (
+            text.endswith("\n")
+            and '"symbols"' not in text[:200]
+        )
+        self._entries.update(self._pending)
+        self._signature = signature
+
+    def get(self, symbol):
+        with self._lock:
+            self._refresh()
+            return self._entries.get(symbol)
+
+    def put(self, symbol, columns, fetched_at):
+        entry = {"fetched_at": fetched_at, **columns}
+        with self._lock:
+            self._pending[symbol] = entry
+            self._entries[symbol] = entry
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            self._refresh()
+            superseded = self._lines + len(self._pending) - len(self._entries)
+            if superseded > len(self._entries) or not self._appendable:
+                records = self._entries
+                mode = "w"
+            else:
+                records = self._pending
+                mode = "a"
+            text = "".join(
+                json.dumps(
+                    {"symbol": symbol, **entry},
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                ) + "\n"
+                for symbol, entry in records.items()
+            )
+            if mode == "w":
+                temp_path = f"{self.path}.tmp"
+                try:
+                    with open(temp_path, "w", encoding="utf-8") as handle:
+                        handle.write(text)
+                    os.replace(temp_path, self.path)
+                except OSError:
+                    if os.path.exists(temp_path):
+                        os.unlink(temp_path)
+                    raise
+                self._lines = len(records)
+                self._appendable = True
+            else:
+                with open(self.path, "a", encoding="utf-8") as handle:
+                    handle.write(text)
+                self._lines += len(records)
+            self._pending.clear()
+            self._signature = _file_signature(self.path)
+
+
+def _history_store(cache_path):
+    key = os.path.abspath(cache_path)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = TradevilleHistoryStore(cache_path)
+        return store
 
 
 def _save_cache_entry(cache_path, symbol, frame, fetched_at):
     if not cache_path:
         return
-    cache = _load_cache(cache_path)
-    cache.setdefault("version", 1)
-    cache.setdefault("symbols", {})
-    cache["symbols"][symbol] = {
-        "fetched_at": fetched_at,
-        "bars": _frame_to_cache_rows(frame),
-    }
-    temp_path = f"{cache_path}.tmp"
+    store = _history_store(cache_path)
+    store.put(symbol, _frame_to_cache_columns(frame), fetched_at)
     try:
-        with open(temp_path, "w", encoding="utf-8") as handle:
-            json.dump(cache, handle, ensure_ascii=False, separators=(",", ":"))
-        os.replace(temp_path, cache_path)
+        store.flush()
     except OSError:
-        try:
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-        except OSError:
-            pass
+        pass
 
 
 def _cached_history(
@@ -330,13 +548,13 @@ def _cached_history(
     max_age_days=DEFAULT_MAX_AGE_DAYS,
     min_observations=DEFAULT_MIN_OBSERVATIONS,
 ):
-    entry = (_load_cache(cache_path).get("symbols") or {}).get(symbol)
+    entry = _history_store(cache_path).get(symbol) if cache_path else None
     if not isinstance(entry, dict):
         raise TradevilleDataError(
             f"Nu există cache Tradeville valid pentru {symbol}"
         )
-    frame = _cache_rows_to_frame(
-        entry.get("bars"),
+    frame = _cache_columns_to_frame(
+        entry,
         now=now,
         max_age_days=max_age_days,
         min_observations=min_observations,